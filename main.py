@@ -1,100 +1,230 @@
 from datetime import date
 from gettext import find
-import os, tempfile, traceback
+import json, os, sys, uuid
+from typing import List
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, UploadFile, File, HTTPException, Form
-from fastapi.responses import Response
-from fastapi.responses import JSONResponse
-from langdetect import detect, DetectorFactory
-
-from services.excelReading.insertData import insertData
-from services.excelReading.excelDuplicates import find_duplicates
-from services.pdfReading.pdfReader import has_text_layer, extract_text_blocks
-from services.pdfReading.pdfDataExtraction import extract_fields_from_blocks
+from fastapi.responses import Response, FileResponse, PlainTextResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+
 from services.mail.generateBody import generateBody
+from services.uploads.admission import admitted_upload, upload_limit_middleware
+from services.runtime import warmup
+from services.runtime.recycling import recycle_middleware
+from services.runtime.profiling import profiling_middleware, profile_path, run_profiled
+
+from models.data import ExtractResponse, mailInput, mailOutput, mailSendInput
+from settings import settings
+
+# Las dependencias pesadas (pandas, openpyxl, PyMuPDF, pdfplumber, dateutil, langdetect)
+# se importan dentro de cada endpoint: un worker solo paga las de los subsistemas que usa.
+# Con EAGER_WARMUP se cargan todas en segundo plano al arrancar y /ready lo refleja.
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.EAGER_WARMUP:
+        warmup.start_background_warm_up()
+    else:
+        warmup.mark_lazy()
 
-from models.data import ExtractResponse, mailInput, mailOutput
+    # Consumidores de la cola de trabajos (/jobs)
+    runners = []
+    if settings.JOB_WORKERS > 0:
+        from services.jobs.jobRunner import start_runners
+        runners = start_runners()
+    yield
+    for task in runners:
+        task.cancel()
+    # Pool de procesos de extracción (solo existe si se llegó a usar split)
+    segmentation = sys.modules.get("services.pdfReading.segmentation")
+    if segmentation:
+        segmentation.shutdown_pool()
+    # Filas del histórico pendientes de escribir
+    history = sys.modules.get("services.history.historyStore")
+    if history:
+        history.shutdown()
 
 app = FastAPI(
     title="Extractor de Proformas/Facturas",
     version="1.2.0",
     description="Sube un PDF y obtén campos clave.",
+    lifespan=lifespan,
 )
+app.middleware("http")(recycle_middleware)
+app.middleware("http")(profiling_middleware)
+app.middleware("http")(upload_limit_middleware)   # el último registrado es el más externo
+
+# Campos que siempre acompañan a una extracción parcial (?fields=...)
+RESPONSE_META_FIELDS = {"confidence", "source", "idioma", "paginas", "presupuesto"}
 
 @app.get("/health")
 def health():
     return {"status": "ok"}
 
+@app.get("/ready")
+def ready():
+    """Listo para recibir tráfico: el calentamiento (si está activado) ha terminado."""
+    status_code = 200 if warmup.state["status"] == "ready" else 503
+    return JSONResponse(status_code=status_code, content=warmup.state)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Contadores del proceso en formato Prometheus (documentos extraídos, presupuestos agotados)."""
+    from services.runtime import metrics
+
+    return metrics.render()
+
 @app.post("/extract")
-async def extract(pdf: UploadFile = File(...)):
-    """Recibe un PDF y extrae los campos sin usar OCR (solo texto embebido)."""
+async def extract(pdf: UploadFile = File(...), split: bool = False, fields: str | None = None):
+    """
+    Recibe un PDF y extrae los campos sin usar OCR (solo texto embebido).
+    Con split=true el PDF puede contener varias proformas: devuelve una lista con
+    un resultado por documento (extraídos en paralelo).
+    Con fields=Importe,Moneda solo se calculan (y devuelven) esos campos.
+    Las extracciones completas se guardan en el histórico (/history).
+    """
+    from services.pdfReading.pipeline import extract_document, extract_documents
+    from services.pdfReading.pdfDataExtraction import FIELD_GROUPS
+    from services.history.historyStore import record_extraction, file_sha256
+
     if not pdf.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Solo se aceptan archivos PDF")
 
-    content = await pdf.read()
-    if not content:
-        raise HTTPException(status_code=400, detail="El archivo está vacío")
+    wanted = None
+    if fields:
+        wanted = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in wanted if f not in FIELD_GROUPS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Campos no válidos: {unknown}. Disponibles: {list(FIELD_GROUPS)}")
 
-    tmp_path = None
-    try:
-        # Guardar PDF temporalmente
-        fd, tmp_path = tempfile.mkstemp(suffix=".pdf")
-        os.close(fd)
-        with open(tmp_path, "wb") as f:
-            f.write(content)
+    def dump(d: ExtractResponse) -> dict:
+        if wanted is None:
+            return d.model_dump()
+        return d.model_dump(include=set(wanted) | RESPONSE_META_FIELDS)
 
-        # --- Solo lectura de texto, sin OCR ---
-        try:
-            blocks = extract_text_blocks(tmp_path)  # tu función actual
-        except Exception as e:
-            traceback.print_exc()
-            raise HTTPException(status_code=500, detail=f"Error leyendo PDF: {e}")
+    async with admitted_upload(pdf, "pdf", to_disk=True, suffix=".pdf") as upload:
+        if not upload.size:
+            raise HTTPException(status_code=400, detail="El archivo está vacío")
 
-        if not blocks:
-            raise HTTPException(status_code=422, detail="No se detectó texto en el PDF")
+        # Un solo hash del PDF para el fichero de bloques y el histórico
+        digest = file_sha256(upload.path)
+        if split:
+            docs = await run_profiled(extract_documents, upload.path, wanted, digest)
+        else:
+            docs = [extract_document(upload.path, wanted, digest)]
+        if wanted is None:
+            record_extraction(docs, upload.path, pdf.filename, digest)
 
-        # Procesar campos
-        data = extract_fields_from_blocks(blocks)
-        return JSONResponse(content=data.model_dump())
+        if split:
+            return JSONResponse(content=[dump(d) for d in docs])
+        return JSONResponse(content=dump(docs[0]))
 
-    finally:
-        if tmp_path and os.path.exists(tmp_path):
-            try:
-                os.remove(tmp_path)
-            except:
-                pass
+@app.post("/extract/eml")
+async def extract_eml(eml: UploadFile = File(...), split: bool = False):
+    """
+    Recibe un correo completo (.eml, RFC 822) y extrae todas las proformas adjuntas
+    en paralelo, con un resultado por adjunto, más el idioma del cuerpo del mensaje.
+    Con split=true cada adjunto puede contener varias proformas (lista por adjunto).
+    """
+    from services.inbox.emlReader import parse_eml, pdf_attachments, body_text, extract_attachments, header
+    from services.language.detection import detect_language as detect_text_language
+
+    # .msg de Outlook es un fichero OLE, no RFC 822: el parser no vería ningún adjunto
+    if not eml.filename.lower().endswith((".eml", ".txt")):
+        raise HTTPException(status_code=400, detail="Solo se aceptan correos .eml (RFC 822); exporte los .msg de Outlook como .eml")
+
+    # Todo dentro de la reserva de memoria: decodificar y extraer los adjuntos es lo más pesado
+    async with admitted_upload(eml, "eml", suffix=".eml") as upload:
+        if not upload.size:
+            raise HTTPException(status_code=400, detail="El archivo está vacío")
+        msg = await run_profiled(parse_eml, upload.content())
+        attachments = pdf_attachments(msg)
+        results = await extract_attachments(attachments, split)
+    return {
+        "asunto": header(msg, "Subject"),
+        "remitente": header(msg, "From"),
+        "fecha": header(msg, "Date"),
+        "idioma_cuerpo": detect_text_language(body_text(msg)),
+        "adjuntos": results,
+    }
 
 @app.post("/detect-language")
 async def detect_language(string: str | None = ""):
     """Detecta el idioma del texto proporcionado."""
-    DetectorFactory.seed = 0
+    from services.language.detection import detect_language as detect_text_language
 
-    if not string or not string.strip():
-        return {"language": ""}
+    return {"language": detect_text_language(string)}
 
-    try:
-        lang = detect(string)
-        return {"language": lang}
-    except Exception:
-        return {"language": ""}
+@app.post("/detect-language/batch")
+async def detect_language_batch(strings: List[str | None]):
+    """Detecta el idioma de varios textos en una sola llamada (mismo orden que la entrada)."""
+    from services.language.detection import detect_languages
+
+    return {"languages": detect_languages(strings)}
+
+def _render_mail(input: mailInput):
+    """Normaliza la entrada (por si los datos vienen vacíos o con otro formato) y genera el correo."""
+    lang = (input.idioma or "en").lower()
+    amount = 0.0 if input.importe is None else float(input.importe)
+    currency = input.moneda or ""
+    order_no = 0 if input.numeroPedido is None else int(input.numeroPedido)
+    date_iso = input.fechaFactura or ""
+
+    return generateBody(lang, amount, currency, order_no, date_iso)
 
 @app.post("/generateMail", response_model=mailOutput)
 async def generate_mail(input: mailInput):
     """Genera un correo electrónico de solicitud de pago basado en los datos proporcionados."""
     try:
-        # Comprobaciones por si los datos vienen vacíos o con otro formato.
-        lang = (input.idioma or "en").lower()
-        amount = 0.0 if input.importe is None else float(input.importe)
-        currency = input.moneda or ""
-        order_no = 0 if input.numeroPedido is None else int(input.numeroPedido)
-        date_iso = input.fechaFactura or ""   
-
-        body, subject = generateBody(lang, amount, currency, order_no, date_iso)
+        body, subject = _render_mail(input)
         return {"email_body": body, "email_subject": subject}
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=str(ve))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generando correo: {e}")
 
+@app.post("/generateMail/batch")
+async def generate_mail_batch(inputs: List[mailInput]):
+    """
+    Genera muchos correos en una sola llamada. Devuelve NDJSON en streaming:
+    una línea por entrada con su índice y el asunto/cuerpo (o el error de esa entrada).
+    """
+    def stream():
+        for i, item in enumerate(inputs):
+            try:
+                body, subject = _render_mail(item)
+                line = {"index": i, "email_body": body, "email_subject": subject}
+            except Exception as e:
+                line = {"index": i, "error": str(e)}
+            yield json.dumps(line, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@app.post("/generateMail/send")
+async def generate_mail_send(inputs: List[mailSendInput]):
+    """
+    Genera los correos y los envía por SMTP en una sola tanda, reutilizando unas
+    pocas conexiones (con reintentos y límite de envíos por segundo).
+    """
+    from services.mail.smtpSender import send_all
+
+    mails, errores = [], []
+    for i, item in enumerate(inputs):
+        try:
+            body, subject = _render_mail(item)
+        except Exception as e:
+            errores.append({"index": i, "to": item.destinatario, "enviado": False, "error": str(e)})
+            continue
+        mails.append({"to": item.destinatario, "subject": subject, "body": body, "index": i})
+
+    result = await run_profiled(send_all, mails)
+    for r, mail in zip(result["resultados"], mails):
+        r["index"] = mail["index"]
+    result["resultados"] = sorted(result["resultados"] + errores, key=lambda r: r["index"])
+    result["resumen"]["total"] = len(inputs)
+    result["resumen"]["fallidos"] += len(errores)
+    return result
+
 @app.post("/processExcel")
 async def process_excel(
     numPedido: int | None = Form(None),
@@ -111,6 +241,7 @@ async def process_excel(
     idioma: str | None = Form(None),
     fechaSolicitud: date | None = Form(None),
     estado: str | None = Form("Pendiente"),
+    respuesta: str = Form("excel"),
 
     file: UploadFile = File(...)
 ):
@@ -119,70 +250,304 @@ async def process_excel(
     1. Verifica si el registro ya existe (duplicado)
     2. Si no existe, añade la nueva fila
     3. Devuelve el Excel actualizado
+    Con respuesta='delta' devuelve solo la fila añadida (JSON) y un enlace para
+    descargar el Excel completo (/processExcel/workbook/{id}) si hace falta.
     """
-    
+    from services.excelReading.insertData import insert_row
+    from services.excelReading.excelDuplicates import find_duplicates
+    from services.excelReading.registerRow import build_row
+
     # Validar tipo de archivo
     if not file.filename.lower().endswith((".xlsx", ".xls")):
         raise HTTPException(status_code=400, detail="Solo se aceptan archivos Excel (.xlsx o .xls)")
+    if respuesta not in ("excel", "delta"):
+        raise HTTPException(status_code=400, detail="'respuesta' debe ser 'excel' o 'delta'")
 
-    # Leer contenido del archivo
-    content = await file.read()
-    if not content:
-        raise HTTPException(status_code=400, detail="El archivo está vacío")
-    
-    # Permitir valores nulos en las fechas/otros campos
-    dateFact = fechaFact.strftime("%d/%m/%Y") if fechaFact else None
-    dateSolicitud = fechaSolicitud.strftime("%d/%m/%Y") if fechaSolicitud else None
-    
-    data = {
-        "NUMERO PROFORMA": numProforma,
-        "FECHA FACTURA": dateFact,
-        "FECHA SOLICITUD": dateSolicitud,
-        "ESTADO": estado,
-        "NUMERO DE PEDIDO": numPedido,
-        "REFERENCIA PEDIDO": refPedido,
-        "NOMBRE DE CLIENTE": nomCliente,
-        "IMPORTE": importe,
-        "CANTIDAD": uds,
-        "PAIS": pais,
-        "CORREO CLIENTE": email,
-        "BACKOFFICE": backOffice,
-        "IDIOMA 2": idioma
-    }
+    data = build_row(
+        numPedido, numProforma, fechaFact, refPedido, nomCliente, importe, uds,
+        pais, email, backOffice, idioma, fechaSolicitud, estado,
+    )
 
-    # Verificar duplicados
-    duplicado = find_duplicates(numPedido, numProforma, content) 
+    # Leer contenido del archivo (con límite de tamaño y presupuesto de memoria)
+    async with admitted_upload(file, "excel", suffix=".xlsx") as upload:
+        if not upload.size:
+            raise HTTPException(status_code=400, detail="El archivo está vacío")
+
+        # Verificar duplicados
+        duplicado = find_duplicates(numPedido, numProforma, upload.content()) 
     
-    if duplicado:
-        print("Registro duplicado detectado.")
-        return JSONResponse(
-            status_code=200,
-            content={
-                "duplicado": "true",  
-                "message": "Registro ya existe en el archivo Excel",
-                "data": data,
-            },
-            headers={
-                "X-DUPLICADO": "true"  
-            }
-        )
+        if duplicado:
+            print("Registro duplicado detectado.")
+            return JSONResponse(
+                status_code=200,
+                content={
+                    "duplicado": "true",  
+                    "message": "Registro ya existe en el archivo Excel",
+                    "data": data,
+                },
+                headers={
+                    "X-DUPLICADO": "true"  
+                }
+            )
     
-    # Insertar nueva fila
-    try:
-        print("Insertando nuevos datos en el archivo Excel...")
-        newContent = insertData(data, content)
-        print("Datos insertados correctamente.")
-        # Devolver el archivo Excel actualizado
-        return Response(
-            content=newContent,
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            headers={
-                "Content-Disposition": f"attachment; filename=updated_{file.filename}",
-                "X-DUPLICADO": "false"
-            }
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error al insertar datos: {str(e)}")
+        # Insertar nueva fila
+        try:
+            print("Insertando nuevos datos en el archivo Excel...")
+            newContent, delta = insert_row(data, upload.content())
+            print("Datos insertados correctamente.")
+            if respuesta == "delta":
+                from services.excelReading import workbookCache
+                workbook_id = workbookCache.put(newContent)
+                return JSONResponse(
+                    content={"duplicado": "false", **delta, "workbookId": workbook_id,
+                             "descarga": f"/processExcel/workbook/{workbook_id}"},
+                    headers={"X-DUPLICADO": "false"},
+                )
+            # Devolver el archivo Excel actualizado
+            return Response(
+                content=newContent,
+                media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                headers={
+                    "Content-Disposition": f"attachment; filename=updated_{file.filename}",
+                    "X-DUPLICADO": "false"
+                }
+            )
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error al insertar datos: {str(e)}")
+
+
+@app.get("/processExcel/workbook/{workbook_id}")
+async def get_processed_workbook(workbook_id: str):
+    """Excel completo resultante de un /processExcel con respuesta='delta' (mientras siga en caché)."""
+    from services.excelReading.workbookCache import get_path
+
+    path = get_path(workbook_id)
+    if not path:
+        raise HTTPException(status_code=404, detail="Excel no encontrado o caducado")
+    return FileResponse(
+        path,
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        filename=f"updated_{workbook_id}.xlsx",
+    )
+
+
+@app.post("/dunning/run")
+async def run_dunning(
+    dias: int = Form(30),
+    moneda: str = Form("EUR"),
+    fechaReferencia: date | None = Form(None),
+    enviar: bool = Form(False),
+    file: UploadFile = File(...)
+):
+    """
+    Reclamación de pagos sobre el registro:
+    1. Filtra las filas 'Pendiente' con antigüedad >= dias (FECHA FACTURA o, si falta, FECHA SOLICITUD)
+    2. Genera el correo de cada fila en su 'IDIOMA 2'
+    3. Devuelve toda la tanda en una sola respuesta
+    Con enviar=true además envía por SMTP los correos de las filas con CORREO CLIENTE.
+    """
+    from services.excelReading.dunning import dunning_run
+
+    if not file.filename.lower().endswith((".xlsx", ".xls")):
+        raise HTTPException(status_code=400, detail="Solo se aceptan archivos Excel (.xlsx o .xls)")
+    if dias < 0:
+        raise HTTPException(status_code=400, detail="'dias' no puede ser negativo")
+
+    async with admitted_upload(file, "excel", suffix=".xlsx") as upload:
+        if not upload.size:
+            raise HTTPException(status_code=400, detail="El archivo está vacío")
+        result = dunning_run(upload.content(), dias, moneda, fechaReferencia)
+
+    if enviar:
+        from services.mail.smtpSender import send_all
+
+        con_correo = [c for c in result["correos"] if c["correo"]]
+        sent = await run_profiled(send_all, [
+            {"to": c["correo"], "subject": c["email_subject"], "body": c["email_body"]} for c in con_correo
+        ])
+        for c, r in zip(con_correo, sent["resultados"]):
+            c["envio"] = {k: v for k, v in r.items() if k not in ("index", "to")}
+        result["envio"] = {**sent["resumen"], "sin_correo": len(result["correos"]) - len(con_correo)}
+    return result
+
+
+@app.post("/register/summary")
+async def register_summary(
+    agrupar: str = Form("pais,backoffice,moneda,antiguedad"),
+    estado: str | None = Form("Pendiente"),
+    moneda: str = Form("EUR"),
+    fechaReferencia: date | None = Form(None),
+    file: UploadFile = File(...)
+):
+    """
+    Resumen del registro agrupado por país, backoffice, moneda, tramo de antigüedad,
+    estado o idioma: nº de registros, importe, cantidad y fecha más antigua.
+    El Excel ya leído se cachea por su hash: repetir la consulta no lo vuelve a parsear.
+    Con estado='todos' se incluyen todos los estados.
+    """
+    from services.excelReading.registerSummary import summarize
+
+    if not file.filename.lower().endswith((".xlsx", ".xls")):
+        raise HTTPException(status_code=400, detail="Solo se aceptan archivos Excel (.xlsx o .xls)")
+    keys = [k.strip().lower() for k in agrupar.split(",") if k.strip()]
+
+    async with admitted_upload(file, "excel", suffix=".xlsx") as upload:
+        if not upload.size:
+            raise HTTPException(status_code=400, detail="El archivo está vacío")
+        return await run_profiled(summarize, upload.content(), keys, estado, moneda, fechaReferencia)
+
+@app.get("/customers/{codigo}")
+async def get_customer(codigo: int):
+    """Datos de envío aprendidos para un código de cliente."""
+    from services.customers.customerDirectory import get_directory
+
+    entry = get_directory().get(codigo)
+    if not entry:
+        raise HTTPException(status_code=404, detail="Cliente no encontrado en el directorio")
+    return entry
+
+@app.delete("/customers/{codigo}")
+async def invalidate_customer(codigo: int):
+    """Olvida un cliente: el siguiente documento volverá a leer su panel de envío."""
+    from services.customers.customerDirectory import get_directory
+
+    return {"borrados": get_directory().invalidate(codigo)}
+
+@app.delete("/customers")
+async def invalidate_customers():
+    """Vacía el directorio de clientes."""
+    from services.customers.customerDirectory import get_directory
+
+    return {"borrados": get_directory().invalidate()}
+
+@app.post("/jobs", status_code=202)
+async def create_job(
+    tipo: str = Form(...),
+    jobId: str | None = Form(None),
+    callbackUrl: str | None = Form(None),
+    datos: str | None = Form(None),
+    file: UploadFile = File(...)
+):
+    """
+    Encola un trabajo largo y devuelve su id al momento:
+    - tipo='extract': PDF -> mismos campos que /extract
+    - tipo='register': Excel + 'datos' (JSON con los campos de /processExcel) -> fila añadida
+    Si se envía jobId y ya existe, no se vuelve a encolar (reintentos idempotentes).
+    """
+    import shutil
+    from services.jobs.jobStore import get_store
+    from services.jobs.jobRunner import TASK_TYPES
+    from services.excelReading.registerRow import parse_fields
+
+    if tipo not in TASK_TYPES:
+        raise HTTPException(status_code=400, detail=f"Tipo de trabajo no válido. Opciones: {list(TASK_TYPES)}")
+
+    store = get_store()
+    if jobId:
+        existing = store.get(jobId)
+        if existing:
+            return JSONResponse(status_code=200, content=_job_view(existing))
+
+    params = {}
+    if tipo == "register":
+        try:
+            params = json.loads(datos or "{}")
+        except ValueError:
+            raise HTTPException(status_code=400, detail="'datos' debe ser un JSON")
+        # Mismos tipos que el formulario de /processExcel: el error sale ahora y no al ejecutar el trabajo
+        params = parse_fields(params)
+
+    kind, suffix = ("pdf", ".pdf") if tipo == "extract" else ("excel", ".xlsx")
+    if not file.filename.lower().endswith((".pdf",) if kind == "pdf" else (".xlsx", ".xls")):
+        raise HTTPException(status_code=400, detail=f"Archivo no válido para un trabajo '{tipo}'")
+
+    async with admitted_upload(file, kind, to_disk=True, suffix=suffix) as upload:
+        if not upload.size:
+            raise HTTPException(status_code=400, detail="El archivo está vacío")
+        os.makedirs(settings.JOBS_DIR, exist_ok=True)
+        input_path = os.path.join(settings.JOBS_DIR, f"{uuid.uuid4().hex}{suffix}")
+        shutil.move(upload.path, input_path)
+
+    job, created = store.create(jobId, tipo, params, input_path, file.filename, callbackUrl)
+    if not created:
+        # Otro reintento con el mismo id ganó la carrera: descartamos esta copia
+        os.remove(input_path)
+    return JSONResponse(status_code=202 if created else 200, content=_job_view(job))
+
+def _job_view(job: dict) -> dict:
+    return {k: job[k] for k in ("id", "tipo", "estado", "result", "error", "intentos", "creado", "actualizado")}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Estado y resultado de un trabajo."""
+    from services.jobs.jobStore import get_store
+
+    job = get_store().get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return _job_view(job)
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    """Descarga el Excel generado por un trabajo 'register'."""
+    from services.jobs.jobStore import get_store
+
+    job = get_store().get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    if job["estado"] != "done" or not job["result_path"] or not os.path.exists(job["result_path"]):
+        raise HTTPException(status_code=404, detail="Este trabajo no tiene archivo de resultado")
+    return FileResponse(
+        job["result_path"],
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        filename=f"updated_{job['filename']}",
+    )
+
+
+@app.get("/history")
+async def get_history(
+    pedido: int | None = None,
+    proforma: int | None = None,
+    cliente: int | None = None,
+    pdf_hash: str | None = None,
+    desde: date | None = None,
+    hasta: date | None = None,
+    limit: int = 100,
+):
+    """
+    Consulta el histórico de extracciones por nº de pedido, nº de proforma, código de
+    cliente o hash del PDF (búsquedas por índice), opcionalmente en un rango de fechas.
+    """
+    from datetime import datetime, time as dtime, timedelta
+    from services.history.historyStore import get_history as history_store
+
+    if not 1 <= limit <= 1000:
+        raise HTTPException(status_code=400, detail="'limit' debe estar entre 1 y 1000")
+    ts = lambda d: datetime.combine(d, dtime.min).timestamp()
+    rows = await run_profiled(
+        history_store().query, limit,
+        ts(desde) if desde else None, ts(hasta + timedelta(days=1)) if hasta else None,
+        pedido=pedido, proforma=proforma, cliente=cliente, pdf_hash=pdf_hash,
+    )
+    return {"total": len(rows), "extracciones": rows}
+
+
+@app.get("/profiles/{request_id}")
+async def get_profile(request_id: str):
+    """Resumen del perfil de una petición: funciones más costosas y asignaciones de memoria."""
+    path = profile_path(request_id, "json")
+    if "/" in request_id or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Perfil no encontrado")
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+@app.get("/profiles/{request_id}/pstats")
+async def get_profile_pstats(request_id: str):
+    """Perfil completo en formato pstats (para snakeviz, pstats, etc.)."""
+    path = profile_path(request_id, "prof")
+    if "/" in request_id or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Perfil no encontrado")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{request_id}.prof")
 
 
 if __name__ == "__main__":
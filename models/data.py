@@ -1,18 +1,28 @@
 from enum import Enum
-from pydantic import BaseModel
-from typing import Optional, Tuple
+from datetime import date
+from pydantic import BaseModel, ConfigDict
+from typing import List, Optional, Tuple
 
 class Block(BaseModel):
     text: str
     bbox: Tuple[float, float, float, float]
     font: float = 10.0
     page: int = 0
+    repeats: int = 1   # nº de páginas en que se repetía (cabeceras/pies colapsados)
+
+class LineItem(BaseModel):
+    codigo: str | None = None
+    descripcion: str | None = None
+    cantidad: float | None = None
+    precio: float | None = None
+    importe: float | None = None
+    pagina: int = 0
 
 class ExtractResponse(BaseModel):
     Numero_proforma: int | None = None
-    Fecha_de_la_factura: str
-    Numero_de_pedido: int
-    Referencia_de_pedido: str
+    Fecha_de_la_factura: str | None = None
+    Numero_de_pedido: int | None = None
+    Referencia_de_pedido: str | None = None
     
     Nombre_de_cliente: str | None = None
     Codigo_de_cliente: int | None = None
@@ -26,6 +36,29 @@ class ExtractResponse(BaseModel):
     telefono: str | None = None
     email: str | None = None
     agente: str | None = None
+    idioma: str | None = None
+    paginas: List[int] | None = None
+    lineas: List[LineItem] | None = None
+    presupuesto: List[dict] | None = None     # grupos que agotaron su tiempo
+    _envio_directorio: bool = False           # envío servido por el directorio (no se re-aprende)
+
+class registerInput(BaseModel):
+    """Campos de una fila del registro, con los mismos tipos que el formulario de /processExcel."""
+    model_config = ConfigDict(extra="forbid")
+
+    numPedido: int | None = None
+    numProforma: int | None = None
+    fechaFact: date | None = None
+    refPedido: str | None = None
+    nomCliente: str | None = None
+    importe: float | None = None
+    uds: int | None = None
+    pais: str | None = None
+    email: str | None = None
+    backOffice: str | None = None
+    idioma: str | None = None
+    fechaSolicitud: date | None = None
+    estado: str | None = "Pendiente"
 
 class mailInput(BaseModel):
     idioma: Optional[str] | None = "en"
@@ -34,6 +67,9 @@ class mailInput(BaseModel):
     numeroPedido: Optional[int] = None
     fechaFactura: Optional[str] = None
 
+class mailSendInput(mailInput):
+    destinatario: str
+
 class mailOutput(BaseModel):
     email_body: str
     email_subject: str
\ No newline at end of file
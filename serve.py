@@ -0,0 +1,65 @@
+"""
+Arranque de producción (gunicorn + workers uvicorn):
+
+    python serve.py
+
+- SERVE_WORKERS procesos creados por fork después de cargar la app y calentar las
+  reglas/perfiles en el maestro (preload), así comparten esa memoria.
+- Cada worker se recicla tras MAX_REQUESTS_PER_WORKER peticiones (± jitter) o al
+  superar WORKER_MAX_RSS_MB de RSS.
+- Parada ordenada: un worker que se recicla o recibe SIGTERM termina las peticiones
+  en curso (hasta GRACEFUL_TIMEOUT_S) antes de salir.
+
+Para desarrollo sigue valiendo `python main.py` (uvicorn con reload).
+"""
+import multiprocessing
+from gunicorn.app.base import BaseApplication
+from settings import settings
+
+
+def worker_count() -> int:
+    return settings.SERVE_WORKERS or multiprocessing.cpu_count() * 2 + 1
+
+
+def post_fork(server, worker):
+    from services.runtime import recycling
+    recycling.enable()
+
+
+class ServeApplication(BaseApplication):
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key, value)
+
+    def load(self):
+        from main import app
+        from services.runtime import warmup
+
+        # Se ejecuta en el maestro (preload_app): los workers heredan todo ya cargado
+        if settings.EAGER_WARMUP:
+            warmup.warm_up()
+        return app
+
+
+def options() -> dict:
+    return {
+        "bind": f"{settings.SERVE_HOST}:{settings.SERVE_PORT}",
+        "workers": worker_count(),
+        "worker_class": "uvicorn_worker.UvicornWorker",
+        "preload_app": True,
+        "max_requests": settings.MAX_REQUESTS_PER_WORKER,
+        "max_requests_jitter": settings.MAX_REQUESTS_JITTER,
+        "graceful_timeout": settings.GRACEFUL_TIMEOUT_S,
+        "timeout": settings.WORKER_TIMEOUT_S,
+        "post_fork": post_fork,
+        "accesslog": "-",
+    }
+
+
+if __name__ == "__main__":
+    ServeApplication(options()).run()
@@ -0,0 +1,148 @@
+import os, re, sqlite3, threading, time
+from typing import Iterable, Optional
+from models.data import ExtractResponse
+from settings import settings
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS clientes (
+    codigo       INTEGER PRIMARY KEY,
+    nombre       TEXT,
+    pais         TEXT,
+    telefono     TEXT,
+    email        TEXT,
+    aciertos     INTEGER NOT NULL DEFAULT 0,   -- documentos que confirmaron estos datos
+    actualizado  REAL NOT NULL,
+    usado        REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_clientes_usado ON clientes(usado);
+"""
+FIELDS = ("pais", "telefono", "email")
+
+
+class CustomerDirectory:
+    """
+    Directorio de clientes aprendido de extracciones con confianza suficiente:
+    Codigo_de_cliente -> país, teléfono y email del panel de envío. Se expulsan las
+    entradas menos usadas por encima de CUSTOMER_MAX_ENTRIES y caducan tras CUSTOMER_TTL_DAYS.
+    La consulta es de solo lectura: el uso se anota en memoria y se vuelca en la
+    siguiente escritura (learn), que es cuando hace falta para expulsar.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._used: dict[int, float] = {}
+        self._used_lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        con = sqlite3.connect(self.path, timeout=30)
+        con.row_factory = sqlite3.Row
+        return con
+
+    def get(self, codigo: int) -> Optional[dict]:
+        now = time.time()
+        con = self._connect()
+        try:
+            row = con.execute("SELECT * FROM clientes WHERE codigo = ?", (codigo,)).fetchone()
+        finally:
+            con.close()
+        # Caducado: se ignora (se borra en la siguiente escritura)
+        if row is None or now - row["actualizado"] > settings.CUSTOMER_TTL_DAYS * 86400:
+            return None
+        with self._used_lock:
+            self._used[codigo] = now
+        return dict(row)
+
+    def _flush_usage(self, con: sqlite3.Connection) -> None:
+        with self._used_lock:
+            used, self._used = self._used, {}
+        con.executemany("UPDATE clientes SET usado = MAX(usado, ?) WHERE codigo = ?",
+                        [(ts, codigo) for codigo, ts in used.items()])
+
+    def learn(self, doc: ExtractResponse) -> bool:
+        """Guarda/actualiza el cliente si la extracción es fiable y trae datos de envío."""
+        if not doc.Codigo_de_cliente or doc.confidence < settings.CUSTOMER_LEARN_MIN_CONF:
+            return False
+        if not any(getattr(doc, f) for f in FIELDS):
+            return False
+        now = time.time()
+        with self._connect() as con:
+            con.execute(
+                "INSERT INTO clientes (codigo, nombre, pais, telefono, email, aciertos, actualizado, usado) "
+                "VALUES (?, ?, ?, ?, ?, 1, ?, ?) "
+                "ON CONFLICT(codigo) DO UPDATE SET nombre = excluded.nombre, pais = excluded.pais, "
+                "telefono = excluded.telefono, email = excluded.email, actualizado = excluded.actualizado, "
+                "usado = excluded.usado, "
+                "aciertos = CASE WHEN clientes.pais IS excluded.pais AND clientes.telefono IS excluded.telefono "
+                "AND clientes.email IS excluded.email THEN clientes.aciertos + 1 ELSE 1 END",
+                (doc.Codigo_de_cliente, doc.Nombre_de_cliente, doc.pais or None, doc.telefono or None,
+                 doc.email or None, now, now),
+            )
+            self._flush_usage(con)
+            self._evict(con)
+        return True
+
+    @staticmethod
+    def _evict(con: sqlite3.Connection) -> None:
+        con.execute("DELETE FROM clientes WHERE actualizado < ?", (time.time() - settings.CUSTOMER_TTL_DAYS * 86400,))
+        limit = settings.CUSTOMER_MAX_ENTRIES
+        if limit > 0:
+            con.execute(
+                "DELETE FROM clientes WHERE codigo IN ("
+                "SELECT codigo FROM clientes ORDER BY usado DESC LIMIT -1 OFFSET ?)",
+                (limit,),
+            )
+
+    def invalidate(self, codigo: Optional[int] = None) -> int:
+        """Borra un cliente (o todo el directorio si codigo es None). Devuelve las filas borradas."""
+        with self._connect() as con:
+            if codigo is None:
+                return con.execute("DELETE FROM clientes").rowcount
+            return con.execute("DELETE FROM clientes WHERE codigo = ?", (codigo,)).rowcount
+
+
+_directory: Optional[CustomerDirectory] = None
+
+
+def get_directory() -> CustomerDirectory:
+    global _directory
+    if _directory is None:
+        _directory = CustomerDirectory(settings.CUSTOMER_DB_PATH)
+    return _directory
+
+
+def consistent(entry: dict, page_text: str) -> bool:
+    """
+    Comprobación barata contra el documento: todos los datos guardados (email, teléfono
+    y país) aparecen en el texto de la página del panel. Si alguno cambió, no vale.
+    """
+    if not any(entry.get(f) for f in FIELDS):
+        return False
+    if entry.get("email") and entry["email"].lower() not in page_text.lower():
+        return False
+    digits = re.sub(r'\D', '', entry.get("telefono") or "")
+    if digits and digits[-9:] not in re.sub(r'\D', '', page_text):
+        return False
+    # El país guardado está normalizado (FRANCE -> FRANCIA): se compara con los de la página normalizados
+    if entry.get("pais"):
+        from services.pdfReading.pdfDataExtraction import page_countries
+        if entry["pais"].upper() not in page_countries(page_text):
+            return False
+    return True
+
+
+def learn_all(docs: Iterable[ExtractResponse]) -> None:
+    """Aprende de las extracciones completas (los fallos del directorio solo se registran)."""
+    if not settings.CUSTOMER_DIRECTORY:
+        return
+    try:
+        directory = get_directory()
+        for doc in docs:
+            # Lo servido por el directorio no se volvió a leer: no confirma nada
+            if not doc._envio_directorio:
+                directory.learn(doc)
+    except Exception as e:
+        print(f"No se pudo actualizar el directorio de clientes: {e}")
@@ -0,0 +1,68 @@
+from datetime import date
+from typing import Optional
+import pandas as pd
+from services.excelReading.registerFrame import load_register, require_columns, to_dates
+from services.mail.generateBody import generateBody
+
+DUNNING_COLUMNS = ["ESTADO", "FECHA FACTURA", "FECHA SOLICITUD", "NUMERO DE PEDIDO", "IMPORTE", "IDIOMA 2"]
+FIRST_DATA_ROW = 4  # cabecera en la fila 3 de la hoja (header=2)
+
+
+def pending_overdue(df: pd.DataFrame, dias_minimos: int, hoy: date) -> pd.DataFrame:
+    """
+    Filas en estado 'Pendiente' con antigüedad >= dias_minimos, todo vectorizado.
+    La antigüedad se cuenta desde FECHA FACTURA y, si falta, desde FECHA SOLICITUD.
+    """
+    require_columns(df, DUNNING_COLUMNS)
+
+    fecha = to_dates(df["FECHA FACTURA"]).fillna(to_dates(df["FECHA SOLICITUD"]))
+    dias = (pd.Timestamp(hoy) - fecha).dt.days
+
+    pendiente = df["ESTADO"].astype(str).str.strip().str.lower() == "pendiente"
+    mask = pendiente & dias.notna() & (dias >= dias_minimos)
+
+    out = df.loc[mask].copy()
+    out["DIAS"] = dias[mask].astype(int)
+    return out
+
+
+def _int_or_none(v) -> Optional[int]:
+    return None if pd.isna(v) else int(v)
+
+
+def dunning_run(content: bytes | str, dias_minimos: int, moneda: str = "EUR", hoy: Optional[date] = None) -> dict:
+    """Genera todos los correos de reclamación del registro en una sola pasada."""
+    hoy = hoy or date.today()
+    df = load_register(content)
+    pendientes = pending_overdue(df, dias_minimos, hoy)
+
+    has_moneda = "MONEDA" in pendientes.columns
+    has_correo = "CORREO CLIENTE" in pendientes.columns
+    has_proforma = "NUMERO PROFORMA" in pendientes.columns
+
+    correos = []
+    for idx, row in zip(pendientes.index, pendientes.to_dict("records")):
+        idioma = "" if pd.isna(row["IDIOMA 2"]) else str(row["IDIOMA 2"])
+        importe = 0.0 if pd.isna(row["IMPORTE"]) else float(row["IMPORTE"])
+        cur = str(row["MONEDA"]) if has_moneda and not pd.isna(row["MONEDA"]) else moneda
+        pedido = _int_or_none(row["NUMERO DE PEDIDO"]) or 0
+
+        body, subject = generateBody(idioma, importe, cur, pedido, str(row["DIAS"]))
+        correos.append({
+            "fila": int(idx) + FIRST_DATA_ROW,
+            "numeroPedido": pedido,
+            "numeroProforma": _int_or_none(row["NUMERO PROFORMA"]) if has_proforma else None,
+            "correo": None if not has_correo or pd.isna(row["CORREO CLIENTE"]) else str(row["CORREO CLIENTE"]),
+            "idioma": idioma,
+            "dias": int(row["DIAS"]),
+            "email_subject": subject,
+            "email_body": body,
+        })
+
+    return {
+        "fecha": hoy.isoformat(),
+        "dias_minimos": dias_minimos,
+        "filas_leidas": int(len(df)),
+        "total": len(correos),
+        "correos": correos,
+    }
@@ -1,12 +1,12 @@
-from io import BytesIO
 from fastapi import HTTPException
+from services.excelReading.workbookSource import workbook_source
 import pandas as pd
 
 
-def find_duplicates(num_pedido: int, num_proforma: int, content: bytes) -> bool:
+def find_duplicates(num_pedido: int, num_proforma: int, content: bytes | str) -> bool:
     """Verifica si existe un registro duplicado"""
     try:
-        df = pd.read_excel(BytesIO(content), sheet_name="Tabla1", header=2)
+        df = pd.read_excel(workbook_source(content), sheet_name="Tabla1", header=2)
     except Exception as exc:
         raise HTTPException(status_code=400, detail=f"No se pudo leer la hoja 'Tabla1': {exc}")
 
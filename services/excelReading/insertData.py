@@ -1,17 +1,26 @@
 from io import BytesIO
 from fastapi import HTTPException
+from services.excelReading.workbookSource import workbook_source
 import pandas as pd
 from openpyxl import load_workbook
 from openpyxl.utils import range_boundaries
 from copy import copy
 
 
-def insertData(data: dict, content: bytes) -> bytes:
+def insertData(data: dict, content: bytes | str) -> bytes:
     """Añade una nueva fila al Excel dentro de la tabla, manteniendo el formato."""
+    return insert_row(data, content)[0]
+
+
+def insert_row(data: dict, content: bytes | str) -> tuple[bytes, dict]:
+    """
+    Igual que insertData, pero devuelve también el cambio aplicado: fila añadida
+    (número de fila de Excel), valores escritos por columna y nuevo 'ref' de la tabla.
+    """
 
     # 1) Validar columnas con pandas (igual que antes)
     try:
-        df = pd.read_excel(BytesIO(content), sheet_name="Tabla1", header=2)
+        df = pd.read_excel(workbook_source(content), sheet_name="Tabla1", header=2)
     except Exception as exc:
         raise HTTPException(status_code=400, detail=f"No se pudo leer la hoja: {exc}")
 
@@ -23,7 +32,7 @@ def insertData(data: dict, content: bytes) -> bytes:
         )
 
     # 2) Cargar workbook y hoja con openpyxl
-    wb = load_workbook(BytesIO(content))
+    wb = load_workbook(workbook_source(content))
     ws = wb["Tabla1"]
 
     # 3) Localizar la tabla de Excel (ListObject)
@@ -51,11 +60,13 @@ def insertData(data: dict, content: bytes) -> bytes:
             column_names.append(None)
 
     # 6) Escribir los datos en la nueva fila dentro del rango de la tabla
+    written = {}
     for offset, col_name in enumerate(column_names):
         col_idx = min_col + offset
         if col_name and col_name in data:
             cell = ws.cell(row=next_row, column=col_idx)
             cell.value = data[col_name]
+            written[col_name] = data[col_name]
 
             # Copiar estilo de la celda superior (última fila de la tabla anterior)
             source_cell = ws.cell(row=next_row - 1, column=col_idx)
@@ -75,5 +86,7 @@ def insertData(data: dict, content: bytes) -> bytes:
     # 8) Guardar en memoria
     output = BytesIO()
     wb.save(output)
+    wb.close()
     output.seek(0)
-    return output.getvalue()
+    delta = {"hoja": ws.title, "tabla": tbl.name, "fila": next_row, "valores": written, "ref": tbl.ref}
+    return output.getvalue(), delta
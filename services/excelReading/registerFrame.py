@@ -0,0 +1,28 @@
+from fastapi import HTTPException
+from services.excelReading.workbookSource import workbook_source
+import pandas as pd
+
+
+def load_register(content: bytes | str) -> pd.DataFrame:
+    """Lee la hoja 'Tabla1' del registro con los nombres de columna normalizados (strip + mayúsculas)."""
+    try:
+        df = pd.read_excel(workbook_source(content), sheet_name="Tabla1", header=2)
+    except Exception as exc:
+        raise HTTPException(status_code=400, detail=f"No se pudo leer la hoja 'Tabla1': {exc}")
+
+    df.columns = [str(c).strip().upper() for c in df.columns]
+    return df
+
+
+def require_columns(df: pd.DataFrame, columns) -> None:
+    missing = [c for c in columns if c not in df.columns]
+    if missing:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Columnas no encontradas: {missing}. Disponibles: {list(df.columns)}"
+        )
+
+
+def to_dates(series: pd.Series) -> pd.Series:
+    """Fechas del registro: celdas fecha de Excel o texto 'dd/mm/aaaa' (como las escribe insertData)."""
+    return pd.to_datetime(series, dayfirst=True, errors="coerce", format="mixed")
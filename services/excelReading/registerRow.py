@@ -0,0 +1,65 @@
+from datetime import date
+from typing import Optional
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+from models.data import registerInput
+
+# Campos que acepta /processExcel (y las tareas 'register' de /jobs)
+ROW_FIELDS = list(registerInput.model_fields)
+
+
+def parse_fields(datos) -> dict:
+    """'datos' de una tarea 'register' -> campos con los tipos de /processExcel (400 si no encajan)."""
+    try:
+        fields = registerInput.model_validate(datos)
+    except ValidationError as e:
+        errores = [f"{'.'.join(map(str, err['loc'])) or 'datos'}: {err['msg']}" for err in e.errors()]
+        raise HTTPException(status_code=400, detail=f"'datos' no válido: {errores}")
+    return fields.model_dump(mode="json", exclude_unset=True)
+
+
+def _fecha(value) -> Optional[str]:
+    """date o texto ISO 'aaaa-mm-dd' -> 'dd/mm/aaaa' (formato del registro)."""
+    if not value:
+        return None
+    if isinstance(value, str):
+        try:
+            value = date.fromisoformat(value)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Fecha no válida (se espera aaaa-mm-dd): {value}")
+    return value.strftime("%d/%m/%Y")
+
+
+def build_row(
+    numPedido: int | None = None,
+    numProforma: int | None = None,
+    fechaFact: date | str | None = None,
+    refPedido: str | None = None,
+    nomCliente: str | None = None,
+    importe: float | None = None,
+    uds: int | None = None,
+    pais: str | None = None,
+    email: str | None = None,
+    backOffice: str | None = None,
+    idioma: str | None = None,
+    fechaSolicitud: date | str | None = None,
+    estado: str | None = "Pendiente",
+) -> dict:
+    """Fila del registro (columnas de 'Tabla1') a partir de los campos del formulario."""
+    # Permitir valores nulos en las fechas/otros campos
+    return {
+        "NUMERO PROFORMA": numProforma,
+        "FECHA FACTURA": _fecha(fechaFact),
+        "FECHA SOLICITUD": _fecha(fechaSolicitud),
+        "ESTADO": estado,
+        "NUMERO DE PEDIDO": numPedido,
+        "REFERENCIA PEDIDO": refPedido,
+        "NOMBRE DE CLIENTE": nomCliente,
+        "IMPORTE": importe,
+        "CANTIDAD": uds,
+        "PAIS": pais,
+        "CORREO CLIENTE": email,
+        "BACKOFFICE": backOffice,
+        "IDIOMA 2": idioma
+    }
@@ -0,0 +1,146 @@
+import hashlib, threading
+from collections import OrderedDict
+from datetime import date
+from typing import List, Optional
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException
+from services.excelReading.registerFrame import load_register, require_columns, to_dates
+from settings import settings
+
+SUMMARY_COLUMNS = ["ESTADO", "FECHA FACTURA", "FECHA SOLICITUD", "IMPORTE", "CANTIDAD", "PAIS", "BACKOFFICE"]
+
+# clave de agrupación -> columna del frame preparado
+GROUP_KEYS = {
+    "pais": "PAIS",
+    "backoffice": "BACKOFFICE",
+    "moneda": "MONEDA",
+    "antiguedad": "TRAMO",
+    "estado": "ESTADO",
+    "idioma": "IDIOMA",
+}
+
+_cache: "OrderedDict[str, pd.DataFrame]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def _digest(content: bytes | str) -> str:
+    h = hashlib.sha256()
+    if isinstance(content, str):
+        with open(content, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(chunk)
+    else:
+        h.update(content)
+    return h.hexdigest()
+
+
+def _prepare(content: bytes | str) -> pd.DataFrame:
+    """Tabla1 reducida a las columnas del resumen, ya tipadas (una sola vez por versión del Excel)."""
+    df = load_register(content)
+    require_columns(df, SUMMARY_COLUMNS)
+
+    def text(col: str) -> pd.Series:
+        if col not in df.columns:
+            return pd.Series(pd.NA, index=df.index, dtype="string")
+        return df[col].astype("string").str.strip().replace("", pd.NA)
+
+    return pd.DataFrame({
+        "ESTADO": text("ESTADO").str.lower().astype("category"),
+        "PAIS": text("PAIS").str.upper().astype("category"),
+        "BACKOFFICE": text("BACKOFFICE").astype("category"),
+        "MONEDA": text("MONEDA").str.upper().astype("category"),
+        "IDIOMA": text("IDIOMA 2").astype("category"),
+        "FECHA": to_dates(df["FECHA FACTURA"]).fillna(to_dates(df["FECHA SOLICITUD"])),
+        "IMPORTE": pd.to_numeric(df["IMPORTE"], errors="coerce"),
+        "CANTIDAD": pd.to_numeric(df["CANTIDAD"], errors="coerce"),
+    })
+
+
+def register_frame(content: bytes | str) -> tuple[pd.DataFrame, bool]:
+    """Frame preparado desde la caché (clave: hash del Excel). Devuelve (frame, acierto)."""
+    key = _digest(content)
+    with _lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key], True
+    frame = _prepare(content)
+    with _lock:
+        _cache[key] = frame
+        while len(_cache) > max(1, settings.REGISTER_CACHE_SIZE):
+            _cache.popitem(last=False)
+    return frame, False
+
+
+def age_buckets(dias: pd.Series) -> pd.Series:
+    """Días de antigüedad -> tramo ('0-30', '31-60', '61-90', '>90' con los límites por defecto)."""
+    limits = sorted(int(x) for x in settings.REGISTER_AGE_BUCKETS.split(",") if x.strip())
+    labels, prev = [], 0
+    for lim in limits:
+        labels.append(f"{prev}-{lim}")
+        prev = lim + 1
+    labels.append(f">{limits[-1]}" if limits else "todos")
+    return pd.cut(dias, bins=[-np.inf, *limits, np.inf], labels=labels)
+
+
+def _json_value(v):
+    if v is None or v is pd.NaT or (isinstance(v, float) and np.isnan(v)) or v is pd.NA:
+        return None
+    if isinstance(v, pd.Timestamp):
+        return v.date().isoformat()
+    if isinstance(v, (np.integer,)):
+        return int(v)
+    if isinstance(v, (np.floating,)):
+        return round(float(v), 2)
+    return v
+
+
+def summarize(content: bytes | str, agrupar: List[str], estado: Optional[str] = "pendiente",
+              moneda: str = "EUR", hoy: Optional[date] = None) -> dict:
+    """
+    Agregados del registro por las claves pedidas: nº de registros, suma de IMPORTE,
+    suma de CANTIDAD y fecha pendiente más antigua. Todo con groupby vectorizado.
+    """
+    unknown = [k for k in agrupar if k not in GROUP_KEYS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Claves de agrupación no válidas: {unknown}. Opciones: {list(GROUP_KEYS)}")
+
+    hoy = hoy or date.today()
+    frame, hit = register_frame(content)
+    df = frame
+    if estado and estado.strip().lower() != "todos":
+        df = df[df["ESTADO"] == estado.strip().lower()]
+    df = df.assign(
+        MONEDA=df["MONEDA"].astype("string").fillna(moneda.upper()),
+        TRAMO=age_buckets((pd.Timestamp(hoy) - df["FECHA"]).dt.days),
+    )
+
+    aggs = dict(
+        registros=("IMPORTE", "size"),
+        importe=("IMPORTE", "sum"),
+        cantidad=("CANTIDAD", "sum"),
+        fecha_mas_antigua=("FECHA", "min"),
+    )
+    cols = [GROUP_KEYS[k] for k in agrupar]
+    if cols:
+        grouped = df.groupby(cols, observed=True, dropna=False).agg(**aggs).reset_index()
+        grouped = grouped.rename(columns={GROUP_KEYS[k]: k for k in agrupar})
+        grupos = [{k: _json_value(v) for k, v in row.items()} for row in grouped.to_dict("records")]
+    else:
+        grupos = []
+
+    total = {
+        "registros": int(len(df)),
+        "importe": _json_value(df["IMPORTE"].sum()),
+        "cantidad": _json_value(df["CANTIDAD"].sum()),
+        "fecha_mas_antigua": _json_value(df["FECHA"].min()),
+    }
+    return {
+        "fecha": hoy.isoformat(),
+        "estado": estado,
+        "agrupar": agrupar,
+        "cache": "hit" if hit else "miss",
+        "filas_leidas": int(len(frame)),
+        "total": total,
+        "grupos": grupos,
+    }
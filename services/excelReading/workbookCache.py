@@ -0,0 +1,53 @@
+import os, re, time, uuid
+from typing import Optional
+from settings import settings
+
+RX_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+def _path(workbook_id: str) -> str:
+    return os.path.join(settings.WORKBOOK_CACHE_DIR, f"{workbook_id}.xlsx")
+
+
+def _prune() -> None:
+    """Borra las copias caducadas y conserva como mucho WORKBOOK_CACHE_KEEP."""
+    now = time.time()
+    files = []
+    for f in os.listdir(settings.WORKBOOK_CACHE_DIR):
+        if not f.endswith(".xlsx"):
+            continue
+        path = os.path.join(settings.WORKBOOK_CACHE_DIR, f)
+        try:
+            files.append((os.path.getmtime(path), path))
+        except OSError:
+            continue   # otro worker lo borró entre listdir y stat
+    files.sort()
+    keep = settings.WORKBOOK_CACHE_KEEP
+    for i, (mtime, path) in enumerate(files):
+        if now - mtime > settings.WORKBOOK_CACHE_TTL_S or (keep > 0 and i < len(files) - keep):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def put(content: bytes) -> str:
+    """Guarda el Excel actualizado y devuelve su id de descarga."""
+    os.makedirs(settings.WORKBOOK_CACHE_DIR, exist_ok=True)
+    workbook_id = uuid.uuid4().hex
+    tmp = _path(workbook_id) + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(content)
+    os.replace(tmp, _path(workbook_id))
+    _prune()
+    return workbook_id
+
+
+def get_path(workbook_id: str) -> Optional[str]:
+    """Ruta del Excel si sigue en caché (None si no existe o caducó)."""
+    if not RX_ID.match(workbook_id):
+        return None
+    path = _path(workbook_id)
+    if not os.path.exists(path) or time.time() - os.path.getmtime(path) > settings.WORKBOOK_CACHE_TTL_S:
+        return None
+    return path
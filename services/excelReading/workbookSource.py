@@ -0,0 +1,8 @@
+from io import BytesIO
+
+
+def workbook_source(content: bytes | str):
+    """Admite el libro en memoria (bytes) o volcado a disco (ruta)."""
+    if isinstance(content, (bytes, bytearray)):
+        return BytesIO(content)
+    return content
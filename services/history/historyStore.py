@@ -0,0 +1,165 @@
+import hashlib, json, os, sqlite3, threading, time
+from typing import Iterable, List, Optional
+from models.data import ExtractResponse
+from settings import settings
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS extracciones (
+    id                INTEGER PRIMARY KEY AUTOINCREMENT,
+    creado            REAL NOT NULL,
+    pdf_hash          TEXT,
+    filename          TEXT,
+    numero_pedido     INTEGER,
+    numero_proforma   INTEGER,
+    codigo_cliente    INTEGER,
+    nombre_cliente    TEXT,
+    importe           REAL,
+    moneda            TEXT,
+    fecha_factura     TEXT,
+    idioma            TEXT,
+    confidence        REAL,
+    datos             TEXT NOT NULL      -- ExtractResponse completo (JSON)
+);
+CREATE INDEX IF NOT EXISTS ix_ext_pedido   ON extracciones(numero_pedido, numero_proforma);
+CREATE INDEX IF NOT EXISTS ix_ext_proforma ON extracciones(numero_proforma);
+CREATE INDEX IF NOT EXISTS ix_ext_cliente  ON extracciones(codigo_cliente, creado);
+CREATE INDEX IF NOT EXISTS ix_ext_hash     ON extracciones(pdf_hash);
+CREATE INDEX IF NOT EXISTS ix_ext_creado   ON extracciones(creado);
+"""
+
+COLUMNS = ("creado", "pdf_hash", "filename", "numero_pedido", "numero_proforma", "codigo_cliente",
+           "nombre_cliente", "importe", "moneda", "fecha_factura", "idioma", "confidence", "datos")
+
+# filtro de la consulta -> columna indexada
+FILTERS = {
+    "pedido": "numero_pedido",
+    "proforma": "numero_proforma",
+    "cliente": "codigo_cliente",
+    "pdf_hash": "pdf_hash",
+}
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class HistoryStore:
+    """
+    Histórico de extracciones en SQLite. Las escrituras se acumulan en memoria y se
+    vuelcan por lotes (HISTORY_BATCH_SIZE filas o cada HISTORY_FLUSH_S segundos) en
+    una sola transacción; las consultas vuelcan antes lo pendiente.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.executescript(SCHEMA)
+        self._pending: List[tuple] = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._flusher: Optional[threading.Timer] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        con = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        con.row_factory = sqlite3.Row
+        return con
+
+    @staticmethod
+    def _row(doc: ExtractResponse, pdf_hash: Optional[str], filename: Optional[str], now: float) -> tuple:
+        return (
+            now, pdf_hash, filename, doc.Numero_de_pedido, doc.Numero_proforma, doc.Codigo_de_cliente,
+            doc.Nombre_de_cliente, doc.Importe, doc.Moneda, doc.Fecha_de_la_factura, doc.idioma,
+            doc.confidence, doc.model_dump_json(),
+        )
+
+    def record(self, docs: Iterable[ExtractResponse], pdf_hash: Optional[str] = None,
+               filename: Optional[str] = None) -> None:
+        now = time.time()
+        rows = [self._row(d, pdf_hash, filename, now) for d in docs]
+        with self._lock:
+            self._pending += rows
+            full = len(self._pending) >= settings.HISTORY_BATCH_SIZE
+            if not full and self._flusher is None:
+                self._flusher = threading.Timer(settings.HISTORY_FLUSH_S, self.flush)
+                self._flusher.daemon = True
+                self._flusher.start()
+        if full:
+            self.flush()
+
+    def flush(self) -> int:
+        """Escribe lo pendiente en una única transacción. Devuelve las filas escritas."""
+        with self._lock:
+            rows, self._pending = self._pending, []
+            if self._flusher is not None:
+                self._flusher.cancel()
+                self._flusher = None
+        if not rows:
+            return 0
+        placeholders = ", ".join("?" for _ in COLUMNS)
+        with self._write_lock, self._connect() as con:
+            con.executemany(f"INSERT INTO extracciones ({', '.join(COLUMNS)}) VALUES ({placeholders})", rows)
+        return len(rows)
+
+    def query(self, limit: int = 100, desde: Optional[float] = None, hasta: Optional[float] = None,
+              **filters) -> List[dict]:
+        """Búsqueda por pedido/proforma/cliente/pdf_hash (columnas indexadas) y rango de fechas."""
+        self.flush()
+        where, args = [], []
+        for key, value in filters.items():
+            if value is not None:
+                where.append(f"{FILTERS[key]} = ?")
+                args.append(value)
+        if desde is not None:
+            where.append("creado >= ?")
+            args.append(desde)
+        if hasta is not None:
+            where.append("creado < ?")
+            args.append(hasta)
+        sql = "SELECT id, creado, pdf_hash, filename, datos FROM extracciones"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY creado DESC, id DESC LIMIT ?"
+        args.append(limit)
+        with self._connect() as con:
+            rows = con.execute(sql, args).fetchall()
+        return [
+            {"id": r["id"], "creado": r["creado"], "pdf_hash": r["pdf_hash"], "filename": r["filename"],
+             "datos": json.loads(r["datos"])}
+            for r in rows
+        ]
+
+
+_store: Optional[HistoryStore] = None
+
+
+def get_history() -> HistoryStore:
+    global _store
+    if _store is None:
+        _store = HistoryStore(settings.HISTORY_PATH)
+    return _store
+
+
+def shutdown() -> None:
+    """Vuelca las filas pendientes (al parar la app)."""
+    if _store is not None:
+        _store.flush()
+
+
+def record_extraction(docs: List[ExtractResponse], path: str, filename: Optional[str],
+                      digest: Optional[str] = None) -> None:
+    """
+    Guarda en el histórico las extracciones completas de un PDF (los fallos solo se
+    registran). digest: hash ya calculado del PDF, para no volver a leerlo.
+    """
+    if not settings.HISTORY_ENABLED:
+        return
+    try:
+        get_history().record(docs, digest or file_sha256(path), filename)
+    except Exception as e:
+        print(f"No se pudo guardar la extracción en el histórico: {e}")
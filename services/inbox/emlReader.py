@@ -0,0 +1,94 @@
+import asyncio, hashlib, os, re, tempfile
+from email import policy
+from email.message import EmailMessage
+from email.parser import BytesFeedParser
+from html import unescape
+from typing import List, Optional, Tuple
+from fastapi import HTTPException
+from services.runtime.profiling import run_profiled
+from settings import settings
+
+CHUNK_SIZE = 1024 * 1024
+RX_TAG = re.compile(r'<(?:script|style)\b.*?</(?:script|style)>|<[^>]+>', re.I | re.S)
+
+
+def parse_eml(content: bytes | str) -> EmailMessage:
+    """Parsea el mensaje RFC 822 por trozos (BytesFeedParser), desde bytes o desde un fichero."""
+    parser = BytesFeedParser(policy=policy.default)
+    if isinstance(content, str):
+        with open(content, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                parser.feed(chunk)
+    else:
+        for i in range(0, len(content), CHUNK_SIZE):
+            parser.feed(content[i:i + CHUNK_SIZE])
+    msg = parser.close()
+    if not msg.keys():
+        raise HTTPException(status_code=400, detail="El archivo no es un correo RFC 822 válido")
+    return msg
+
+
+def pdf_attachments(msg: EmailMessage) -> List[Tuple[str, bytes]]:
+    """Adjuntos PDF de todo el árbol MIME (también los de mensajes reenviados)."""
+    out = []
+    for part in msg.walk():
+        if part.is_multipart():
+            continue
+        filename = part.get_filename() or ""
+        ctype = part.get_content_type()
+        if ctype == "application/pdf" or filename.lower().endswith(".pdf"):
+            payload = part.get_payload(decode=True)
+            if payload:
+                out.append((filename or f"adjunto_{len(out) + 1}.pdf", payload))
+    return out
+
+
+def body_text(msg: EmailMessage) -> str:
+    """Texto del cuerpo (text/plain preferido; si solo hay HTML, sin etiquetas)."""
+    body = msg.get_body(preferencelist=("plain", "html"))
+    if body is None:
+        return ""
+    try:
+        text = body.get_content()
+    except (LookupError, ValueError):
+        text = (body.get_payload(decode=True) or b"").decode("utf-8", errors="ignore")
+    if body.get_content_subtype() == "html":
+        text = unescape(RX_TAG.sub(" ", text))
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def _extract_attachment(filename: str, data: bytes, split: bool) -> dict:
+    from services.pdfReading.pipeline import extract_document, extract_documents
+    from services.history.historyStore import record_extraction
+
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        digest = hashlib.sha256(data).hexdigest()
+        docs = extract_documents(path, digest=digest) if split else [extract_document(path, digest=digest)]
+        record_extraction(docs, path, filename, digest)
+    except HTTPException as e:
+        return {"adjunto": filename, "tamano": len(data), "status": e.status_code, "error": e.detail}
+    except Exception as e:
+        return {"adjunto": filename, "tamano": len(data), "status": 500, "error": f"Error procesando el adjunto: {e}"}
+    finally:
+        os.remove(path)
+    datos = [d.model_dump() for d in docs]
+    return {"adjunto": filename, "tamano": len(data), "status": 200, "datos": datos if split else datos[0]}
+
+
+async def extract_attachments(attachments: List[Tuple[str, bytes]], split: bool = False) -> List[dict]:
+    """Extrae los adjuntos en paralelo (EML_CONCURRENCY a la vez), en el orden del correo."""
+    sem = asyncio.Semaphore(max(1, settings.EML_CONCURRENCY))
+
+    async def one(name: str, data: bytes) -> dict:
+        async with sem:
+            return await run_profiled(_extract_attachment, name, data, split)
+
+    return await asyncio.gather(*(one(n, d) for n, d in attachments))
+
+
+def header(msg: EmailMessage, name: str) -> Optional[str]:
+    value = msg.get(name)
+    return str(value) if value is not None else None
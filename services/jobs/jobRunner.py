@@ -0,0 +1,107 @@
+import asyncio, json, os, threading, traceback, urllib.request
+from fastapi import HTTPException
+from services.jobs.jobStore import get_store
+from settings import settings
+
+TASK_TYPES = ("extract", "register")
+
+
+def _run_extract(job: dict) -> tuple[dict, None]:
+    from services.pdfReading.pipeline import extract_document
+    from services.history.historyStore import record_extraction, file_sha256
+
+    digest = file_sha256(job["input_path"])
+    doc = extract_document(job["input_path"], digest=digest)
+    record_extraction([doc], job["input_path"], job["filename"], digest)
+    return doc.model_dump(), None
+
+
+def _run_register(job: dict) -> tuple[dict, str | None]:
+    from services.excelReading.insertData import insertData
+    from services.excelReading.excelDuplicates import find_duplicates
+    from services.excelReading.registerRow import build_row
+
+    fields = job["params"]
+    data = build_row(**fields)
+    if find_duplicates(fields.get("numPedido"), fields.get("numProforma"), job["input_path"]):
+        return {"duplicado": "true", "message": "Registro ya existe en el archivo Excel", "data": data}, None
+
+    out_path = os.path.join(settings.JOBS_DIR, f"{job['id']}.result.xlsx")
+    with open(out_path, "wb") as f:
+        f.write(insertData(data, job["input_path"]))
+    return {"duplicado": "false", "data": data, "descarga": f"/jobs/{job['id']}/result"}, out_path
+
+
+TASKS = {"extract": _run_extract, "register": _run_register}
+
+
+def _notify(job_id: str, callback_url: str) -> None:
+    """Avisa al cliente (POST JSON) de que el trabajo terminó; los fallos solo se registran."""
+    job = get_store().get(job_id)
+    payload = json.dumps({"id": job_id, "estado": job["estado"], "error": job["error"]}).encode()
+    req = urllib.request.Request(callback_url, data=payload, method="POST",
+                                 headers={"Content-Type": "application/json"})
+    try:
+        urllib.request.urlopen(req, timeout=settings.JOB_CALLBACK_TIMEOUT_S).close()
+    except Exception as e:
+        print(f"Callback de job {job_id} a {callback_url} fallido: {e}")
+
+
+def _heartbeat(job: dict, stop: threading.Event) -> None:
+    """Renueva el lease mientras la tarea corre, para que otro worker no la tome como huérfana."""
+    store = get_store()
+    while not stop.wait(settings.JOB_HEARTBEAT_S):
+        try:
+            if not store.heartbeat(job["id"], job["intentos"]):
+                return
+        except Exception as e:
+            print(f"Latido del job {job['id']} fallido: {e}")
+
+
+def _close(job: dict) -> None:
+    """El trabajo llegó a un estado final: se borra su entrada y se avisa al cliente."""
+    if job.get("input_path") and os.path.exists(job["input_path"]):
+        os.remove(job["input_path"])
+    if job.get("callback_url"):
+        _notify(job["id"], job["callback_url"])
+
+
+def run_job(job: dict) -> None:
+    store = get_store()
+    stop = threading.Event()
+    threading.Thread(target=_heartbeat, args=(job, stop), daemon=True).start()
+    try:
+        result, result_path = TASKS[job["tipo"]](job)
+        done = store.finish(job["id"], result, result_path, job["intentos"])
+    except HTTPException as e:
+        done = store.fail(job["id"], str(e.detail), job["intentos"])
+    except Exception as e:
+        traceback.print_exc()
+        done = store.fail(job["id"], str(e), job["intentos"])
+    finally:
+        stop.set()
+    if done:
+        _close(job)
+    else:
+        print(f"Job {job['id']}: otra ejecución lo tomó (lease perdido), se descarta este resultado")
+
+
+async def runner_loop() -> None:
+    """Bucle de un consumidor: toma trabajos de la cola SQLite y los ejecuta en un hilo."""
+    store = get_store()
+    while True:
+        try:
+            for dead in await asyncio.to_thread(store.reap):
+                await asyncio.to_thread(_close, dead)
+            job = await asyncio.to_thread(store.claim_next)
+        except Exception:
+            traceback.print_exc()
+            job = None
+        if job is None:
+            await asyncio.sleep(settings.JOB_POLL_S)
+            continue
+        await asyncio.to_thread(run_job, job)
+
+
+def start_runners() -> list[asyncio.Task]:
+    return [asyncio.create_task(runner_loop()) for _ in range(settings.JOB_WORKERS)]
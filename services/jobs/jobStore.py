@@ -0,0 +1,164 @@
+import json, os, sqlite3, time, uuid
+from typing import Optional
+from settings import settings
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id           TEXT PRIMARY KEY,
+    tipo         TEXT NOT NULL,
+    estado       TEXT NOT NULL,          -- queued | running | done | failed
+    params       TEXT,
+    input_path   TEXT,
+    filename     TEXT,
+    callback_url TEXT,
+    result       TEXT,
+    result_path  TEXT,
+    error        TEXT,
+    intentos     INTEGER NOT NULL DEFAULT 0,
+    creado       REAL NOT NULL,
+    actualizado  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_jobs_estado ON jobs(estado, creado);
+"""
+
+
+class JobStore:
+    """Cola de trabajos en SQLite: sobrevive a reinicios y la comparten todos los workers."""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        con = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        con.row_factory = sqlite3.Row
+        return con
+
+    @staticmethod
+    def _to_dict(row: Optional[sqlite3.Row]) -> Optional[dict]:
+        if row is None:
+            return None
+        d = dict(row)
+        d["params"] = json.loads(d["params"]) if d["params"] else {}
+        d["result"] = json.loads(d["result"]) if d["result"] else None
+        return d
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._connect() as con:
+            return self._to_dict(con.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def create(self, job_id: Optional[str], tipo: str, params: dict, input_path: str,
+               filename: str, callback_url: Optional[str]) -> tuple[dict, bool]:
+        """Encola el trabajo. Si el id ya existe (reintento del cliente) devuelve el existente."""
+        job_id = job_id or uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as con:
+            cur = con.execute(
+                "INSERT OR IGNORE INTO jobs (id, tipo, estado, params, input_path, filename, callback_url, creado, actualizado) "
+                "VALUES (?, ?, 'queued', ?, ?, ?, ?, ?, ?)",
+                (job_id, tipo, json.dumps(params), input_path, filename, callback_url, now, now),
+            )
+            created = cur.rowcount == 1
+        return self.get(job_id), created
+
+    def reap(self) -> list[dict]:
+        """
+        Marca como 'failed' los 'running' huérfanos que ya agotaron JOB_MAX_ATTEMPTS
+        (p. ej. un PDF que tumba al worker cada vez) y los devuelve para limpiar su entrada.
+        """
+        stale = time.time() - settings.JOB_LEASE_S
+        con = self._connect()
+        try:
+            con.execute("BEGIN IMMEDIATE")
+            rows = con.execute(
+                "SELECT * FROM jobs WHERE estado = 'running' AND actualizado < ? AND intentos >= ?",
+                (stale, settings.JOB_MAX_ATTEMPTS),
+            ).fetchall()
+            for row in rows:
+                con.execute(
+                    "UPDATE jobs SET estado = 'failed', error = ?, actualizado = ? WHERE id = ?",
+                    (f"Trabajo abandonado tras {row['intentos']} intentos", time.time(), row["id"]),
+                )
+            con.execute("COMMIT")
+        except Exception:
+            con.execute("ROLLBACK")
+            raise
+        finally:
+            con.close()
+        return [self.get(row["id"]) for row in rows]
+
+    def claim_next(self) -> Optional[dict]:
+        """
+        Toma el trabajo en cola más antiguo (o uno 'running' cuyo worker murió: sin
+        latido desde hace más de JOB_LEASE_S y con intentos por debajo de JOB_MAX_ATTEMPTS).
+        """
+        now = time.time()
+        stale = now - settings.JOB_LEASE_S
+        con = self._connect()
+        try:
+            con.execute("BEGIN IMMEDIATE")
+            row = con.execute(
+                "SELECT id FROM jobs WHERE estado = 'queued' "
+                "OR (estado = 'running' AND actualizado < ? AND intentos < ?) "
+                "ORDER BY creado LIMIT 1",
+                (stale, settings.JOB_MAX_ATTEMPTS),
+            ).fetchone()
+            if row is None:
+                con.execute("COMMIT")
+                return None
+            con.execute(
+                "UPDATE jobs SET estado = 'running', intentos = intentos + 1, actualizado = ? WHERE id = ?",
+                (now, row["id"]),
+            )
+            con.execute("COMMIT")
+        except Exception:
+            con.execute("ROLLBACK")
+            raise
+        finally:
+            con.close()
+        return self.get(row["id"])
+
+    # Con intento, solo cuenta si el trabajo sigue siendo de esa ejecución (no se re-tomó
+    # tras perder el lease): devuelven False y la ejecución vieja no toca nada más.
+    @staticmethod
+    def _owner(intento: Optional[int]) -> tuple[str, tuple]:
+        return (" AND estado = 'running' AND intentos = ?", (intento,)) if intento is not None else ("", ())
+
+    def heartbeat(self, job_id: str, intento: Optional[int] = None) -> bool:
+        """Renueva el lease de un trabajo en curso."""
+        cond, args = self._owner(intento)
+        with self._connect() as con:
+            cur = con.execute(f"UPDATE jobs SET actualizado = ? WHERE id = ?{cond}", (time.time(), job_id, *args))
+            return cur.rowcount == 1
+
+    def finish(self, job_id: str, result: Optional[dict] = None, result_path: Optional[str] = None,
+               intento: Optional[int] = None) -> bool:
+        cond, args = self._owner(intento)
+        with self._connect() as con:
+            cur = con.execute(
+                f"UPDATE jobs SET estado = 'done', result = ?, result_path = ?, error = NULL, actualizado = ? WHERE id = ?{cond}",
+                (json.dumps(result) if result is not None else None, result_path, time.time(), job_id, *args),
+            )
+            return cur.rowcount == 1
+
+    def fail(self, job_id: str, error: str, intento: Optional[int] = None) -> bool:
+        cond, args = self._owner(intento)
+        with self._connect() as con:
+            cur = con.execute(
+                f"UPDATE jobs SET estado = 'failed', error = ?, actualizado = ? WHERE id = ?{cond}",
+                (error, time.time(), job_id, *args),
+            )
+            return cur.rowcount == 1
+
+
+_store: Optional[JobStore] = None
+
+
+def get_store() -> JobStore:
+    global _store
+    if _store is None:
+        _store = JobStore(os.path.join(settings.JOBS_DIR, "jobs.sqlite3"))
+    return _store
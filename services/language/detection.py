@@ -0,0 +1,64 @@
+import os, threading
+from functools import lru_cache
+from typing import List, Optional
+from langdetect.detector_factory import DetectorFactory, PROFILES_DIRECTORY
+from settings import settings
+
+MAX_TEXT_CHARS = 10000  # langdetect no mira más allá de este tamaño
+
+_factory: Optional[DetectorFactory] = None
+_lock = threading.Lock()
+
+
+def candidate_languages() -> List[str]:
+    return [l.strip() for l in settings.LANGDETECT_CANDIDATES.split(",") if l.strip()]
+
+
+def _build_factory() -> DetectorFactory:
+    """
+    Carga los perfiles una sola vez. Si hay candidatos configurados, solo se cargan
+    esos (los idiomas que sabe redactar generateBody): menos perfiles, menos trabajo por llamada.
+    """
+    factory = DetectorFactory()
+    factory.seed = 0  # resultados deterministas
+    langs = candidate_languages()
+    if len(langs) >= 2:
+        profiles = []
+        for lang in langs:
+            with open(os.path.join(PROFILES_DIRECTORY, lang), encoding="utf-8") as f:
+                profiles.append(f.read())
+        factory.load_json_profile(profiles)
+    else:
+        factory.load_profile(PROFILES_DIRECTORY)
+    return factory
+
+
+def warm_up() -> None:
+    """Precarga los perfiles de idioma (evita el pico de latencia de la primera llamada)."""
+    global _factory
+    with _lock:
+        if _factory is None:
+            _factory = _build_factory()
+
+
+@lru_cache(maxsize=settings.LANGDETECT_CACHE_SIZE)
+def _detect_cached(text: str) -> str:
+    if _factory is None:
+        warm_up()
+    try:
+        detector = _factory.create()
+        detector.append(text)
+        return detector.detect()
+    except Exception:
+        return ""
+
+
+def detect_language(text: Optional[str]) -> str:
+    """Idioma del texto ('' si está vacío o no se puede detectar). Resultados cacheados (LRU)."""
+    if not text or not text.strip():
+        return ""
+    return _detect_cached(text.strip()[:MAX_TEXT_CHARS])
+
+
+def detect_languages(texts: List[Optional[str]]) -> List[str]:
+    return [detect_language(t) for t in texts]
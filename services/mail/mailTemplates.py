@@ -0,0 +1,54 @@
+import json
+from pathlib import Path
+from string import Template
+from typing import Dict
+
+TEMPLATES_DIR = Path(__file__).parent / "templates"
+
+
+class MailTemplate:
+    """Plantilla de un idioma ya compilada (asunto + cuerpo) con su formato de importes."""
+
+    def __init__(self, spec: dict):
+        self.idioma = spec["idioma"]
+        self.alias = [a.lower() for a in spec.get("alias", [])]
+        self.miles = spec.get("separador_miles", ".")
+        self.decimal = spec.get("separador_decimal", ",")
+        self.asunto = Template(spec["asunto"])
+        self.cuerpo = Template(spec["cuerpo"])
+
+    def format_amount(self, importe: float) -> str:
+        """1234.5 -> '1.234,50' / '1,234.50' / '1 234,50' según el idioma."""
+        entero, dec = f"{importe:,.2f}".split(".")
+        return entero.replace(",", self.miles) + self.decimal + dec
+
+    def render(self, importe: float, moneda: str, numeroPedido: int, diasFactura: str):
+        values = {
+            "importe": self.format_amount(importe),
+            "moneda": moneda,
+            "numeroPedido": numeroPedido,
+            "diasFactura": diasFactura,
+        }
+        return self.cuerpo.substitute(values), self.asunto.substitute(values)
+
+
+def load_templates(directory: Path = TEMPLATES_DIR) -> Dict[str, MailTemplate]:
+    """Carga y compila todas las plantillas; indexadas por cada alias del idioma."""
+    templates: Dict[str, MailTemplate] = {}
+    for path in sorted(directory.glob("*.json")):
+        with open(path, encoding="utf-8") as f:
+            tpl = MailTemplate(json.load(f))
+        templates[tpl.idioma] = tpl
+        for alias in tpl.alias:
+            templates[alias] = tpl
+    if "default" not in templates:
+        raise RuntimeError(f"Falta la plantilla 'default' en {directory}")
+    return templates
+
+
+# Se cargan una sola vez al arrancar el proceso
+TEMPLATES = load_templates()
+
+
+def get_template(idioma: str) -> MailTemplate:
+    return TEMPLATES.get((idioma or "").strip().lower(), TEMPLATES["default"])
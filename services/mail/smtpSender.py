@@ -0,0 +1,186 @@
+import smtplib, socket, threading, time
+from email.message import EmailMessage
+from email.utils import formatdate, make_msgid
+from queue import Empty, Queue
+from typing import List, Optional
+from settings import settings
+
+# Errores tras los que merece la pena reintentar (conexión caída, 4xx temporales). No vale
+# OSError: SMTPException hereda de él y los rechazos permanentes (553, 535...) no se reintentan.
+TRANSIENT = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, socket.timeout)
+
+
+class SmtpUnavailable(Exception):
+    """No se pudo abrir una conexión nueva: el resto de la tanda falla sin intentarlo."""
+
+
+def build_message(to: str, subject: str, body: str, sender: Optional[str] = None) -> EmailMessage:
+    msg = EmailMessage()
+    msg["From"] = sender or settings.SMTP_FROM
+    msg["To"] = to
+    msg["Subject"] = subject
+    msg["Date"] = formatdate(localtime=True)
+    msg["Message-ID"] = make_msgid()
+    msg.set_content(body)
+    return msg
+
+
+class RateLimiter:
+    """Cubo de fichas compartido por todas las conexiones de una tanda (SMTP_RATE_PER_S)."""
+
+    def __init__(self, per_second: float):
+        self.interval = 1.0 / per_second if per_second > 0 else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            at = max(now, self._next)
+            self._next = at + self.interval
+        if at > now:
+            time.sleep(at - now)
+
+
+class SmtpConnection:
+    """Conexión SMTP reutilizable: se abre bajo demanda y se renueva cada SMTP_MAX_PER_CONNECTION envíos."""
+
+    def __init__(self, stats: dict):
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._sent = 0
+        self._stats = stats
+
+    def _open(self) -> smtplib.SMTP:
+        smtp = smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT, timeout=settings.SMTP_TIMEOUT_S)
+        smtp.ehlo()
+        if settings.SMTP_STARTTLS:
+            smtp.starttls()
+            smtp.ehlo()
+        if settings.SMTP_USER:
+            smtp.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
+        self._stats["conexiones"] += 1
+        return smtp
+
+    def send(self, msg: EmailMessage) -> None:
+        if self._smtp is not None and self._sent >= settings.SMTP_MAX_PER_CONNECTION:
+            self.close()
+        if self._smtp is None:
+            try:
+                self._smtp = self._open()
+            except Exception as e:
+                raise SmtpUnavailable(f"Servidor SMTP no disponible: {type(e).__name__}: {e}") from e
+            self._sent = 0
+        try:
+            self._smtp.send_message(msg)
+        except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+            # El servidor respondió: la conexión sigue sirviendo (RSET para limpiar la transacción)
+            try:
+                self._smtp.rset()
+            except Exception:
+                self.close()
+            raise
+        except Exception:
+            self.close()
+            raise
+        self._sent += 1
+
+    def close(self) -> None:
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                try:
+                    self._smtp.close()
+                except Exception:
+                    pass
+            self._smtp = None
+
+
+def _is_transient(exc: Exception) -> bool:
+    if isinstance(exc, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in exc.recipients.values())
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return 400 <= exc.smtp_code < 500
+    return isinstance(exc, TRANSIENT)
+
+
+def _send_with_retry(conn: SmtpConnection, msg: EmailMessage, limiter: RateLimiter) -> tuple[bool, int, str]:
+    """Envía con reintentos y espera exponencial (SMTP_RETRIES, SMTP_BACKOFF_S) ante errores temporales."""
+    error = ""
+    for attempt in range(1, settings.SMTP_RETRIES + 2):
+        limiter.wait()
+        try:
+            conn.send(msg)
+            return True, attempt, ""
+        except SmtpUnavailable:
+            raise
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if not _is_transient(e) or attempt > settings.SMTP_RETRIES:
+                return False, attempt, error
+            time.sleep(settings.SMTP_BACKOFF_S * 2 ** (attempt - 1))
+    return False, settings.SMTP_RETRIES + 1, error
+
+
+def send_all(mails: List[dict]) -> dict:
+    """
+    Envía una tanda de correos ({'to', 'subject', 'body'}) sobre SMTP_POOL_SIZE conexiones
+    reutilizadas: cada hilo del pool mantiene su conexión abierta y va tomando correos de
+    la cola común, respetando el límite de envíos por segundo de la tanda. Si no se puede
+    abrir una conexión nueva, los correos pendientes se dan por fallidos sin reintentar.
+    Devuelve el resultado de cada correo (en el orden de entrada) y un resumen.
+    """
+    t0 = time.perf_counter()
+    stats = {"conexiones": 0}
+    results: List[Optional[dict]] = [None] * len(mails)
+    limiter = RateLimiter(settings.SMTP_RATE_PER_S)
+    unavailable: List[str] = []       # error de conexión que corta la tanda (si lo hubo)
+    queue: Queue = Queue()
+    for i, mail in enumerate(mails):
+        queue.put((i, mail))
+
+    def worker():
+        conn = SmtpConnection(stats)
+        try:
+            while True:
+                try:
+                    i, mail = queue.get_nowait()
+                except Empty:
+                    return
+                if unavailable:
+                    results[i] = {"index": i, "to": mail["to"], "enviado": False, "intentos": 0,
+                                  "error": unavailable[0]}
+                    continue
+                msg = build_message(mail["to"], mail["subject"], mail["body"], mail.get("from"))
+                try:
+                    ok, intentos, error = _send_with_retry(conn, msg, limiter)
+                except SmtpUnavailable as e:
+                    unavailable.append(str(e))
+                    ok, intentos, error = False, 1, str(e)
+                results[i] = {"index": i, "to": mail["to"], "enviado": ok, "intentos": intentos,
+                              **({"error": error} if error else {})}
+        finally:
+            conn.close()
+
+    n_threads = max(1, min(settings.SMTP_POOL_SIZE, len(mails)))
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(n_threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    enviados = sum(1 for r in results if r and r["enviado"])
+    return {
+        "resultados": results,
+        "resumen": {
+            "total": len(mails),
+            "enviados": enviados,
+            "fallidos": len(mails) - enviados,
+            "conexiones": stats["conexiones"],
+            "duracion_s": round(time.perf_counter() - t0, 3),
+        },
+    }
@@ -0,0 +1,130 @@
+import os, struct, time, zlib
+from typing import List, Optional
+from models.data import Block
+from settings import settings
+
+# Fichero de bloques: MAGIC + versión + zlib( nº bloques + por bloque: página, bbox, fuente, texto )
+MAGIC = b"PBLK"
+# Subir al cambiar extract_text_blocks (o el OCR): invalida los ficheros ya guardados
+BLOCKS_VERSION = 2
+_HEADER = struct.Struct("<4sH")
+_COUNT = struct.Struct("<I")
+# bbox y fuente en float64: el bloque leído del fichero es idéntico al recién parseado
+_BLOCK = struct.Struct("<Hddddd I")
+# True = no se leen los ficheros existentes: se vuelve a parsear y se reescriben
+REFRESH = False
+
+
+def encode_blocks(blocks: List[Block]) -> bytes:
+    parts = [_COUNT.pack(len(blocks))]
+    for b in blocks:
+        text = b.text.encode("utf-8")
+        parts.append(_BLOCK.pack(b.page, *b.bbox, b.font, len(text)))
+        parts.append(text)
+    return _HEADER.pack(MAGIC, BLOCKS_VERSION) + zlib.compress(b"".join(parts), 6)
+
+
+def decode_blocks(data: bytes) -> Optional[List[Block]]:
+    """Bloques del fichero; None si no es un fichero de bloques de esta versión."""
+    if len(data) < _HEADER.size:
+        return None
+    magic, version = _HEADER.unpack_from(data)
+    if magic != MAGIC or version != BLOCKS_VERSION:
+        return None
+    raw = zlib.decompress(data[_HEADER.size:])
+    (count,), off = _COUNT.unpack_from(raw), _COUNT.size
+    blocks = []
+    for _ in range(count):
+        page, x0, y0, x1, y1, font, n = _BLOCK.unpack_from(raw, off)
+        off += _BLOCK.size
+        blocks.append(Block(text=raw[off:off + n].decode("utf-8"), bbox=(x0, y0, x1, y1), font=font, page=page))
+        off += n
+    return blocks
+
+
+def _path(key: str) -> str:
+    return os.path.join(settings.BLOCK_CACHE_DIR, key[:2], f"{key}.blk")
+
+
+def load(key: str) -> Optional[List[Block]]:
+    try:
+        with open(_path(key), "rb") as f:
+            return decode_blocks(f.read())
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Fichero de bloques {key} ilegible, se vuelve a generar: {e}")
+        return None
+
+
+def save(key: str, blocks: List[Block]) -> None:
+    path = _path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(encode_blocks(blocks))
+    os.replace(tmp, path)
+    _maybe_prune()
+
+
+_last_prune = 0.0
+
+
+def _maybe_prune() -> None:
+    global _last_prune
+    now = time.time()
+    if now - _last_prune < settings.BLOCK_CACHE_PRUNE_S:
+        return
+    _last_prune = now
+    try:
+        prune()
+    except OSError as e:
+        print(f"No se pudo limpiar el directorio de bloques: {e}")
+
+
+def prune() -> int:
+    """
+    Borra los ficheros de bloques con más de BLOCK_CACHE_TTL_DAYS y, si el directorio
+    supera BLOCK_CACHE_MAX_MB, los más antiguos hasta quedar por debajo. Devuelve los borrados.
+    """
+    files = []
+    for dirpath, _, names in os.walk(settings.BLOCK_CACHE_DIR):
+        for name in names:
+            if not name.endswith(".blk"):
+                continue
+            path = os.path.join(dirpath, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue   # otro proceso lo borró entre walk y stat
+            files.append((st.st_mtime, st.st_size, path))
+    files.sort()
+
+    expired_at = time.time() - settings.BLOCK_CACHE_TTL_DAYS * 86400
+    over = sum(size for _, size, _ in files) - settings.BLOCK_CACHE_MAX_MB * 1024 * 1024
+    removed = 0
+    for mtime, size, path in files:
+        if mtime >= expired_at and (settings.BLOCK_CACHE_MAX_MB <= 0 or over <= 0):
+            break
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError:
+            pass
+        over -= size
+    return removed
+
+
+def cached_blocks(key: str, parse) -> List[Block]:
+    """Bloques guardados con esa clave o, si no hay, parse() y se guardan (si la caché está activa)."""
+    if not settings.BLOCK_CACHE:
+        return parse()
+    blocks = None if REFRESH else load(key)
+    if blocks is not None:
+        return blocks
+    blocks = parse()
+    try:
+        save(key, blocks)
+    except OSError as e:
+        print(f"No se pudo guardar el fichero de bloques {key}: {e}")
+    return blocks
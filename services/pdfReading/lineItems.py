@@ -0,0 +1,204 @@
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+from models.data import Block, LineItem
+from services.pdfReading.pdfDataExtraction import _build_lines, RX_MONEY, RX_TOTAL_MAIN, detect_currency
+
+# --- cabeceras de columna de la tabla de líneas (multi-idioma) ---
+COLUMN_HEADERS = {
+    "codigo":      re.compile(r'\b(?:CODE|C[OÓ]DIGO|CODICE|CODE\s+ARTICLE|ARTIKEL(?:NR)?|REF\.?)\b', re.I),
+    "descripcion": re.compile(r'\b(?:DESCRIPTION|DESCRIPCI[OÓ]N|DESCRIZIONE|BESCHREIBUNG|D[EÉ]SIGNATION|DESCRI[CÇ][AÃ]O|CONCEPTO)\b', re.I),
+    "cantidad":    re.compile(r'\b(?:QUANTITY|QTY|CANTIDAD|CANT\.|QUANTIT[AÀ]|QT[AÀ]|QUANTIT[EÉ]|MENGE|QUANTIDADE|UDS\.?|UNITS)\b', re.I),
+    "precio":      re.compile(r'\b(?:(?:UNIT\s+)?PRICE|PRECIO|PREZZO|PRIX|PREIS|PRE[CÇ]O)\b', re.I),
+    "importe":     re.compile(r'\b(?:AMOUNT|IMPORTE|IMPORTO|MONTANT|BETRAG|GESAMTPREIS|TOTAL(?:E)?)\b', re.I),
+}
+MIN_HEADER_COLUMNS = 3
+MAX_ROW_GAP = 60.0   # separación vertical (pt) que da por terminada la tabla
+RX_NUMBER = re.compile(r'\d{1,3}(?:[.,\s]\d{3})*(?:[.,]\d+)?|\d+(?:[.,]\d+)?')
+
+
+def parse_number(raw: str) -> Optional[float]:
+    """'1.234,50' / '1,234.50' / '10' / '1.000' -> float (None si no hay número)."""
+    m = RX_NUMBER.search(raw or "")
+    if not m:
+        return None
+    s = m.group(0).replace(" ", "")
+    if "," in s and "." in s:
+        dec = "," if s.rfind(",") > s.rfind(".") else "."
+        s = s.replace("." if dec == "," else ",", "").replace(dec, ".")
+    elif "," in s or "." in s:
+        sep = "," if "," in s else "."
+        head, _, tail = s.rpartition(sep)
+        # un separador seguido de exactamente 3 dígitos es de miles; si no, decimal
+        if len(tail) == 3:
+            s = s.replace(sep, "")
+        else:
+            s = head.replace(sep, "") + "." + tail
+    try:
+        return float(s)
+    except ValueError:
+        return None
+
+
+def _kind(text: str) -> Optional[str]:
+    kinds = [k for k, rx in COLUMN_HEADERS.items() if rx.search(text)]
+    return kinds[0] if len(kinds) == 1 else None
+
+
+def _header_columns(row: List[Block]) -> Optional[List[Tuple[str, Block]]]:
+    """Columnas de una fila si es una cabecera de tabla (cada bloque = una columna)."""
+    cols: List[Tuple[str, Block]] = []
+    seen = set()
+    for b in row:
+        kind = _kind(b.text)
+        # bloques sin cabecera, con varias juntas o repetidas no sirven para delimitar columnas
+        if kind is None or kind in seen:
+            continue
+        seen.add(kind)
+        cols.append((kind, b))
+    return cols if len(cols) >= MIN_HEADER_COLUMNS else None
+
+
+def _header_lines(b: Block) -> Optional[List[Optional[str]]]:
+    """
+    Cabecera fusionada por PyMuPDF en un único bloque (una línea por columna):
+    devuelve el tipo de columna de cada línea, por posición.
+    """
+    lines = [l.strip() for l in b.text.split("\n") if l.strip()]
+    kinds = [_kind(l) for l in lines]
+    found = [k for k in kinds if k]
+    if len(set(found)) >= MIN_HEADER_COLUMNS and len(set(found)) == len(found):
+        return kinds
+    return None
+
+
+def is_column_header(b: Block) -> bool:
+    """El bloque es (o contiene, si PyMuPDF la fusionó) una cabecera de columna de la tabla."""
+    return _kind(b.text) is not None or _header_lines(b) is not None
+
+
+def _column_ranges(cols: List[Tuple[str, Block]]) -> List[Tuple[str, float, float]]:
+    """Límites X de cada columna: punto medio del hueco entre cabeceras vecinas."""
+    cols = sorted(cols, key=lambda c: c[1].bbox[0])
+    ranges = []
+    for i, (kind, b) in enumerate(cols):
+        left = -float("inf") if i == 0 else (cols[i - 1][1].bbox[2] + b.bbox[0]) / 2
+        right = float("inf") if i == len(cols) - 1 else (b.bbox[2] + cols[i + 1][1].bbox[0]) / 2
+        ranges.append((kind, left, right))
+    return ranges
+
+
+def _cells(row: List[Block], ranges) -> Dict[str, str]:
+    cells: Dict[str, List[str]] = {}
+    for b in row:
+        xc = (b.bbox[0] + b.bbox[2]) / 2
+        for kind, left, right in ranges:
+            if left <= xc < right:
+                cells.setdefault(kind, []).append(b.text.strip())
+                break
+    return {k: " ".join(v) for k, v in cells.items()}
+
+
+def _amount(raw: Optional[str]) -> Optional[float]:
+    if not raw:
+        return None
+    m = RX_MONEY.search(raw)
+    return parse_number(m.group(0)) if m else parse_number(raw)
+
+
+def _item(cells: Dict[str, str], page: int) -> Optional[LineItem]:
+    cantidad = parse_number(cells.get("cantidad", ""))
+    importe = _amount(cells.get("importe"))
+    if cantidad is None and importe is None:
+        return None
+    return LineItem(
+        codigo=cells.get("codigo") or None,
+        descripcion=cells.get("descripcion") or None,
+        cantidad=cantidad,
+        precio=_amount(cells.get("precio")),
+        importe=importe,
+        pagina=page,
+    )
+
+
+def _append_description(items: List[LineItem], text: Optional[str], page: int) -> bool:
+    # descripción partida en varias filas: se une a la línea anterior
+    if not (items and text and items[-1].pagina == page):
+        return False
+    items[-1].descripcion = f"{items[-1].descripcion or ''} {text}".strip()
+    return True
+
+
+def _page_items(page_blocks: List[Block], page: int) -> List[LineItem]:
+    items: List[LineItem] = []
+    rows = _build_lines(page_blocks, overlap_min=0.55)
+    ranges = None      # cabecera en bloques separados: límites X por columna
+    kinds = None       # cabecera fusionada en un bloque: tipo de columna por línea
+    last_y = None
+    for row in rows:
+        if ranges is None and kinds is None:
+            cols = _header_columns(row)
+            if cols:
+                ranges = _column_ranges(cols)
+            else:
+                kinds = next((k for k in map(_header_lines, row) if k), None)
+            if ranges or kinds:
+                last_y = max(b.bbox[3] for b in row)
+            continue
+
+        top = min(b.bbox[1] for b in row)
+        row_text = " ".join(b.text for b in row)
+        if RX_TOTAL_MAIN.search(row_text) or top - last_y > MAX_ROW_GAP:
+            break
+
+        if ranges is not None:
+            cells = _cells(row, ranges)
+            item = _item(cells, page)
+            if item:
+                items.append(item)
+            elif not _append_description(items, cells.get("descripcion"), page):
+                continue
+        else:
+            matched = False
+            for b in row:
+                lines = [l.strip() for l in b.text.split("\n") if l.strip()]
+                if len(lines) == len(kinds):
+                    item = _item({k: v for k, v in zip(kinds, lines) if k}, page)
+                    if item:
+                        items.append(item)
+                        matched = True
+                elif len(lines) == 1 and _append_description(items, lines[0], page):
+                    matched = True
+            if not matched:
+                continue
+        last_y = max(b.bbox[3] for b in row)
+    return items
+
+
+def extract_line_items(blocks: List[Block], stop: Optional[Callable[[], bool]] = None) -> List[LineItem]:
+    """
+    Localiza la tabla de líneas una sola vez: fila de cabecera (código, descripción,
+    cantidad, precio, importe) → columnas → filas tipadas hasta la línea de TOTAL o un
+    salto vertical grande. Si la tabla sigue en otra página con su cabecera repetida,
+    se continúa allí. stop() se consulta antes de cada página (presupuesto de tiempo).
+    """
+    items: List[LineItem] = []
+    for page in sorted({b.page for b in blocks}):
+        if stop is not None and stop():
+            break
+        items += _page_items([b for b in blocks if b.page == page], page)
+    return items
+
+
+def line_items_units(items: List[LineItem]) -> Optional[int]:
+    qty = [i.cantidad for i in items if i.cantidad is not None]
+    return int(round(sum(qty))) if qty else None
+
+
+def line_items_total(items: List[LineItem], blocks: List[Block]) -> Tuple[str, str]:
+    """Suma de importes de la tabla (texto '1234.50') y moneda detectada en esas páginas."""
+    amounts = [i.importe for i in items if i.importe is not None]
+    if not amounts:
+        return "", ""
+    pages = {i.pagina for i in items}
+    cur = detect_currency(" ".join(b.text for b in blocks if b.page in pages))
+    return f"{sum(amounts):.2f}", cur
@@ -1,4 +1,5 @@
-import re, math, unicodedata
+import re, math, time, unicodedata
+from functools import partial
 from typing import List, Optional, Tuple, Dict
 from dateutil import parser as dtp
 from models.data import Block, ExtractResponse
@@ -9,7 +10,7 @@ PROFORMA_LABEL = r'(?:pro[\s\-]?forma(?:\s*invoice)?|factura\s*proforma|fattura\
 ORDER_LABEL = r'(?:order|pedido|orden|commande|ordine|auftrag|auftragsnummer|bestellnummer|ORDER N\.)'
 NUM_LABEL      = r'(?:n[ºo\.]*|no\.?|num\.?|nr\.?|number|#|NO\.)'
 
-RX_ID_GENERIC       = re.compile(r'\b[A-Z0-9][A-Z0-9\-\/\.]{4,}\b')
+RX_ID_GENERIC       = re.compile(r'\b[A-Z0-9][A-Z0-9\-\/\.]{4,40}\b')
 RX_REF_HASH = re.compile(r'(?<!\w)(#?[A-Z]{2}\d{2,7})(?!\w)', re.I)
 RX_REF_YYYY_SLASH = re.compile(r'\b(20\d{2}\/\d{2,7})\b')
 RX_CURRENCY_TOKEN = re.compile(r'\b(EUR|USD|GBP|EURO|DOLLAR|DÓLAR|POUND)\b|[€$£]', re.I)
@@ -22,7 +23,7 @@ RX_TOTAL_MAIN   = re.compile(r'\bTOTAL(?:E)?|GESAMT\b', re.I)
 RX_TOTAL_BADCTX = re.compile(
     r'\b('
     r'TAX|TAXE|TAXES|TVA|IVA|IGIC|'
-    r'IMPUESTOS|IMPOSTOS|IMPOSTI|IMPOSTO|TASSE|TASSA|TAXA'
+    r'IMPUESTOS|IMPOSTOS|IMPOSTI|IMPOSTO|TASSE|TASSA|TAXA|'
     r'STEUER|STEUERN|MWST|UST|BEMESSUNGSGRUNDLAG(?:E)?'
     r')\b',
     re.I
@@ -47,9 +48,13 @@ UNIT_NUM_RX         = re.compile(
 )
 
 RX_ID_TOKEN = re.compile(r'\b([A-Z]*\d{3,}|[A-Z0-9][A-Z0-9\-\/\.]{1,})\b')
-_ID                 = r'([A-Z]?\d[\w\-\/\.]{2,}|[A-Z0-9][A-Z0-9\-\/\.]{3,})'
-RX_EMAIL            = re.compile(r'([A-Z0-9._%+\-]+@[A-Z0-9.\-]+\.[A-Z]{2,})', re.I)
-RX_PHONE            = re.compile(r'(\+?\d[\d\s\-\(\)\.]{7,})')
+# Repeticiones acotadas: un identificador, email o teléfono reales nunca pasan de estas
+# longitudes y así el peor caso (texto largo sin coincidencia) no se dispara
+_ID                 = r'([A-Z]?\d[\w\-\/\.]{2,40}|[A-Z0-9][A-Z0-9\-\/\.]{3,40})'
+RX_EMAIL            = re.compile(r'([A-Z0-9._%+\-]{1,64}@[A-Z0-9.\-]{1,253}\.[A-Z]{2,24})', re.I)
+RX_PHONE            = re.compile(r'(\+?\d[\d\s\-\(\)\.]{7,24})')
+MAX_LINE_CHARS      = 300      # las líneas de un panel más largas se recortan antes de buscar
+ORDER_WINDOW_CHARS  = 120      # texto analizado a partir de cada etiqueta de pedido
 HDR_SHIP            = re.compile(
     r'\b(?:GOODS\s+DELIVERY\s+ADDRESS|DELIVERY\s+ADDRESS|ADRESSE\s+LIVRAISON|'
     r'DIRECCIÓN\s+DE\s+ENTREGA|INDIRIZZO\s+DI\s+CONSEGNA)\b', re.I)
@@ -75,6 +80,19 @@ COUNTRIES = [
     r'BOSNIA-HERZEGOVINA|BOSNIA Y HERZEGOVINA|BOSNIE-HERZÉGOVINE'
 ]
 RX_COUNTRY          = re.compile(r'\b(?:' + '|'.join(COUNTRIES) + r')\b', re.I)
+
+def normalize_country(country: str) -> str:
+    """Nombre de país tal como se guarda en 'pais' (FRANCE -> FRANCIA, SPAIN -> ESPAÑA...)."""
+    return (country.upper()
+            .replace('FRANCE', 'FRANCIA')
+            .replace('ITALY', 'ITALIA')
+            .replace('SPAIN', 'ESPAÑA')
+            .replace('ROUMANIE', 'RUMANIA')
+            .replace('BELARUS', 'BIELORRUSIA'))
+
+def page_countries(text: str) -> set:
+    """Países que aparecen en el texto, normalizados como 'pais'."""
+    return {normalize_country(m.group(0)) for m in RX_COUNTRY.finditer(text)}
 HEADERS = [
     "GOODS DELIVERY ADDRESS",
     "ADRESSE LIVRAISON",
@@ -106,6 +124,62 @@ def _norm(s: str) -> str:
     s = re.sub(r'\s+', ' ', s)                 
     return s.strip()
 
+class TextView:
+    """
+    Vista de texto de un documento: calcula una sola vez (y bajo demanda) las
+    variantes normalizadas de cada bloque y el texto unido por página, para que
+    todos los extractores compartan el mismo trabajo.
+    """
+
+    def __init__(self, blocks: List[Block]):
+        self.blocks = blocks
+        self._norm: Dict[int, str] = {}
+        self._currency: Dict[int, str] = {}
+        self._pages: Dict[int, str] = {}
+        self._text_all: Optional[str] = None
+        self._nfkc_all: Optional[str] = None
+        self._nfkc_lines: Optional[List[str]] = None
+
+    def norm(self, b: Block) -> str:
+        """Texto sin acentos y con espacios colapsados (_norm)."""
+        k = id(b)
+        if k not in self._norm:
+            self._norm[k] = _norm(b.text)
+        return self._norm[k]
+
+    def page_currency(self, page: int) -> str:
+        """Moneda detectada en el texto de la página (detect_currency ya pasa a mayúsculas)."""
+        if page not in self._currency:
+            self._currency[page] = detect_currency(self.page_text(page))
+        return self._currency[page]
+
+    def page_text(self, page: int) -> str:
+        if not self._pages:
+            parts: Dict[int, List[str]] = {}
+            for b in self.blocks:
+                parts.setdefault(b.page, []).append(b.text or "")
+            self._pages = {p: " ".join(t) for p, t in parts.items()}
+        return self._pages.get(page, "")
+
+    @property
+    def text_all(self) -> str:
+        if self._text_all is None:
+            self._text_all = "\n".join(b.text for b in self.blocks)
+        return self._text_all
+
+    @property
+    def nfkc_all(self) -> str:
+        """Texto completo con _norm_text (NFKC, º, espacios)."""
+        if self._nfkc_all is None:
+            self._nfkc_all = _norm_text(self.text_all)
+        return self._nfkc_all
+
+    @property
+    def nfkc_lines(self) -> List[str]:
+        if self._nfkc_lines is None:
+            self._nfkc_lines = [l.strip() for l in self.nfkc_all.splitlines() if l.strip()]
+        return self._nfkc_lines
+
 def normalize_phone(raw: str) -> str:
     raw = raw.strip()
     plus = '+' if raw.strip().startswith('+') else ''
@@ -263,6 +337,7 @@ def extract_shipping_fields_from_text(lines: List[str]) -> Dict[str, str]:
     country = ""
     email = ""
     phone = ""
+    lines = [ln[:MAX_LINE_CHARS] for ln in lines]
 
     # 1) email
     for ln in lines:
@@ -290,13 +365,7 @@ def extract_shipping_fields_from_text(lines: List[str]) -> Dict[str, str]:
     for ln in lines:
         for m in RX_COUNTRY.finditer(ln):
             country = m.group(0).upper()
-    
-    country = (country
-                .replace('FRANCE', 'FRANCIA')
-                .replace('ITALY', 'ITALIA')
-                .replace('SPAIN', 'ESPAÑA')
-                .replace('ROUMANIE', 'RUMANIA')
-                .replace('BELARUS', 'BIELORRUSIA'))
+    country = normalize_country(country)
 
     # 4) nombre principal
     for ln in lines:
@@ -324,9 +393,10 @@ def extract_shipping_fields_from_text(lines: List[str]) -> Dict[str, str]:
         "Envio_Email": email,
     }
 
-def extract_shipping_fields(blocks: List[Block], ref_pedido: str = "") -> Dict[str, str]:
+def extract_shipping_fields(blocks: List[Block], ref_pedido: str = "", header_rx=None,
+                            view: Optional[TextView] = None) -> Dict[str, str]:
     """Extrae campos de envío + agente (que está en la línea de la referencia)."""
-    panel = get_shipping_panel_blocks(blocks)
+    panel = get_shipping_panel_blocks(blocks, header_rx, view)
     lines = lines_from_blocks(panel)
     
     fields = extract_shipping_fields_from_text(lines)
@@ -387,7 +457,7 @@ def same_line_right_value(anchor_rx, blocks: List[Block], max_dx: int | None = N
         m = RX_ID_TOKEN.search(text)
 
         # --- Fallback especial para PROFORMA: aceptar 1–6 dígitos ---
-        if not m and anchor_rx is ANCH_PROFORMA:
+        if not m and anchor_rx in PROFORMA_ANCHORS:
             m = re.search(r'\b(\d{1,6})\b', text)
 
         if m and m.group(1):
@@ -407,7 +477,7 @@ def same_line_right_value(anchor_rx, blocks: List[Block], max_dx: int | None = N
         m = RX_ID_TOKEN.search(text)
 
         # mismo fallback para PROFORMA
-        if not m and anchor_rx is ANCH_PROFORMA:
+        if not m and anchor_rx in PROFORMA_ANCHORS:
             m = re.search(r'\b(\d{1,6})\b', text)
 
         if m and m.group(1):
@@ -424,28 +494,35 @@ def to_int_or_none(value) -> int | None:
     except ValueError:
         return None
 
-def find_shipping_header_block(blocks):
-    cands = [b for b in blocks if HEADER_RX.search(_norm(b.text))]
+def find_shipping_header_block(blocks, header_rx=None, view: Optional[TextView] = None):
+    # Primero las cabeceras del idioma del documento; si no aparece ninguna, todas
+    view = view or TextView(blocks)
+    cands = []
+    if header_rx is not None:
+        cands = [b for b in blocks if header_rx.search(view.norm(b))]
+    if not cands:
+        cands = [b for b in blocks if HEADER_RX.search(view.norm(b))]
     if not cands:
         return None
     return sorted(cands, key=lambda b: (b.page, b.bbox[1], b.bbox[0]))[0]
 
-def get_shipping_panel_blocks(blocks: List[Block]) -> List[Block]:
-    hdr = find_shipping_header_block(blocks)
+def get_shipping_panel_blocks(blocks: List[Block], header_rx=None, view: Optional[TextView] = None) -> List[Block]:
+    hdr = find_shipping_header_block(blocks, header_rx, view)
     if not hdr:
         return []
     split_x = hdr.bbox[0]
     return [b for b in blocks if b.page == hdr.page and b.bbox[0] >= split_x - 5]
 
-def get_billing_panel_blocks(blocks):
-    hdr = find_shipping_header_block(blocks)
+def get_billing_panel_blocks(blocks, header_rx=None, view: Optional[TextView] = None):
+    view = view or TextView(blocks)
+    hdr = find_shipping_header_block(blocks, header_rx, view)
     if not hdr:
         return []
     split_x = hdr.bbox[0]
     y_min   = hdr.bbox[1] - 6        # margen pequeño por encima del borde del recuadro
     # Opcional: detecta “OBSERVACIONES” para cortar por abajo si existe
     rx_obs  = re.compile(r'\bOBSERVACIONES\b', re.I)
-    obs = [b for b in blocks if b.page == hdr.page and rx_obs.search(_norm(b.text))]
+    obs = [b for b in blocks if b.page == hdr.page and rx_obs.search(view.norm(b))]
     y_max = min([b.bbox[1] for b in obs], default=float('inf'))
 
     left = [
@@ -465,8 +542,8 @@ EXCLUDE_LEFT_LABELS = re.compile(
 )
 EXCLUDE_LEGAL = re.compile(r'Inscrita en Registro mercantil', re.I)
 
-def extract_billing_name(blocks: List[Block]) -> str:
-    panel = get_billing_panel_blocks(blocks)
+def extract_billing_name(blocks: List[Block], header_rx=None, view: Optional[TextView] = None) -> str:
+    panel = get_billing_panel_blocks(blocks, header_rx, view)
     lines = lines_from_blocks(panel)
 
     for ln in lines:
@@ -548,16 +625,20 @@ def detect_currency(text: Optional[str]) -> str:
     if 'GBP' in t or '£' in t:  return 'GBP'
     return ''
 
-def find_total_amount(blocks: List[Block]) -> Tuple[str, str, float]:
+# Importe en la misma línea que TOTAL, como mucho a 80 caracteres (sin cruzar líneas)
+RX_TOTAL_INLINE = re.compile(r'\b(?:TOTAL(?:E)?|GESAMT)\b[^\n]{0,80}?(' + RX_MONEY.pattern + r')', re.I)
+
+def find_total_amount(blocks: List[Block], total_rx=None, fallback: bool = True,
+                      view: Optional[TextView] = None) -> Tuple[str, str, float]:
+    # total_rx solo acota las etiquetas TOTAL (idioma); los impuestos se excluyen siempre con RX_TOTAL_BADCTX
+    total_rx = total_rx or RX_TOTAL_MAIN
+    view = view or TextView(blocks)
+
     # --- 1) INTENTO ESPECÍFICO: "TOTAL EUR / TOTALE EUR / GESAMT EUR" ---
 
     def same_row_amount(base: Block) -> Tuple[Optional[str], Optional[str]]:
         # Busca importe en la MISMA fila visual que 'base'
-        m_inline = re.search(
-            r'\b(?:TOTAL(?:E)?|GESAMT)\b.*?(' + RX_MONEY.pattern + r')',
-            base.text,
-            re.I
-        )
+        m_inline = RX_TOTAL_INLINE.search(base.text)
         if m_inline:
             raw = m_inline.group(1)
             cur = detect_currency(base.text) or detect_currency(raw)
@@ -600,7 +681,7 @@ def find_total_amount(blocks: List[Block]) -> Tuple[str, str, float]:
 
     # --- 2) LÓGICA GENÉRICA (tu código actual, casi igual) ---
 
-    cands = [b for b in blocks if RX_TOTAL_MAIN.search(b.text)
+    cands = [b for b in blocks if total_rx.search(b.text)
              and not RX_TOTAL_BADCTX.search(b.text)]
     if not cands:
         return "", "", 0.0
@@ -615,17 +696,21 @@ def find_total_amount(blocks: List[Block]) -> Tuple[str, str, float]:
         val = cleanup_amount(raw)
         if val and float(val) > 0.0:
             if not cur:
-                page_text = " ".join((x.text or "") for x in blocks if x.page == base.page)
-                cur = detect_currency(page_text)
+                cur = view.page_currency(base.page)
             return raw, (cur or ''), 0.92
         if best_zero is None:
-            page_text = " ".join((x.text or "") for x in blocks if x.page == base.page)
-            cur = detect_currency(base.text) or detect_currency(page_text) or ''
+            cur = detect_currency(base.text) or view.page_currency(base.page) or ''
             best_zero = (raw, cur)
 
     if best_zero:
         return best_zero[0], best_zero[1], 0.80
 
+    if not fallback:
+        return "", "", 0.0
+    return largest_amount(blocks)
+
+
+def largest_amount(blocks: List[Block]) -> Tuple[str, str, float]:
     # Fallback: mayor importe global
     mx = []
     for b in blocks:
@@ -646,31 +731,34 @@ def find_total_amount(blocks: List[Block]) -> Tuple[str, str, float]:
 
 
 # --- Busca el Nº de pedido en todo el texto plano ---
-def find_order_number(blocks) -> str:
+def find_order_number(blocks, label: str | None = None, view: Optional[TextView] = None) -> str:
     """
     Busca el Nº de pedido en texto plano, cubriendo:
     - 'Nº ORDINE 284128'  /  'N. COMMANDE 349911'  /  'ORDER N. 261378'
     - 'ORDINE 284128' (sin 'N.')
     - etiqueta y número separados por salto de línea (1–2 líneas)
     """
-    txt = _norm_text("\n".join(b.text for b in blocks))
-    lines = [l.strip() for l in txt.splitlines() if l.strip()]
+    view = view or TextView(blocks)
+    txt = view.nfkc_all
+    lines = view.nfkc_lines
 
-    LABEL = r'(?:ordine|order|commande|pedido|orden|auftrag|auftragsnummer|bestellnummer)'
+    LABEL = label or r'(?:ordine|order|commande|pedido|orden|auftrag|auftragsnummer|bestellnummer)'
     NLAB  = r'(?:N[ºO\.]*|NO\.?|NUM\.?|NR\.?|NUMBER|#)?'
     SEP   = r'[\s:\-·\.]*'                         
 
-    m = re.search(rf'\b{NLAB}\s*{LABEL}\b{SEP}{_ID}', txt, re.I)
-    if m:
-        return m.group(1)
-
-    m = re.search(rf'\b{LABEL}\b{SEP}{NLAB}?{SEP}{_ID}', txt, re.I)
-    if m:
-        return m.group(1)
-
+    # Solo se analiza una ventana alrededor de cada etiqueta, no todo el documento
     lab_rx = re.compile(rf'\b{LABEL}\b', re.I)
+    windows = [(max(0, m.start() - 12), m.end() + ORDER_WINDOW_CHARS) for m in lab_rx.finditer(txt)]
+    for rx in (re.compile(rf'\b{NLAB}\s*{LABEL}\b{SEP}{_ID}', re.I),
+               re.compile(rf'\b{LABEL}\b{SEP}{NLAB}?{SEP}{_ID}', re.I)):
+        for start, end in windows:
+            m = rx.search(txt, start, end)
+            if m:
+                return m.group(1)
+
     id_rx  = re.compile(rf'^{SEP}{_ID}', re.I) 
     for i, ln in enumerate(lines):
+        ln = ln[:MAX_LINE_CHARS]
         if lab_rx.search(ln):
             # mismo renglón
             mm = re.search(_ID, ln, re.I)
@@ -715,17 +803,18 @@ LABEL = r'(?:ordine|order|commande|pedido|orden|auftrag|auftragsnummer|bestellnu
 NLAB  = r'(?:n[º°o\.]*|no\.?|num\.?|number|#)?'      
 ORDER_TOKEN = re.compile(r'\b([A-Z]?\d{4,9})\b')
 
-def find_order_number_from_lines(blocks: List[Block]) -> str:
+def find_order_number_from_lines(blocks: List[Block], label: str | None = None) -> str:
     """Detecta Nº de pedido mirando SOLO la misma fila visual que la etiqueta."""
+    lab = label or LABEL
     lines = _build_lines(blocks, overlap_min=0.55)
     # Recorre filas de arriba a abajo
     for L in lines:
         line_text = " ".join(b.text for b in L)
-        if re.search(fr'\b{NLAB}\s*{LABEL}\b', line_text, re.I) or re.search(fr'\b{LABEL}\b\s*{NLAB}', line_text, re.I):
+        if re.search(fr'\b{NLAB}\s*{lab}\b', line_text, re.I) or re.search(fr'\b{lab}\b\s*{NLAB}', line_text, re.I):
             # busca el primer bloque donde aparece la etiqueta
             anchor_idx = None
             for i, b in enumerate(L):
-                if re.search(fr'\b{LABEL}\b', b.text, re.I):
+                if re.search(fr'\b{lab}\b', b.text, re.I):
                     anchor_idx = i; break
             if anchor_idx is None:
                 continue
@@ -747,49 +836,273 @@ def find_order_number_from_lines(blocks: List[Block]) -> str:
                         return m2.group(1)
     return ""
 
-# --- extractor principal ---
-def extract_fields_from_blocks(blocks: List[Block]) -> ExtractResponse:
-    text_all = "\n".join(b.text for b in blocks)
+# --- anchors por idioma ---
+# Subconjunto del vocabulario de anchors para cada idioma que sabe detectar /extract.
+# Los extractores prueban primero el subconjunto del idioma del documento y solo
+# si no encuentran nada vuelven al conjunto completo (todos los idiomas).
+ANCHOR_VOCAB = {
+    "es": {"proforma": [r'factura\s*proforma', r'pro[\s\-]?forma'],
+           "order": ["pedido", "orden"],
+           "headers": ["DIRECCIÓN ENVÍO MERCANCÍA", "DIRECCION ENVIO MERCANCIA"],
+           "total": ["TOTAL"]},
+    "en": {"proforma": [r'pro[\s\-]?forma(?:\s*invoice)?'],
+           "order": ["order"],
+           "headers": ["GOODS DELIVERY ADDRESS"],
+           "total": ["TOTAL"]},
+    "fr": {"proforma": [r'pro[\s\-]?forma(?:\s*invoice)?'],
+           "order": ["commande"],
+           "headers": ["ADRESSE LIVRAISON"],
+           "total": ["TOTAL"]},
+    "it": {"proforma": [r'fattura\s*proforma', r'pro[\s\-]?forma'],
+           "order": ["ordine"],
+           "headers": ["INDIRIZZO DI CONSEGNA"],
+           "total": ["TOTALE?"]},
+    "de": {"proforma": [r'pro[\s\-]?forma(?:\s*invoice)?'],
+           "order": ["auftrag", "auftragsnummer", "bestellnummer"],
+           "headers": ["LIEFERADRESSE"],
+           "total": ["GESAMT", "TOTAL"]},
+    "pt": {"proforma": [r'pro[\s\-]?forma(?:\s*invoice)?'],
+           "order": ["pedido"],
+           "headers": [],
+           "total": ["TOTAL"]},
+}
+
+class LangAnchors:
+    """Anchors compilados de un idioma (None = sin vocabulario propio → conjunto completo)."""
+    def __init__(self, vocab: Dict[str, List[str]]):
+        self.proforma = re.compile(
+            r'\b(?:' + '|'.join(vocab["proforma"]) + r')\b'
+            r'(?:\s*(?:n[º°o\.]*|no\.?|nr\.?|num\.?|number|#|NO\.))?',
+            re.I
+        ) if vocab["proforma"] else None
+        self.order = (r'(?:' + '|'.join(vocab["order"]) + r')') if vocab["order"] else None
+        self.header_rx = re.compile(
+            r'(?:' + '|'.join([re.sub(r'\s+', r'\\s+', _deaccent(h)) for h in vocab["headers"]]) + r')',
+            re.I
+        ) if vocab["headers"] else None
+        # Solo etiquetas TOTAL: la exclusión de impuestos es siempre la global (RX_TOTAL_BADCTX)
+        self.total_rx = re.compile(r'\b(?:' + '|'.join(vocab["total"]) + r')\b', re.I) if vocab["total"] else None
+
+LANG_ANCHORS: Dict[str, LangAnchors] = {lang: LangAnchors(v) for lang, v in ANCHOR_VOCAB.items()}
+PROFORMA_ANCHORS = {ANCH_PROFORMA} | {a.proforma for a in LANG_ANCHORS.values() if a.proforma is not None}
 
+def anchors_for(lang: Optional[str]) -> Optional[LangAnchors]:
+    return LANG_ANCHORS.get((lang or "").lower())
+
+def language_sample(blocks: List[Block], max_chars: int = 1500) -> str:
+    """
+    Muestra acotada del texto del documento para detectar el idioma: bloques con
+    mayoría de letras, en orden de lectura, sin el pie legal (siempre en español).
+    """
+    parts, total = [], 0
+    for b in blocks:
+        t = (b.text or "").strip()
+        if len(t) < 12 or EXCLUDE_LEGAL.search(t):
+            continue
+        letters = sum(c.isalpha() for c in t)
+        if letters < len(t) * 0.6:
+            continue
+        parts.append(t)
+        total += len(t)
+        if total >= max_chars:
+            break
+    return "\n".join(parts)[:max_chars]
+
+# --- extractores por grupo de campos ---
+# Cada extractor recibe el contexto del documento y devuelve un dict con sus valores
+# (y su confianza en "_c" si cuenta para 'confidence'). Las dependencias entre
+# extractores se resuelven bajo demanda con ctx.get(): el agente necesita la
+# referencia de pedido y el código de cliente sale del nombre del panel de cliente.
+class DocumentContext:
+    def __init__(self, blocks: List[Block], lang: Optional[str] = None):
+        self.blocks = blocks
+        self.lang = lang
+        self.anchors = anchors_for(lang)
+        self.view = TextView(blocks)
+        self._results: Dict[str, dict] = {}
+        # Presupuestos de tiempo: documento completo y cada extractor
+        budget = settings.EXTRACT_BUDGET_MS / 1000
+        self.deadline = time.perf_counter() + budget if budget > 0 else None
+        self.budget_exceeded: List[dict] = []
+        self._started: List[float] = []
+        # Dependencias vistas en ctx.get(): grupo -> grupos que se calcularon a partir de él
+        self._running: List[str] = []
+        self._dependents: Dict[str, set] = {}
+
+    @property
+    def text_all(self) -> str:
+        return self.view.text_all
+
+    @property
+    def header_rx(self):
+        return self.anchors.header_rx if self.anchors else None
+
+    def get(self, group: str) -> dict:
+        if self._running:
+            self._dependents.setdefault(group, set()).add(self._running[-1])
+        if group not in self._results:
+            if self.expired():
+                # Sin tiempo para este grupo: campos vacíos en lugar de seguir ocupando el worker
+                self._results[group] = _empty_result(group)
+                self.budget_exceeded.append({"grupo": group, "motivo": "documento"})
+                return self._results[group]
+            t0 = time.perf_counter()
+            self._started.append(t0)
+            self._running.append(group)
+            try:
+                self._results[group] = EXTRACTORS[group](self)
+            finally:
+                self._started.pop()
+                self._running.pop()
+            ms = (time.perf_counter() - t0) * 1000
+            if settings.EXTRACTOR_BUDGET_MS > 0 and ms > settings.EXTRACTOR_BUDGET_MS:
+                self.budget_exceeded.append({"grupo": group, "motivo": "extractor", "ms": round(ms, 1)})
+        return self._results[group]
+
+    def expired(self) -> bool:
+        return self.deadline is not None and time.perf_counter() > self.deadline
+
+    def degrade(self) -> bool:
+        """True si el extractor en curso debe saltarse sus estrategias caras restantes."""
+        if self.expired():
+            return True
+        if not self._started or settings.EXTRACTOR_BUDGET_MS <= 0:
+            return False
+        return (time.perf_counter() - self._started[-1]) * 1000 > settings.EXTRACTOR_BUDGET_MS
+
+    def evaluated(self) -> List[str]:
+        return list(self._results)
+
+    def adopt(self, other: "DocumentContext", groups: List[str]) -> None:
+        """
+        Sustituye los resultados de esos grupos por los de otro contexto (p. ej. con bloques
+        OCR) y descarta los que se calcularon a partir de ellos: se recalculan al pedirlos.
+        """
+        stale, pending = set(), list(groups)
+        while pending:
+            for dep in self._dependents.pop(pending.pop(), ()):
+                if dep not in stale:
+                    stale.add(dep)
+                    pending.append(dep)
+        for group in groups:
+            self._results[group] = other.get(group)
+        for group in stale - set(groups):
+            self._results.pop(group, None)
+
+def _empty_result(group: str) -> dict:
+    """Resultado de un grupo que no llegó a ejecutarse: valores por defecto y confianza 0."""
+    res = {f: ExtractResponse.model_fields[f].default for f, g in FIELD_GROUPS.items() if g == group}
+    if group in SCORED_GROUPS:
+        res["_c"] = 0.0
+    return res
+
+def _extract_proforma(ctx: DocumentContext) -> dict:
     # --- Nº de proforma ---
-    proforma = same_line_right_value(ANCH_PROFORMA, blocks) or ""
-    c1 = 0.9 if proforma else 0.0
+    proforma = ""
+    if ctx.anchors and ctx.anchors.proforma is not None:
+        proforma = same_line_right_value(ctx.anchors.proforma, ctx.blocks) or ""
+    if not proforma and not ctx.degrade():
+        proforma = same_line_right_value(ANCH_PROFORMA, ctx.blocks) or ""
     print("N PROFORMA:", proforma)
+    return {"Numero_proforma": to_int_or_none(proforma), "_c": 0.9 if proforma else 0.0}
 
+def _extract_pedido(ctx: DocumentContext) -> dict:
     #--- Nº de pedido ---
-    pedido = find_order_number_from_lines(blocks)
-    if not pedido:
-        pedido = find_order_number(blocks)
-    c2 = 0.9 if pedido else 0.0
+    # Cada estrategia prueba primero el vocabulario del idioma y luego el completo
+    pedido = ""
+    finders = (find_order_number_from_lines, partial(find_order_number, view=ctx.view))
+    for finder in finders:
+        if ctx.degrade():
+            break
+        if ctx.anchors and ctx.anchors.order:
+            pedido = finder(ctx.blocks, ctx.anchors.order)
+        if not pedido:
+            pedido = finder(ctx.blocks)
+        if pedido:
+            break
     print("N PEDIDO:", pedido)
+    return {"Numero_de_pedido": to_int_or_none(pedido), "_c": 0.9 if pedido else 0.0}
 
+def _extract_referencia(ctx: DocumentContext) -> dict:
     #--- Referencia de pedido ---
-    ref = ""
-    mref = RX_REF_YYYY_SLASH.search(text_all) or RX_REF_HASH.search(text_all)
+    mref = RX_REF_YYYY_SLASH.search(ctx.text_all) or RX_REF_HASH.search(ctx.text_all)
     if mref: ref, c3 = mref.group(1), 0.9
     else:    ref, c3 = "", 0.0
     print("REF PEDIDO:", ref)
+    return {"Referencia_de_pedido": ref, "_c": c3}
 
-    #--- Agente ---
-    agente = extract_agent_from_blocks(blocks, ref)
+def _extract_agente(ctx: DocumentContext) -> dict:
+    #--- Agente (misma fila que la referencia) ---
+    ref = ctx.get("referencia")["Referencia_de_pedido"]
+    agente = extract_agent_from_blocks(ctx.blocks, ref or "")
     print("AGENTE:", agente)
+    return {"agente": agente}
 
+def _extract_importe(ctx: DocumentContext) -> dict:
     # --- Importe total ---
-    importe_raw, c5 = "", 0.0
-    importe_raw, moneda_iso, c5 = find_total_amount(blocks)
+    importe_raw, moneda_iso, c5 = "", "", 0.0
+    if ctx.anchors and ctx.anchors.total_rx is not None:
+        importe_raw, moneda_iso, c5 = find_total_amount(ctx.blocks, ctx.anchors.total_rx, fallback=False, view=ctx.view)
+    if not importe_raw:
+        importe_raw, moneda_iso, c5 = find_total_amount(ctx.blocks, fallback=False, view=ctx.view)
+    if not importe_raw and not ctx.degrade():
+        # Sin TOTAL utilizable: suma de la tabla de líneas y, si no hay tabla, mayor importe global
+        from services.pdfReading.lineItems import line_items_total
+        importe_raw, moneda_iso = line_items_total(ctx.get("lineas")["lineas"] or [], ctx.blocks)
+        c5 = 0.70 if importe_raw else 0.0
+    if not importe_raw and not ctx.degrade():
+        importe_raw, moneda_iso, c5 = largest_amount(ctx.blocks)
     importe = cleanup_amount(importe_raw or "")
     print("IMPORTE TOTAL:", importe_raw, "->", importe)
+    return {"Importe": float(importe) if importe else None, "Moneda": moneda_iso, "_c": c5}
+
+def _cached_envio(ctx: DocumentContext) -> Optional[dict]:
+    # Cliente conocido (por el código del panel de facturación) y coherente con el documento
+    from services.customers.customerDirectory import get_directory, consistent
 
-    # --- Información del panel de envío ---
-    envio_fields = extract_shipping_fields(blocks)
+    codigo = ctx.get("cliente")["Codigo_de_cliente"]
+    if not codigo:
+        return None
+    try:
+        entry = get_directory().get(codigo)
+    except Exception as e:
+        print(f"Directorio de clientes no disponible: {e}")
+        return None
+    if not entry:
+        return None
+    hdr = find_shipping_header_block(ctx.blocks, ctx.header_rx, ctx.view)
+    page = hdr.page if hdr else ctx.blocks[0].page
+    if not consistent(entry, ctx.view.page_text(page)):
+        return None
+    return {"pais": entry["pais"] or "", "telefono": entry["telefono"] or "", "email": entry["email"] or "",
+            "_directorio": True}
+
+def _extract_envio(ctx: DocumentContext) -> dict:
+    # --- Información del panel de envío (del directorio de clientes si ya lo conocemos) ---
+    if settings.CUSTOMER_DIRECTORY and ctx.blocks:
+        cached = _cached_envio(ctx)
+        if cached:
+            print("ENVÍO (directorio):", cached)
+            return cached
+
+    envio_fields = extract_shipping_fields(ctx.blocks, header_rx=ctx.header_rx, view=ctx.view)
     print("ENVÍO:", envio_fields)
+    return {
+        "pais": envio_fields["Envio_Pais"],
+        "telefono": envio_fields["Envio_Telefono"],
+        "email": envio_fields["Envio_Email"],
+    }
 
+def _extract_cliente(ctx: DocumentContext) -> dict:
     # --- Información del panel de cliente ---
-    nombre_cliente = extract_billing_name(blocks)
+    nombre_cliente = extract_billing_name(ctx.blocks, ctx.header_rx, ctx.view)
     codigo_cliente, nombre_cliente = split_nombre_cliente(nombre_cliente)
     print("NOMBRE CLIENTE:", nombre_cliente)
+    return {"Nombre_de_cliente": nombre_cliente, "Codigo_de_cliente": to_int_or_none(codigo_cliente)}
 
+def _extract_fecha(ctx: DocumentContext) -> dict:
     # --- Fecha ---
+    blocks = ctx.blocks
     fecha, c6 = "", 0.0
     date_blocks = [b for b in blocks if ANCH_DATE.search(b.text)]
     if date_blocks:
@@ -801,32 +1114,105 @@ def extract_fields_from_blocks(blocks: List[Block]) -> ExtractResponse:
             for n in neigh:
                 md2 = RX_DATE.search(n.text)
                 if md2: fecha, c6 = parse_date(md2.group(1)), 0.85; break
-    if not fecha:
-        md = RX_DATE.search(text_all)
+    if not fecha and not ctx.degrade():
+        md = RX_DATE.search(ctx.text_all)
         if md: fecha, c6 = parse_date(md.group(1)), 0.6
-    
-    print("FECHA:", fecha)
 
-    # --- Unidades ---
-    unidades = findUnits(blocks)
+    print("FECHA:", fecha)
+    return {"Fecha_de_la_factura": fecha, "_c": c6}
+
+def _extract_unidades(ctx: DocumentContext) -> dict:
+    # --- Unidades: suma de cantidades de la tabla de líneas; si no hay tabla, búsqueda UND/PCS ---
+    from services.pdfReading.lineItems import line_items_units
+    total = line_items_units(ctx.get("lineas")["lineas"] or [])
+    if total is not None:
+        print("UNIDADES (tabla):", total)
+        return {"Unidades": total}
+    if ctx.degrade():
+        return {"Unidades": 0}
+
+    unidades = findUnits(ctx.blocks)
     unidades_clean = unidades.replace(".", "") if unidades else "0"
-    confidence = round((c1+c2+c3+c5+c6)/6, 2)
     print("UNIDADES:", unidades)
+    return {"Unidades": to_int_or_none(unidades_clean) or 0}
+
+def _extract_lineas(ctx: DocumentContext) -> dict:
+    # --- Tabla de líneas (una sola pasada, compartida por unidades e importe) ---
+    from services.pdfReading.lineItems import extract_line_items
+    lineas = extract_line_items(ctx.blocks, stop=ctx.degrade)
+    print("LÍNEAS:", len(lineas))
+    return {"lineas": lineas}
+
+EXTRACTORS = {
+    "proforma":   _extract_proforma,
+    "pedido":     _extract_pedido,
+    "referencia": _extract_referencia,
+    "agente":     _extract_agente,
+    "importe":    _extract_importe,
+    "envio":      _extract_envio,
+    "cliente":    _extract_cliente,
+    "fecha":      _extract_fecha,
+    "unidades":   _extract_unidades,
+    "lineas":     _extract_lineas,
+}
+
+# Campo de ExtractResponse -> extractor que lo calcula
+FIELD_GROUPS = {
+    "Numero_proforma": "proforma",
+    "Numero_de_pedido": "pedido",
+    "Referencia_de_pedido": "referencia",
+    "agente": "agente",
+    "Importe": "importe",
+    "Moneda": "importe",
+    "pais": "envio",
+    "telefono": "envio",
+    "email": "envio",
+    "Nombre_de_cliente": "cliente",
+    "Codigo_de_cliente": "cliente",
+    "Fecha_de_la_factura": "fecha",
+    "Unidades": "unidades",
+    "lineas": "lineas",
+}
+SCORED_GROUPS = ["proforma", "pedido", "referencia", "importe", "fecha"]
 
-    return ExtractResponse(
-        Numero_de_pedido=int(pedido),
-        Nombre_de_cliente=nombre_cliente,
-        Codigo_de_cliente=codigo_cliente,
-        Numero_proforma=to_int_or_none(proforma),
-        Fecha_de_la_factura=fecha,
-        Referencia_de_pedido=ref,
-        Importe=float(importe),
-        Moneda=moneda_iso,
-        Unidades=int(unidades_clean),
+# --- extractor principal ---
+def extract_fields_from_blocks(blocks: List[Block], lang: Optional[str] = None,
+                               fields: Optional[List[str]] = None) -> ExtractResponse:
+    """
+    Extrae los campos del documento. Con 'fields' solo se ejecutan los extractores
+    de esos campos (y sus dependencias); el resto queda a None en la respuesta.
+    """
+    return build_response(DocumentContext(blocks, lang), fields)
+
+def build_response(ctx: DocumentContext, fields: Optional[List[str]] = None, source: str = "rule") -> ExtractResponse:
+    if fields is None:
+        groups = list(EXTRACTORS)
+    else:
+        unknown = [f for f in fields if f not in FIELD_GROUPS]
+        if unknown:
+            raise ValueError(f"Campos no extraíbles: {unknown}. Disponibles: {list(FIELD_GROUPS)}")
+        groups = list(dict.fromkeys(FIELD_GROUPS[f] for f in fields))
+
+    values: Dict[str, object] = {}
+    for group in groups:
+        values.update(ctx.get(group))
+
+    if fields is None:
+        # Misma fórmula de siempre sobre los 5 campos puntuados
+        confidence = round(sum(ctx.get(g)["_c"] for g in SCORED_GROUPS) / 6, 2)
+    else:
+        scores = [ctx.get(g)["_c"] for g in ctx.evaluated() if g in SCORED_GROUPS]
+        confidence = round(sum(scores) / len(scores), 2) if scores else 0.0
+        values = {k: v for k, v in values.items() if k in fields}
+
+    values.pop("_c", None)
+    from_directory = bool(values.pop("_directorio", False))
+    response = ExtractResponse(
+        **values,
         confidence=confidence,
-        source="rule",
-        pais=envio_fields["Envio_Pais"],
-        telefono=envio_fields["Envio_Telefono"],
-        email=envio_fields["Envio_Email"],
-        agente=agente,
+        source=source,
+        idioma=ctx.lang or None,
+        presupuesto=ctx.budget_exceeded or None,
     )
+    response._envio_directorio = from_directory
+    return response
@@ -0,0 +1,75 @@
+import traceback
+from typing import List, Optional
+from fastapi import HTTPException
+from models.data import Block, ExtractResponse
+from services.pdfReading.pdfReader import extract_text_blocks
+from services.pdfReading.pdfDataExtraction import extract_fields_from_blocks, language_sample
+from services.language.detection import detect_language
+from services.runtime import metrics
+from services.customers.customerDirectory import learn_all
+from settings import settings
+
+
+def _digest(path: str, digest: Optional[str]) -> Optional[str]:
+    """Hash del PDF para el fichero de bloques (solo se calcula si no viene ya hecho)."""
+    if digest or not settings.BLOCK_CACHE:
+        return digest
+    from services.history.historyStore import file_sha256
+    return file_sha256(path)
+
+
+def read_blocks(path: str, digest: Optional[str] = None) -> List[Block]:
+    # --- Solo lectura de texto, sin OCR (o del fichero de bloques si este PDF ya se leyó) ---
+    try:
+        if settings.BLOCK_CACHE:
+            from services.pdfReading.blockStore import cached_blocks
+            blocks = cached_blocks(_digest(path, digest), lambda: extract_text_blocks(path))
+        else:
+            blocks = extract_text_blocks(path)
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Error leyendo PDF: {e}")
+
+    if not blocks:
+        raise HTTPException(status_code=422, detail="No se detectó texto en el PDF")
+    return blocks
+
+
+def extract_document(path: str, fields: Optional[List[str]] = None,
+                     digest: Optional[str] = None) -> ExtractResponse:
+    """PDF en disco -> bloques de texto -> idioma -> campos (sin OCR). digest: hash ya calculado del PDF."""
+    from services.pdfReading.repeatedBlocks import strip_repeated
+
+    digest = _digest(path, digest)
+    blocks = strip_repeated(read_blocks(path, digest))
+
+    # Idioma del documento (una sola vez, sobre una muestra acotada de los bloques)
+    lang = detect_language(language_sample(blocks, settings.LANGDETECT_SAMPLE_CHARS))
+
+    # Procesar campos (con OCR de las regiones dudosas si está activado)
+    if settings.HYBRID_OCR:
+        from services.pdfReading.regionOcr import extract_hybrid
+        data = extract_hybrid(path, blocks, lang, fields, digest)
+    else:
+        data = extract_fields_from_blocks(blocks, lang, fields)
+    metrics.observe_extractions([data])
+    if fields is None:
+        learn_all([data])
+    return data
+
+
+def extract_documents(path: str, fields: Optional[List[str]] = None,
+                      digest: Optional[str] = None) -> List[ExtractResponse]:
+    """PDF con varias proformas: se divide en documentos y cada uno se extrae en paralelo."""
+    from services.pdfReading.segmentation import split_documents, extract_segments
+    from services.pdfReading.repeatedBlocks import strip_repeated
+
+    digest = _digest(path, digest)
+    blocks = read_blocks(path, digest)
+    # Cabeceras/pies repetidos se quitan por documento: la segmentación necesita los de cada página
+    segments = [strip_repeated(seg) for seg in split_documents(blocks)]
+    docs = extract_segments(segments, fields, path, digest)
+    metrics.observe_extractions(docs)
+    if fields is None:
+        learn_all(docs)
+    return docs
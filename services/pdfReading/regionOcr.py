@@ -0,0 +1,176 @@
+import io, shutil
+from typing import Dict, List, Optional, Tuple
+from models.data import Block, ExtractResponse
+from services.pdfReading.pdfDataExtraction import (
+    DocumentContext, build_response, find_shipping_header_block, _norm, ANCH_TOTAL,
+)
+from settings import settings
+
+# Grupos que se pueden rescatar por OCR de una región y campos que los dan por vacíos
+REGION_GROUPS = {
+    "importe": ["Importe"],
+    "envio":   ["pais", "telefono", "email"],
+    "cliente": ["Nombre_de_cliente"],
+}
+
+Rect = Tuple[float, float, float, float]
+
+
+def tesseract_available() -> bool:
+    try:
+        import pytesseract  # noqa
+    except ImportError:
+        return False
+    return shutil.which(getattr(pytesseract.pytesseract, "tesseract_cmd", "tesseract")) is not None
+
+
+def weak_groups(ctx: DocumentContext) -> List[str]:
+    """Grupos evaluados que salieron vacíos o con confianza por debajo de HYBRID_OCR_MIN_CONF."""
+    weak = []
+    for group, keys in REGION_GROUPS.items():
+        if group not in ctx.evaluated():
+            continue
+        res = ctx.get(group)
+        empty = all(res.get(k) in (None, "", 0) for k in keys)
+        if empty or res.get("_c", 1.0) < settings.HYBRID_OCR_MIN_CONF:
+            weak.append(group)
+    return weak
+
+
+def regions_for(group: str, blocks: List[Block], ctx: DocumentContext,
+                page_sizes: Dict[int, Tuple[float, float]]) -> List[Tuple[int, Rect]]:
+    """
+    Región(es) de página donde se espera el grupo:
+    - importe: la franja del ancla TOTAL hacia la derecha; sin ancla, el cuarto inferior
+      derecho de la última página
+    - envio / cliente: el recuadro a la derecha / izquierda de la cabecera de envío
+      (mismo corte que los paneles); sin cabecera, la mitad correspondiente de la zona
+      superior de la primera página
+    """
+    pages = sorted(page_sizes)
+    panel_h = settings.HYBRID_OCR_PANEL_H
+    if group == "importe":
+        anchors = [b for b in blocks if ANCH_TOTAL.search(b.text)]
+        if anchors:
+            out = []
+            for a in anchors:
+                w, _ = page_sizes[a.page]
+                out.append((a.page, (a.bbox[0] - 10, a.bbox[1] - 15, w, a.bbox[3] + 40)))
+            return out
+        w, h = page_sizes[pages[-1]]
+        return [(pages[-1], (w * 0.4, h * 0.5, w, h))]
+
+    hdr = find_shipping_header_block(blocks, ctx.header_rx, ctx.view)
+    if hdr is not None:
+        w, _ = page_sizes[hdr.page]
+        split_x = hdr.bbox[0]
+        if group == "envio":
+            return [(hdr.page, (split_x - 5, hdr.bbox[1] - 5, w, hdr.bbox[1] + panel_h))]
+        return [(hdr.page, (0, hdr.bbox[1] - 6, split_x + 5, hdr.bbox[1] + panel_h))]
+    w, h = page_sizes[pages[0]]
+    if group == "envio":
+        return [(pages[0], (w / 2, h * 0.1, w, h * 0.45))]
+    return [(pages[0], (0, h * 0.1, w / 2, h * 0.45))]
+
+
+def _ocr_clip(page, page_no: int, rect: Rect) -> List[Block]:
+    """Rasteriza solo la región y la pasa por Tesseract; un Block por bloque de Tesseract."""
+    import fitz, pytesseract
+    from PIL import Image
+
+    clip = fitz.Rect(*rect) & page.rect
+    if clip.is_empty:
+        return []
+    dpi = settings.HYBRID_OCR_DPI
+    pix = page.get_pixmap(clip=clip, dpi=dpi)
+    img = Image.open(io.BytesIO(pix.tobytes("png")))
+    data = pytesseract.image_to_data(img, lang=settings.OCR_LANGS, output_type=pytesseract.Output.DICT)
+
+    scale = 72.0 / dpi
+    lines: Dict[Tuple[int, int, int], List[int]] = {}
+    for i, word in enumerate(data["text"]):
+        if not (word or "").strip() or float(data["conf"][i]) < 0:
+            continue
+        key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        lines.setdefault(key, []).append(i)
+
+    by_block: Dict[int, List[List[int]]] = {}
+    for key in sorted(lines):
+        by_block.setdefault(key[0], []).append(lines[key])
+
+    out: List[Block] = []
+    for _, block_lines in sorted(by_block.items()):
+        idx = [i for ln in block_lines for i in ln]
+        text = "\n".join(" ".join(data["text"][i].strip() for i in ln) for ln in block_lines)
+        x0 = min(data["left"][i] for i in idx)
+        y0 = min(data["top"][i] for i in idx)
+        x1 = max(data["left"][i] + data["width"][i] for i in idx)
+        y1 = max(data["top"][i] + data["height"][i] for i in idx)
+        out.append(Block(
+            text=text,
+            bbox=(clip.x0 + x0 * scale, clip.y0 + y0 * scale, clip.x0 + x1 * scale, clip.y0 + y1 * scale),
+            page=page_no,
+            font=(y1 - y0) * scale / max(1, len(block_lines)),
+        ))
+    return out
+
+
+def ocr_regions(path: str, regions: List[Tuple[int, Rect]], digest: Optional[str] = None) -> List[Block]:
+    import fitz
+    from services.pdfReading.blockStore import cached_blocks
+    from services.history.historyStore import file_sha256
+
+    if not digest:
+        digest = file_sha256(path) if settings.BLOCK_CACHE else ""
+    blocks: List[Block] = []
+    with fitz.open(path) as doc:
+        for page_no, rect in regions:
+            # Cada región OCR también se guarda (por PDF + página + recuadro redondeado)
+            key = f"{digest}-ocr-{page_no}-" + "-".join(str(round(v)) for v in rect)
+            blocks += cached_blocks(key, lambda: _ocr_clip(doc[page_no], page_no, rect))
+    return blocks
+
+
+def extract_hybrid(path: str, blocks: List[Block], lang: Optional[str] = None,
+                   fields: Optional[List[str]] = None, digest: Optional[str] = None) -> ExtractResponse:
+    """
+    Extracción por capa de texto y, para los grupos vacíos o de baja confianza, OCR
+    solo de su región de página. Los bloques OCR se añaden a los del documento y esos
+    grupos se vuelven a evaluar; se conserva el resultado que mejore al original.
+    """
+    ctx = DocumentContext(blocks, lang)
+    data = build_response(ctx, fields)
+    weak = weak_groups(ctx)
+    if not weak:
+        return data
+    if not tesseract_available():
+        print("OCR híbrido: Tesseract no disponible, se omite para", weak)
+        return data
+
+    import fitz
+    with fitz.open(path) as doc:
+        page_sizes = {p.number: (p.rect.width, p.rect.height) for p in doc}
+    page_sizes = {p: page_sizes[p] for p in {b.page for b in blocks} if p in page_sizes}
+    regions = [r for g in weak for r in regions_for(g, blocks, ctx, page_sizes)]
+
+    # El OCR de la región repite el texto que ya estaba en la capa de texto: se descarta
+    known = {(b.page, _norm(b.text)) for b in blocks}
+    ocr_blocks = [b for b in ocr_regions(path, regions, digest) if (b.page, _norm(b.text)) not in known]
+    print(f"OCR híbrido: {len(regions)} regiones para {weak}, {len(ocr_blocks)} bloques nuevos")
+    if not ocr_blocks:
+        return data
+
+    ocr_ctx = DocumentContext(blocks + ocr_blocks, lang)
+    improved = []
+    for group in weak:
+        before, after = ctx.get(group), ocr_ctx.get(group)
+        keys = REGION_GROUPS[group]
+        filled = any(after.get(k) not in (None, "", 0) for k in keys) and \
+            all(before.get(k) in (None, "", 0) for k in keys)
+        if filled or after.get("_c", 0.0) > before.get("_c", 0.0):
+            improved.append(group)
+    if not improved:
+        return data
+
+    ctx.adopt(ocr_ctx, improved)
+    return build_response(ctx, fields, source="hybrid")
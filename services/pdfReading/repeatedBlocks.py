@@ -0,0 +1,46 @@
+import re, unicodedata
+from typing import Dict, List, Tuple
+from models.data import Block
+from services.pdfReading.lineItems import is_column_header
+from settings import settings
+
+# "Página 2 de 3" / "Page 2 of 3": el contador cambia en cada página pero es el mismo pie
+RX_PAGE_COUNTER = re.compile(
+    r'\b(?:p[aá]g(?:ina)?|page|seite|pagina)\.?\s*\d+\s*(?:/|de|of|von|di|sur)\s*\d+\b',
+    re.I
+)
+
+
+def _fingerprint(b: Block, grid: float) -> Tuple[str, int, int]:
+    """Texto normalizado + esquina superior izquierda redondeada a la rejilla."""
+    text = " ".join(unicodedata.normalize("NFKC", b.text).casefold().split())
+    text = RX_PAGE_COUNTER.sub("#pag", text)
+    return text, round(b.bbox[0] / grid), round(b.bbox[1] / grid)
+
+
+def strip_repeated(blocks: List[Block]) -> List[Block]:
+    """
+    Quita las cabeceras y pies de página repetidos de un documento: un bloque con el
+    mismo texto en la misma posición en varias páginas se queda solo en la primera,
+    marcado con repeats = nº de páginas en que aparece. Se aplica por documento (tras
+    segmentar), así que los anchors de cada proforma siguen en su primera página.
+    """
+    if not settings.STRIP_REPEATED or len({b.page for b in blocks}) < 2:
+        return blocks
+    grid = settings.REPEAT_GRID_PT
+    pages: Dict[Tuple[str, int, int], set] = {}
+    for b in blocks:
+        pages.setdefault(_fingerprint(b, grid), set()).add(b.page)
+
+    out: List[Block] = []
+    seen = set()
+    for b in blocks:
+        key = _fingerprint(b, grid)
+        n = len(pages[key])
+        # La cabecera de la tabla de líneas se repite a propósito: sin ella no se leen las filas de esa página
+        if n < 2 or is_column_header(b):
+            out.append(b)
+        elif key not in seen:
+            seen.add(key)
+            out.append(b.model_copy(update={"repeats": n}))
+    return out
@@ -0,0 +1,107 @@
+import multiprocessing, re, threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Dict, List, Optional
+from models.data import Block, ExtractResponse
+from services.pdfReading.pdfDataExtraction import (
+    ANCH_PROFORMA, same_line_right_value, find_order_number_from_lines,
+    extract_fields_from_blocks, language_sample,
+)
+from settings import settings
+
+# Cabecera de página "1 de N" / "Page 1 of N" / "Seite 1 von N": empieza un documento nuevo
+RX_FIRST_PAGE = re.compile(
+    r'\b(?:p[aá]g(?:ina)?|page|seite|pagina)\.?\s*1\s*(?:/|de|of|von|di|sur)\s*\d+\b',
+    re.I
+)
+
+
+def _pages(blocks: List[Block]) -> Dict[int, List[Block]]:
+    pages: Dict[int, List[Block]] = {}
+    for b in blocks:
+        pages.setdefault(b.page, []).append(b)
+    return dict(sorted(pages.items()))
+
+
+def _page_key(page_blocks: List[Block]) -> Optional[str]:
+    """Identificador del documento al que pertenece la página: nº de proforma o, si no, nº de pedido."""
+    proforma = same_line_right_value(ANCH_PROFORMA, page_blocks)
+    if proforma:
+        return f"PF:{proforma}"
+    pedido = find_order_number_from_lines(page_blocks)
+    return f"PED:{pedido}" if pedido else None
+
+
+def split_documents(blocks: List[Block]) -> List[List[Block]]:
+    """
+    Divide un PDF con varias proformas en documentos. Una página abre documento nuevo si:
+    - su cabecera indica "página 1 de N", o
+    - su nº de proforma (o de pedido) es distinto del del documento en curso.
+    Las páginas sin anchors (continuaciones) se quedan en el documento en curso.
+    """
+    segments: List[List[Block]] = []
+    current_key: Optional[str] = None
+    for _, page_blocks in _pages(blocks).items():
+        key = _page_key(page_blocks)
+        first_page = any(RX_FIRST_PAGE.search(b.text) for b in page_blocks)
+
+        new_doc = not segments or first_page or (key is not None and current_key is not None and key != current_key)
+        if new_doc:
+            segments.append(list(page_blocks))
+            current_key = key
+        else:
+            segments[-1].extend(page_blocks)
+            current_key = current_key or key
+    return segments
+
+
+def extract_segment(blocks: List[Block], fields: Optional[List[str]] = None,
+                    path: Optional[str] = None, digest: Optional[str] = None) -> ExtractResponse:
+    """Idioma + campos de un documento (se ejecuta en un proceso del pool)."""
+    from services.language.detection import detect_language
+
+    lang = detect_language(language_sample(blocks, settings.LANGDETECT_SAMPLE_CHARS))
+    if path and settings.HYBRID_OCR:
+        from services.pdfReading.regionOcr import extract_hybrid
+        data = extract_hybrid(path, blocks, lang, fields, digest)
+    else:
+        data = extract_fields_from_blocks(blocks, lang, fields)
+    data.paginas = sorted({b.page for b in blocks})
+    return data
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    pool = _pool
+    if pool is None:
+        # Se llama desde hilos del threadpool y del worker de jobs: sin el lock, dos
+        # peticiones simultáneas crearían dos pools y una de ellas quedaría sin cerrar
+        with _pool_lock:
+            if _pool is None:
+                # 'spawn': el proceso del servidor tiene hilos (event loop, cola de jobs) y fork no es seguro
+                _pool = ProcessPoolExecutor(
+                    max_workers=settings.EXTRACT_PROCESSES,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            pool = _pool
+    return pool
+
+
+def extract_segments(segments: List[List[Block]], fields: Optional[List[str]] = None,
+                     path: Optional[str] = None, digest: Optional[str] = None) -> List[ExtractResponse]:
+    """Extrae cada documento en paralelo (en orden); con un solo documento, en el propio proceso."""
+    if len(segments) <= 1 or settings.EXTRACT_PROCESSES <= 1:
+        return [extract_segment(seg, fields, path, digest) for seg in segments]
+    return list(_get_pool().map(partial(extract_segment, fields=fields, path=path, digest=digest), segments))
+
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,41 @@
+import threading
+from typing import Dict, Iterable, Tuple
+
+# Contadores del proceso (con varios workers, cada uno expone los suyos)
+_counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+_lock = threading.Lock()
+
+HELP = {
+    "extract_documents_total": "Documentos extraídos",
+    "extract_budget_exceeded_total": "Grupos de campos que agotaron su presupuesto de tiempo",
+}
+
+
+def inc(name: str, value: float = 1, **labels) -> None:
+    key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe_extractions(docs: Iterable) -> None:
+    """Cuenta documentos extraídos y presupuestos agotados (campo 'presupuesto' de la respuesta)."""
+    for doc in docs:
+        inc("extract_documents_total")
+        for item in doc.presupuesto or []:
+            inc("extract_budget_exceeded_total", grupo=item["grupo"], motivo=item["motivo"])
+
+
+def render() -> str:
+    """Formato de texto de Prometheus."""
+    with _lock:
+        items = sorted(_counters.items())
+    out, seen = [], set()
+    for (name, labels), value in items:
+        if name not in seen:
+            seen.add(name)
+            if name in HELP:
+                out.append(f"# HELP {name} {HELP[name]}")
+            out.append(f"# TYPE {name} counter")
+        lab = ",".join(f'{k}="{v}"' for k, v in labels)
+        out.append(f"{name}{{{lab}}} {value:g}" if lab else f"{name} {value:g}")
+    return "\n".join(out) + "\n"
@@ -0,0 +1,169 @@
+import asyncio, contextvars, cProfile, io, json, os, pstats, random, re, threading, time, tracemalloc, uuid
+from typing import List, Optional
+from settings import settings
+
+# Un solo perfil a la vez: cProfile y tracemalloc son globales al proceso/hilo y
+# dos perfiles solapados se contaminarían entre sí.
+_busy = threading.Lock()
+RX_REQUEST_ID = re.compile(r'^[A-Za-z0-9._\-]{1,64}$')
+
+
+class _RequestProfile:
+    """Perfiles de una petición: el del hilo del event loop más uno por cada hilo de trabajo."""
+
+    def __init__(self):
+        self.loop = cProfile.Profile()
+        self.workers: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def add_worker(self, profiler: cProfile.Profile) -> None:
+        with self._lock:
+            self.workers.append(profiler)
+
+    def stats(self) -> pstats.Stats:
+        return pstats.Stats(self.loop, *self.workers, stream=io.StringIO())
+
+
+# Petición que se está perfilando (asyncio.to_thread copia el contexto al hilo)
+_current: contextvars.ContextVar[Optional[_RequestProfile]] = contextvars.ContextVar("perfil_peticion", default=None)
+
+
+def _call_profiled(func, *args, **kwargs):
+    current = _current.get()
+    if current is None:
+        return func(*args, **kwargs)
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Python >= 3.12: cProfile va sobre sys.monitoring, un solo perfilador activo por
+        # intérprete y para todos los hilos; el del event loop ya ve este trabajo.
+        return func(*args, **kwargs)
+    current.add_worker(profiler)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        profiler.disable()
+
+
+async def run_profiled(func, *args, **kwargs):
+    """
+    asyncio.to_thread que, si la petición en curso se está perfilando, perfila también
+    el hilo que hace el trabajo (cProfile solo ve el hilo donde se activa).
+    """
+    return await asyncio.to_thread(_call_profiled, func, *args, **kwargs)
+
+
+def _wants_profile(request) -> bool:
+    if request.headers.get(settings.PROFILE_HEADER, "").lower() in ("1", "true", "yes"):
+        return True
+    return settings.PROFILE_SAMPLE_RATE > 0 and random.random() < settings.PROFILE_SAMPLE_RATE
+
+
+def _request_id(request) -> str:
+    rid = request.headers.get("X-Request-ID", "")
+    return rid if RX_REQUEST_ID.match(rid) else uuid.uuid4().hex
+
+
+def profile_path(request_id: str, ext: str) -> str:
+    return os.path.join(settings.PROFILE_DIR, f"{request_id}.{ext}")
+
+
+def _top_functions(stats: pstats.Stats, n: int) -> list:
+    rows = []
+    for (filename, line, func), (cc, nc, tt, ct, _) in stats.stats.items():
+        rows.append({"funcion": f"{os.path.basename(filename)}:{line}({func})",
+                     "llamadas": nc, "tiempo_propio_s": round(tt, 6), "tiempo_acumulado_s": round(ct, 6)})
+    rows.sort(key=lambda r: -r["tiempo_acumulado_s"])
+    return rows[:n]
+
+
+def _top_allocations(snapshot: tracemalloc.Snapshot, n: int) -> list:
+    out = []
+    for stat in snapshot.statistics("lineno")[:n]:
+        frame = stat.traceback[0]
+        out.append({"linea": f"{frame.filename}:{frame.lineno}", "kb": round(stat.size / 1024, 1), "bloques": stat.count})
+    return out
+
+
+def _prune() -> None:
+    """Conserva solo los PROFILE_KEEP perfiles más recientes."""
+    files = []
+    for f in os.listdir(settings.PROFILE_DIR):
+        if not f.endswith(".json"):
+            continue
+        path = os.path.join(settings.PROFILE_DIR, f)
+        try:
+            files.append((os.path.getmtime(path), path))
+        except OSError:
+            continue   # lo borró otra petición entre listdir y stat
+    files.sort()
+    for _, path in files[:-settings.PROFILE_KEEP] if settings.PROFILE_KEEP > 0 else []:
+        for ext in (".json", ".prof"):
+            try:
+                os.remove(path[:-5] + ext)
+            except OSError:
+                pass
+
+
+async def profiling_middleware(request, call_next):
+    """
+    Perfilado bajo demanda (cabecera PROFILE_HEADER o muestreo PROFILE_SAMPLE_RATE):
+    cProfile + tracemalloc alrededor de la petición. Se guarda el .prof (pstats) y un
+    resumen con las N funciones y líneas de asignación más pesadas, consultables en
+    /profiles/{request_id}.
+    - CPU: el hilo del event loop mientras dura la petición más los hilos lanzados con
+      run_profiled (esos solo contienen trabajo de esta petición). La parte del event
+      loop puede incluir pasos de otras peticiones concurrentes; los procesos del pool
+      de extracción no se perfilan (aparecen como espera en el hilo que los lanza).
+    - Memoria: tracemalloc es de todo el proceso, así que el pico y las asignaciones
+      incluyen lo que hicieran a la vez otras peticiones (pico_memoria_proceso_kb).
+    """
+    if not _wants_profile(request) or not _busy.acquire(blocking=False):
+        return await call_next(request)
+
+    request_id = _request_id(request)
+    started_tracemalloc = not tracemalloc.is_tracing()
+    if started_tracemalloc:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    profile = _RequestProfile()
+    token = _current.set(profile)
+    t0 = time.perf_counter()
+    try:
+        profile.loop.enable()
+        try:
+            response = await call_next(request)
+        finally:
+            profile.loop.disable()
+            _current.reset(token)
+        elapsed = time.perf_counter() - t0
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        if started_tracemalloc:
+            tracemalloc.stop()
+        _busy.release()
+
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    stats = profile.stats()
+    stats.dump_stats(profile_path(request_id, "prof"))
+    summary = {
+        "request_id": request_id,
+        "metodo": request.method,
+        "ruta": request.url.path,
+        "status": response.status_code,
+        "duracion_s": round(elapsed, 4),
+        "pico_memoria_proceso_kb": round(peak / 1024, 1),
+        "hilos_trabajo": len(profile.workers),
+        "funciones": _top_functions(stats, settings.PROFILE_TOP_N),
+        "asignaciones": _top_allocations(snapshot, settings.PROFILE_TOP_N),
+        "creado": time.time(),
+    }
+    with open(profile_path(request_id, "json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=1)
+    _prune()
+
+    response.headers["X-Request-ID"] = request_id
+    response.headers["X-Profile-Id"] = request_id
+    return response
@@ -0,0 +1,48 @@
+import os, resource, signal, threading
+from settings import settings
+
+# Solo se activa en workers gestionados por serve.py (el maestro de gunicorn
+# levanta otro al salir este); en desarrollo matar el proceso no tendría sustituto.
+_enabled = False
+_requested = False
+_lock = threading.Lock()
+_PAGE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def enable() -> None:
+    global _enabled, _requested
+    _enabled = True
+    _requested = False
+
+
+def rss_mb() -> float:
+    """RSS actual del proceso (Linux: /proc/self/statm; si no, el pico de getrusage)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE / (1024 * 1024)
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 if os.uname().sysname != "Darwin" else peak / (1024 * 1024)
+
+
+def _maybe_recycle() -> None:
+    global _requested
+    limit = settings.WORKER_MAX_RSS_MB
+    if not _enabled or limit <= 0 or _requested:
+        return
+    current = rss_mb()
+    if current < limit:
+        return
+    with _lock:
+        if _requested:
+            return
+        _requested = True
+    print(f"Worker {os.getpid()}: RSS {current:.0f} MB >= {limit} MB, reciclando tras las peticiones en curso.")
+    # SIGTERM = parada ordenada: deja de aceptar conexiones y termina las que tiene en curso
+    os.kill(os.getpid(), signal.SIGTERM)
+
+
+async def recycle_middleware(request, call_next):
+    response = await call_next(request)
+    _maybe_recycle()
+    return response
@@ -0,0 +1,91 @@
+import importlib, threading, time, traceback
+from typing import Callable, Dict
+
+# Estado del calentamiento, expuesto por /ready
+state: Dict = {
+    "status": "pending",     # pending | warming | ready | failed
+    "duration_s": None,
+    "subsystems": {},
+    "error": None,
+}
+_lock = threading.Lock()
+
+
+def _warm_pdf() -> None:
+    """Importa PyMuPDF/pdfplumber/dateutil y pasa un documento sintético por las reglas
+    para que también queden compilados los patrones que se construyen dentro de las funciones."""
+    importlib.import_module("services.pdfReading.pdfReader")
+    rules = importlib.import_module("services.pdfReading.pdfDataExtraction")
+    from models.data import Block
+
+    sample = [
+        Block(text="PROFORMA Nº 1001", bbox=(40, 80, 200, 92)),
+        Block(text="Nº PEDIDO 284128", bbox=(40, 100, 200, 112)),
+        Block(text="FECHA 01/01/2025", bbox=(40, 120, 200, 132)),
+        Block(text="GOODS DELIVERY ADDRESS", bbox=(320, 150, 520, 162)),
+        Block(text="CLIENTE SL\nSPAIN\nTEL +34 600 000 000", bbox=(320, 165, 520, 200)),
+        Block(text="21317 CLIENTE SL", bbox=(40, 165, 200, 177)),
+        Block(text="2025/1 AGENTE", bbox=(40, 260, 200, 272)),
+        Block(text="10 UND", bbox=(320, 320, 380, 332)),
+        Block(text="TOTAL EUR 1.000,00", bbox=(320, 400, 560, 412)),
+    ]
+    try:
+        rules.extract_fields_from_blocks(sample)
+    except Exception:
+        pass  # solo interesa haber ejecutado los patrones
+
+
+def _warm_excel() -> None:
+    importlib.import_module("services.excelReading.insertData")
+    importlib.import_module("services.excelReading.excelDuplicates")
+    importlib.import_module("services.excelReading.dunning")
+
+
+def _warm_language() -> None:
+    importlib.import_module("services.language.detection").warm_up()
+
+
+def _warm_mail() -> None:
+    importlib.import_module("services.mail.generateBody")
+
+
+SUBSYSTEMS: Dict[str, Callable[[], None]] = {
+    "pdf": _warm_pdf,
+    "excel": _warm_excel,
+    "language": _warm_language,
+    "mail": _warm_mail,
+}
+
+
+def warm_up() -> None:
+    """Carga las dependencias pesadas de cada subsistema antes de declararse listo."""
+    with _lock:
+        if state["status"] in ("warming", "ready"):
+            return
+        state["status"] = "warming"
+
+    t0 = time.perf_counter()
+    try:
+        for name, fn in SUBSYSTEMS.items():
+            t = time.perf_counter()
+            fn()
+            state["subsystems"][name] = round(time.perf_counter() - t, 3)
+        state["status"] = "ready"
+    except Exception as e:
+        traceback.print_exc()
+        state["status"] = "failed"
+        state["error"] = str(e)
+    finally:
+        state["duration_s"] = round(time.perf_counter() - t0, 3)
+
+
+def start_background_warm_up() -> threading.Thread:
+    th = threading.Thread(target=warm_up, name="warm-up", daemon=True)
+    th.start()
+    return th
+
+
+def mark_lazy() -> None:
+    """Sin calentamiento: cada subsistema se carga en su primera petición."""
+    state["status"] = "ready"
+    state["subsystems"] = {}
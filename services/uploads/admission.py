@@ -0,0 +1,173 @@
+import asyncio, os, tempfile
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+from settings import settings
+
+CHUNK_SIZE = 1024 * 1024
+MB = 1024 * 1024
+
+
+class Upload:
+    """Fichero subido ya admitido: en memoria (data) o volcado a disco (path)."""
+
+    def __init__(self, filename: str, size: int, data: Optional[bytes] = None, path: Optional[str] = None):
+        self.filename = filename
+        self.size = size
+        self.data = data
+        self.path = path
+
+    def content(self) -> bytes | str:
+        """Bytes si está en memoria; ruta si se volcó a disco."""
+        return self.path if self.path else (self.data or b"")
+
+
+class AdmissionController:
+    """
+    Presupuesto de memoria compartido por todas las peticiones en curso del proceso.
+    Cada petición reserva (tamaño de subida × factor) antes de procesarse; si no hay
+    hueco en ADMISSION_TIMEOUT_S se rechaza con 503 en lugar de arriesgar un OOM.
+    """
+
+    def __init__(self, budget_bytes: int):
+        self.budget = budget_bytes
+        self.in_use = 0
+        self.in_flight = 0
+        self._cond = asyncio.Condition()
+
+    @asynccontextmanager
+    async def reserve(self, nbytes: int, timeout: float):
+        # Una petición nunca puede reservar más que el presupuesto completo
+        nbytes = max(0, min(nbytes, self.budget))
+        async with self._cond:
+            try:
+                await asyncio.wait_for(
+                    self._cond.wait_for(lambda: self.in_use + nbytes <= self.budget),
+                    timeout,
+                )
+            except asyncio.TimeoutError:
+                raise HTTPException(
+                    status_code=503,
+                    detail="Servidor ocupado: presupuesto de memoria agotado, reintente más tarde",
+                    headers={"Retry-After": str(max(1, int(timeout)))},
+                )
+            self.in_use += nbytes
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            async with self._cond:
+                self.in_use -= nbytes
+                self.in_flight -= 1
+                self._cond.notify_all()
+
+    def stats(self) -> dict:
+        return {
+            "budget_mb": round(self.budget / MB, 1),
+            "in_use_mb": round(self.in_use / MB, 1),
+            "in_flight": self.in_flight,
+        }
+
+
+admission = AdmissionController(settings.MEMORY_BUDGET_MB * MB)
+
+# --- límites por endpoint (MB) ---
+UPLOAD_LIMITS = {
+    "pdf": lambda: settings.MAX_UPLOAD_MB_PDF,
+    "excel": lambda: settings.MAX_UPLOAD_MB_EXCEL,
+    "eml": lambda: settings.MAX_UPLOAD_MB_EML,
+}
+
+
+# Ruta -> tipos de subida que acepta (para rechazar por Content-Length sin leer el cuerpo)
+UPLOAD_ROUTES = {
+    "/extract": ("pdf",),
+    "/extract/eml": ("eml",),
+    "/processExcel": ("excel",),
+    "/dunning/run": ("excel",),
+    "/register/summary": ("excel",),
+    "/jobs": ("pdf", "excel"),
+}
+MULTIPART_OVERHEAD = MB   # margen para los campos del formulario y los separadores multipart
+
+
+def _too_large(limit_mb: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"El archivo supera el tamaño máximo permitido ({limit_mb} MB)")
+
+
+async def upload_limit_middleware(request, call_next):
+    """
+    Rechaza con 413 las subidas cuyo Content-Length ya supera el límite del endpoint,
+    antes de que Starlette lea (y vuelque a disco) el cuerpo multipart. Sin Content-Length
+    (chunked) el cuerpo se recibe entero y el límite se aplica al leer el fichero.
+    """
+    kinds = UPLOAD_ROUTES.get(request.url.path) if request.method == "POST" else None
+    declared = request.headers.get("content-length", "")
+    if kinds and declared.isdigit():
+        limit_mb = max(UPLOAD_LIMITS[k]() for k in kinds)
+        if int(declared) > limit_mb * MB + MULTIPART_OVERHEAD:
+            return JSONResponse(status_code=413, content={"detail": _too_large(limit_mb).detail})
+    return await call_next(request)
+
+
+async def _spool(file: UploadFile, limit: int, limit_mb: int, to_disk: bool, suffix: str) -> Upload:
+    """Lee la subida por trozos sin superar el límite; a disco si es grande o se pide."""
+    spool_at = settings.UPLOAD_SPOOL_MB * MB
+    buf = bytearray()
+    fd, path = None, None
+    size = 0
+    try:
+        while True:
+            chunk = await file.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > limit:
+                raise _too_large(limit_mb)
+            if fd is None and (to_disk or size > spool_at):
+                fd, path = tempfile.mkstemp(suffix=suffix)
+                os.write(fd, bytes(buf))
+                buf = bytearray()
+            if fd is not None:
+                os.write(fd, chunk)
+            else:
+                buf.extend(chunk)
+    except BaseException:
+        if fd is not None:
+            os.close(fd)
+            os.remove(path)
+        raise
+    if fd is not None:
+        os.close(fd)
+        return Upload(file.filename or "", size, path=path)
+    return Upload(file.filename or "", size, data=bytes(buf))
+
+
+@asynccontextmanager
+async def admitted_upload(file: UploadFile, kind: str, to_disk: bool = False, suffix: str = ""):
+    """
+    Admite una subida: valida el tamaño (413), reserva memoria del presupuesto global
+    (503 si no hay hueco) y la lee en memoria o a disco. Limpia el temporal al salir.
+    Cuando llega aquí Starlette ya recibió el cuerpo: esto acota la memoria de trabajo;
+    lo que se acepta recibir lo corta antes upload_limit_middleware (Content-Length).
+    """
+    limit_mb = UPLOAD_LIMITS[kind]()
+    limit = limit_mb * MB
+
+    # Si el cliente envió el tamaño, rechazamos antes de leer nada
+    declared = getattr(file, "size", None)
+    if declared is not None and declared > limit:
+        raise _too_large(limit_mb)
+
+    estimate = int((declared or limit) * settings.UPLOAD_MEMORY_FACTOR)
+    async with admission.reserve(estimate, settings.ADMISSION_TIMEOUT_S):
+        upload = await _spool(file, limit, limit_mb, to_disk, suffix)
+        try:
+            yield upload
+        finally:
+            if upload.path and os.path.exists(upload.path):
+                try:
+                    os.remove(upload.path)
+                except OSError:
+                    pass
@@ -4,6 +4,113 @@ class Settings(BaseSettings):
     OCR_BACKENDS: str = "doctr,ocrmypdf,tesseract"
     OCR_LANGS: str = "spa+eng+ita"
     MAX_RIGHT_DX: int = 900
+
+    # --- Control de admisión de subidas ---
+    MAX_UPLOAD_MB_PDF: int = 25
+    MAX_UPLOAD_MB_EXCEL: int = 50
+    MAX_UPLOAD_MB_EML: int = 50
+    MEMORY_BUDGET_MB: int = 512
+    UPLOAD_MEMORY_FACTOR: float = 4.0   # memoria estimada de trabajo por byte subido
+    UPLOAD_SPOOL_MB: int = 8            # por encima se vuelca a disco en vez de RAM
+    ADMISSION_TIMEOUT_S: float = 10.0
+
+    # --- Detección de idioma ---
+    LANGDETECT_CANDIDATES: str = "es,en,fr,de,it,pt,ro"  # vacío = todos los perfiles de langdetect
+    LANGDETECT_CACHE_SIZE: int = 4096
+    LANGDETECT_SAMPLE_CHARS: int = 1500   # muestra de texto del PDF usada por /extract
+
+    # --- Presupuestos de tiempo de extracción ---
+    EXTRACT_BUDGET_MS: int = 5000      # por documento; agotado, los grupos pendientes quedan vacíos (0 = sin límite)
+    EXTRACTOR_BUDGET_MS: int = 1500    # por grupo; superado, el grupo omite sus estrategias de respaldo
+                                       # y las páginas restantes de la tabla (envío/cliente no tienen)
+
+    # --- Correos .eml (/extract/eml) ---
+    EML_CONCURRENCY: int = 4           # adjuntos extraídos a la vez
+
+    # --- OCR híbrido por regiones (requiere pytesseract + binario tesseract) ---
+    HYBRID_OCR: bool = False           # OCR solo de las regiones de campos vacíos/dudosos
+    HYBRID_OCR_MIN_CONF: float = 0.8   # por debajo, el grupo se reintenta con OCR
+    HYBRID_OCR_DPI: int = 300
+    HYBRID_OCR_PANEL_H: float = 180.0  # alto (pt) del recuadro de envío/cliente bajo la cabecera
+
+    # --- Bloques ya leídos de cada PDF (por hash), para no volver a parsearlo ---
+    BLOCK_CACHE: bool = True
+    BLOCK_CACHE_DIR: str = "data/blocks"
+    BLOCK_CACHE_TTL_DAYS: int = 90     # ficheros sin reescribir más tiempo se borran
+    BLOCK_CACHE_MAX_MB: int = 2048     # por encima se borran los más antiguos (0 = sin límite)
+    BLOCK_CACHE_PRUNE_S: int = 600     # cada cuánto (como mucho) revisa el directorio cada proceso
+
+    # --- Cabeceras y pies repetidos en cada página (se dejan solo en la primera) ---
+    STRIP_REPEATED: bool = True
+    REPEAT_GRID_PT: float = 4.0        # rejilla (pt) para comparar posiciones entre páginas
+
+    # --- PDFs con varias proformas (/extract?split=true) ---
+    EXTRACT_PROCESSES: int = 4         # procesos para extraer documentos en paralelo (1 = secuencial)
+
+    # --- Arranque ---
+    EAGER_WARMUP: bool = True   # precarga dependencias/reglas/perfiles antes de /ready
+
+    # --- Servidor de producción (serve.py) ---
+    SERVE_HOST: str = "0.0.0.0"
+    SERVE_PORT: int = 8000
+    SERVE_WORKERS: int = 0             # 0 = 2 × CPUs + 1
+    MAX_REQUESTS_PER_WORKER: int = 1000
+    MAX_REQUESTS_JITTER: int = 100
+    WORKER_MAX_RSS_MB: int = 1024      # 0 = sin reciclado por memoria
+    GRACEFUL_TIMEOUT_S: int = 30
+    WORKER_TIMEOUT_S: int = 120
+
+    # --- Registro Excel: respuesta 'delta' de /processExcel ---
+    WORKBOOK_CACHE_DIR: str = "data/workbooks"
+    WORKBOOK_CACHE_TTL_S: int = 3600   # tiempo que se puede descargar el Excel completo
+    WORKBOOK_CACHE_KEEP: int = 200
+
+    # --- Resumen del registro (/register/summary) ---
+    REGISTER_CACHE_SIZE: int = 8       # versiones del Excel (por hash) con el frame ya preparado
+    REGISTER_AGE_BUCKETS: str = "30,60,90"
+
+    # --- Directorio de clientes (atajo del panel de envío) ---
+    CUSTOMER_DIRECTORY: bool = True
+    CUSTOMER_DB_PATH: str = "data/customers.sqlite3"
+    CUSTOMER_MAX_ENTRIES: int = 5000   # por encima se expulsan los menos usados
+    CUSTOMER_TTL_DAYS: int = 180
+    CUSTOMER_LEARN_MIN_CONF: float = 0.7  # confianza mínima de la extracción para aprender
+
+    # --- Envío SMTP de correos generados ---
+    SMTP_HOST: str = "localhost"
+    SMTP_PORT: int = 25
+    SMTP_USER: str = ""
+    SMTP_PASSWORD: str = ""
+    SMTP_STARTTLS: bool = False
+    SMTP_FROM: str = "backoffice@localhost"
+    SMTP_TIMEOUT_S: float = 30.0
+    SMTP_POOL_SIZE: int = 2            # conexiones abiertas a la vez por tanda
+    SMTP_MAX_PER_CONNECTION: int = 100 # envíos antes de renovar la conexión
+    SMTP_RATE_PER_S: float = 10.0      # límite de envíos por segundo de la tanda (0 = sin límite)
+    SMTP_RETRIES: int = 3
+    SMTP_BACKOFF_S: float = 1.0        # espera inicial entre reintentos (se duplica)
+
+    # --- Trabajos asíncronos (/jobs) ---
+    JOBS_DIR: str = "data/jobs"
+    JOB_WORKERS: int = 1               # consumidores por proceso (0 = este proceso no ejecuta trabajos)
+    JOB_POLL_S: float = 1.0
+    JOB_LEASE_S: int = 900             # un 'running' sin latido más tiempo se considera huérfano
+    JOB_HEARTBEAT_S: float = 60.0      # cada cuánto renueva el lease el worker que lo ejecuta
+    JOB_MAX_ATTEMPTS: int = 3          # huérfano con estos intentos → 'failed' (no se re-toma más)
+    JOB_CALLBACK_TIMEOUT_S: float = 10.0
+
+    # --- Perfilado por petición ---
+    PROFILE_SAMPLE_RATE: float = 0.0   # fracción de peticiones perfiladas sin cabecera
+    PROFILE_HEADER: str = "X-Profile"  # 'X-Profile: 1' fuerza el perfilado de esa petición
+    PROFILE_DIR: str = "data/profiles"
+    PROFILE_TOP_N: int = 25
+    PROFILE_KEEP: int = 200
+
+    # --- Histórico de extracciones (/history) ---
+    HISTORY_ENABLED: bool = True
+    HISTORY_PATH: str = "data/history.sqlite3"
+    HISTORY_BATCH_SIZE: int = 50       # filas acumuladas antes de escribir
+    HISTORY_FLUSH_S: float = 2.0       # espera máxima de una fila pendiente
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,4 @@
+import os, sys
+
+# Los tests importan los módulos igual que la app: desde la raíz del repositorio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,54 @@
+import os, time
+import pytest
+from models.data import Block
+from services.pdfReading import blockStore
+from services.pdfReading.blockStore import encode_blocks, decode_blocks
+from settings import settings
+
+
+def test_round_trip_is_identical():
+    # Coordenadas como las de PyMuPDF: no representables en float32
+    blocks = [
+        Block(text="N PROFORMA: 5123", bbox=(56.69291305541992, 70.1234567, 300.00000001, 82.5), font=9.96, page=0),
+        Block(text="Dirección envío\nFRANCIA · €", bbox=(0.1, 0.2, 0.3, 0.7), font=10.0, page=3),
+    ]
+    assert decode_blocks(encode_blocks(blocks)) == blocks
+
+
+def test_other_version_is_a_miss():
+    data = bytearray(encode_blocks([Block(text="x", bbox=(0, 0, 1, 1))]))
+    data[4] ^= 0xFF
+    assert decode_blocks(bytes(data)) is None
+
+
+@pytest.fixture
+def store_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "BLOCK_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "BLOCK_CACHE_PRUNE_S", 10 ** 9)
+    return tmp_path
+
+
+def _save(key, age_s=0.0):
+    blockStore.save(key, [Block(text="x" * 2000, bbox=(0, 0, 1, 1))])
+    path = blockStore._path(key)
+    t = time.time() - age_s
+    os.utime(path, (t, t))
+    return path
+
+
+def test_prune_removes_expired_files(store_dir, monkeypatch):
+    monkeypatch.setattr(settings, "BLOCK_CACHE_TTL_DAYS", 1)
+    old, new = _save("aa01", age_s=3 * 86400), _save("bb02")
+    assert blockStore.prune() == 1
+    assert not os.path.exists(old) and os.path.exists(new)
+
+
+def test_prune_keeps_directory_under_size_limit(store_dir, monkeypatch):
+    monkeypatch.setattr(settings, "BLOCK_CACHE_TTL_DAYS", 365)
+    monkeypatch.setattr(settings, "BLOCK_CACHE_MAX_MB", 0)
+    paths = [_save(f"{i:02x}ff", age_s=100 - i) for i in range(3)]
+    assert blockStore.prune() == 0          # 0 = sin límite
+    size = os.path.getsize(paths[0])
+    monkeypatch.setattr(settings, "BLOCK_CACHE_MAX_MB", size * 1.5 / (1024 * 1024))
+    assert blockStore.prune() == 2
+    assert [os.path.exists(p) for p in paths] == [False, False, True]
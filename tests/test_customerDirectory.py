@@ -0,0 +1,79 @@
+import time
+import pytest
+from models.data import ExtractResponse
+from services.customers import customerDirectory
+from services.customers.customerDirectory import CustomerDirectory, consistent, learn_all
+from settings import settings
+
+PAGE = "DIRECCIÓN ENVÍO MERCANCÍA\nCLIENTE FRANCE SARL\nFRANCIA\nTel. +33 1 23 45 67 89\ncompras@cliente.fr"
+ENTRY = {"pais": "FRANCIA", "telefono": "+33123456789", "email": "compras@cliente.fr"}
+
+
+def test_consistent_when_every_stored_field_is_on_the_page():
+    assert consistent(ENTRY, PAGE)
+
+
+@pytest.mark.parametrize("changed", [
+    {"email": "antiguo@cliente.fr"},      # cambió el email pero no el teléfono
+    {"telefono": "+33999999999"},         # cambió el teléfono pero no el email
+    {"pais": "BELGICA"},
+])
+def test_inconsistent_when_any_stored_field_changed(changed):
+    assert not consistent({**ENTRY, **changed}, PAGE)
+
+
+def test_country_must_match_as_a_word():
+    assert not consistent({"pais": "FRANCIA", "telefono": None, "email": None}, "FRANCIACORTA SRL")
+    assert consistent({"pais": "FRANCIA", "telefono": None, "email": None}, "Pais: Francia")
+
+
+@pytest.mark.parametrize("raw,stored", [
+    ("FRANCE", "FRANCIA"), ("SPAIN", "ESPAÑA"), ("ITALY", "ITALIA"),
+    ("ROUMANIE", "RUMANIA"), ("BELARUS", "BIELORRUSIA"), ("GERMANY", "GERMANY"),
+])
+def test_country_is_compared_normalized(raw, stored):
+    page = PAGE.replace("FRANCIA", raw)
+    assert consistent({**ENTRY, "pais": stored}, page)
+
+
+def test_empty_entry_is_not_consistent():
+    assert not consistent({"pais": None, "telefono": None, "email": None}, PAGE)
+
+
+@pytest.fixture
+def directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CUSTOMER_LEARN_MIN_CONF", 0.5)
+    monkeypatch.setattr(settings, "CUSTOMER_DIRECTORY", True)
+    d = CustomerDirectory(str(tmp_path / "clientes.sqlite3"))
+    monkeypatch.setattr(customerDirectory, "_directory", d)
+    return d
+
+
+def _doc(**kw):
+    return ExtractResponse(**{"confidence": 0.9, "source": "rule", "Codigo_de_cliente": 21317, **ENTRY, **kw})
+
+
+def test_served_from_directory_is_not_learned_again(directory):
+    learn_all([_doc()])
+    before = directory.get(21317)
+    served = _doc()
+    served._envio_directorio = True
+    learn_all([served])
+    after = directory.get(21317)
+    assert after["aciertos"] == before["aciertos"] == 1
+    assert after["actualizado"] == before["actualizado"]
+
+
+def test_get_is_read_only_and_usage_is_flushed_on_next_write(directory):
+    learn_all([_doc()])
+    stored = directory.get(21317)["usado"]
+    time.sleep(0.01)
+    assert directory.get(21317)["usado"] == stored
+    learn_all([_doc(Codigo_de_cliente=1)])
+    assert directory.get(21317)["usado"] > stored
+
+
+def test_expired_entry_is_ignored(directory, monkeypatch):
+    learn_all([_doc()])
+    monkeypatch.setattr(settings, "CUSTOMER_TTL_DAYS", 0)
+    assert directory.get(21317) is None
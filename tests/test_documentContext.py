@@ -0,0 +1,32 @@
+from models.data import Block
+from services.pdfReading import pdfDataExtraction
+from services.pdfReading.pdfDataExtraction import DocumentContext
+
+
+def _ctx(*texts):
+    return DocumentContext([Block(text=t, bbox=(50, 100 + 20 * i, 300, 112 + 20 * i)) for i, t in enumerate(texts)])
+
+
+def test_adopt_recomputes_groups_derived_from_the_replaced_one(monkeypatch):
+    calls = []
+
+    def agente(ctx):
+        calls.append(1)
+        return {"agente": "AG " + ctx.get("referencia")["Referencia_de_pedido"]}
+
+    monkeypatch.setitem(pdfDataExtraction.EXTRACTORS, "agente", agente)
+    ctx = _ctx("REF 2025/1111")
+    assert ctx.get("agente")["agente"] == "AG 2025/1111"
+
+    ctx.adopt(_ctx("REF 2025/2222"), ["referencia"])
+    assert ctx.get("referencia")["Referencia_de_pedido"] == "2025/2222"
+    assert ctx.get("agente")["agente"] == "AG 2025/2222"
+    assert len(calls) == 2
+
+
+def test_adopt_keeps_unrelated_groups():
+    ctx = _ctx("REF 2025/1111", "FECHA 12/03/2025")
+    fecha = ctx.get("fecha")
+    ctx.get("referencia")
+    ctx.adopt(_ctx("REF 2025/2222"), ["referencia"])
+    assert ctx.get("fecha") is fecha
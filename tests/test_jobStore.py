@@ -0,0 +1,58 @@
+import time
+import pytest
+from services.jobs.jobStore import JobStore
+from settings import settings
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_LEASE_S", 900)
+    monkeypatch.setattr(settings, "JOB_MAX_ATTEMPTS", 2)
+    return JobStore(str(tmp_path / "jobs.sqlite3"))
+
+
+def _expire(store, job_id):
+    # Simula un worker que dejó de latir hace más que el lease
+    with store._connect() as con:
+        con.execute("UPDATE jobs SET actualizado = ? WHERE id = ?", (time.time() - 10_000, job_id))
+
+
+def test_running_job_with_fresh_lease_is_not_claimed_again(store):
+    store.create("a", "extract", {}, "in.pdf", "in.pdf", None)
+    job = store.claim_next()
+    assert job["id"] == "a" and job["estado"] == "running" and job["intentos"] == 1
+    assert store.claim_next() is None
+
+
+def test_heartbeat_keeps_the_lease(store):
+    store.create("a", "extract", {}, "in.pdf", "in.pdf", None)
+    job = store.claim_next()
+    _expire(store, "a")
+    assert store.heartbeat("a", job["intentos"])
+    assert store.claim_next() is None
+
+
+def test_orphan_is_reclaimed_and_old_run_is_fenced(store):
+    store.create("a", "extract", {}, "in.pdf", "in.pdf", None)
+    first = store.claim_next()
+    _expire(store, "a")
+    second = store.claim_next()
+    assert second["intentos"] == 2
+    # La ejecución vieja ya no puede latir ni cerrar el trabajo
+    assert not store.heartbeat("a", first["intentos"])
+    assert not store.finish("a", {"x": 1}, intento=first["intentos"])
+    assert store.finish("a", {"x": 2}, intento=second["intentos"])
+    assert store.get("a")["result"] == {"x": 2}
+
+
+def test_orphan_at_max_attempts_is_failed_not_reclaimed(store):
+    store.create("a", "extract", {}, "in.pdf", "in.pdf", None)
+    store.claim_next()
+    _expire(store, "a")
+    store.claim_next()
+    _expire(store, "a")
+    assert store.claim_next() is None
+    dead = store.reap()
+    assert [j["id"] for j in dead] == ["a"]
+    assert store.get("a")["estado"] == "failed"
+    assert store.reap() == []
@@ -0,0 +1,57 @@
+import json, os
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from services.runtime.profiling import profiling_middleware, run_profiled, profile_path
+from settings import settings
+
+
+def _heavy_work(n: int) -> int:
+    return sum(i * i for i in range(n))
+
+
+def test_profiled_request_through_run_profiled(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "PROFILE_TOP_N", 500)
+    app = FastAPI()
+    app.middleware("http")(profiling_middleware)
+
+    @app.get("/work")
+    async def work():
+        return {"total": await run_profiled(_heavy_work, 20000)}
+
+    with TestClient(app) as client:
+        r = client.get("/work", headers={settings.PROFILE_HEADER: "1"})
+    assert r.status_code == 200
+    assert r.json()["total"] == _heavy_work(20000)
+
+    path = profile_path(r.headers["X-Profile-Id"], "json")
+    assert os.path.exists(path)
+    with open(path, encoding="utf-8") as f:
+        summary = json.load(f)
+    # El trabajo del hilo aparece en el perfil (por su perfilador o, en 3.12+, por el del loop)
+    assert any("_heavy_work" in fn["funcion"] for fn in summary["funciones"])
+
+
+def test_run_profiled_without_profile_just_runs():
+    import asyncio
+    assert asyncio.run(run_profiled(_heavy_work, 10)) == _heavy_work(10)
+
+
+def test_prune_skips_files_removed_concurrently(tmp_path, monkeypatch):
+    from services.runtime import profiling
+
+    monkeypatch.setattr(settings, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "PROFILE_KEEP", 1)
+    for i in range(3):
+        (tmp_path / f"r{i}.json").write_text("{}")
+    real = os.path.getmtime
+
+    def racy(path):
+        # Otra petición borra r0 justo antes de que lo miremos
+        if path.endswith("r0.json") and os.path.exists(path):
+            os.remove(path)
+        return real(path)
+
+    monkeypatch.setattr(profiling.os.path, "getmtime", racy)
+    profiling._prune()
+    assert len(list(tmp_path.glob("*.json"))) == 1
@@ -0,0 +1,24 @@
+import pytest
+from fastapi import HTTPException
+from services.excelReading.registerRow import build_row, parse_fields
+
+
+def test_fields_are_coerced_like_the_form():
+    fields = parse_fields({"numPedido": "123456", "importe": "12.5", "fechaFact": "2026-03-01"})
+    assert fields == {"numPedido": 123456, "importe": 12.5, "fechaFact": "2026-03-01"}
+    row = build_row(**fields)
+    assert row["NUMERO DE PEDIDO"] == 123456 and row["FECHA FACTURA"] == "01/03/2026"
+    assert row["ESTADO"] == "Pendiente"
+
+
+@pytest.mark.parametrize("datos", [
+    {"numPedido": "abc"},
+    {"importe": "mucho"},
+    {"fechaFact": "01/03/2026"},
+    {"cliente": "X"},
+    ["numPedido"],
+])
+def test_invalid_datos_is_rejected_with_400(datos):
+    with pytest.raises(HTTPException) as e:
+        parse_fields(datos)
+    assert e.value.status_code == 400
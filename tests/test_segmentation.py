@@ -0,0 +1,28 @@
+import threading, time
+from services.pdfReading import segmentation
+
+
+class _SlowPool:
+    created = 0
+
+    def __init__(self, **kwargs):
+        time.sleep(0.05)   # ensancha la ventana de la carrera
+        type(self).created += 1
+
+    def shutdown(self, **kwargs):
+        pass
+
+
+def test_concurrent_callers_share_one_pool(monkeypatch):
+    monkeypatch.setattr(segmentation, "ProcessPoolExecutor", _SlowPool)
+    monkeypatch.setattr(segmentation, "_pool", None)
+    pools = []
+    threads = [threading.Thread(target=lambda: pools.append(segmentation._get_pool())) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert _SlowPool.created == 1
+    assert all(p is pools[0] for p in pools)
+    segmentation.shutdown_pool()
+    assert segmentation._pool is None
@@ -0,0 +1,76 @@
+import smtplib, socket
+import pytest
+from services.mail import smtpSender
+from services.mail.smtpSender import _is_transient, send_all
+from settings import settings
+
+
+@pytest.mark.parametrize("exc,transient", [
+    (smtplib.SMTPServerDisconnected("cerrada"), True),
+    (smtplib.SMTPConnectError(421, b"busy"), True),
+    (ConnectionResetError(), True),
+    (socket.timeout(), True),
+    (smtplib.SMTPResponseException(451, b"try later"), True),
+    (smtplib.SMTPRecipientsRefused({"a@b.c": (450, b"mailbox busy")}), True),
+    (smtplib.SMTPRecipientsRefused({"a@b.c": (553, b"bad recipient")}), False),
+    (smtplib.SMTPAuthenticationError(535, b"auth failed"), False),
+    (smtplib.SMTPDataError(554, b"rejected"), False),
+    (smtplib.SMTPNotSupportedError(), False),
+    (ValueError("x"), False),
+])
+def test_transient_classification(exc, transient):
+    assert _is_transient(exc) is transient
+
+
+@pytest.fixture
+def fast_smtp(monkeypatch):
+    monkeypatch.setattr(settings, "SMTP_RETRIES", 3)
+    monkeypatch.setattr(settings, "SMTP_BACKOFF_S", 0.0)
+    monkeypatch.setattr(settings, "SMTP_RATE_PER_S", 0.0)
+    monkeypatch.setattr(settings, "SMTP_POOL_SIZE", 1)
+    monkeypatch.setattr(settings, "SMTP_USER", "")
+    monkeypatch.setattr(settings, "SMTP_STARTTLS", False)
+
+
+def _mails(n):
+    return [{"to": f"c{i}@cliente.com", "subject": "s", "body": "b"} for i in range(n)]
+
+
+class FakeSMTP:
+    opened = 0
+    refuse = None
+
+    def __init__(self, *args, **kwargs):
+        FakeSMTP.opened += 1
+
+    def ehlo(self): pass
+    def rset(self): pass
+    def quit(self): pass
+    def close(self): pass
+
+    def send_message(self, msg):
+        if FakeSMTP.refuse:
+            raise smtplib.SMTPRecipientsRefused({msg["To"]: FakeSMTP.refuse})
+
+
+def test_permanent_rejection_is_not_retried(fast_smtp, monkeypatch):
+    monkeypatch.setattr(FakeSMTP, "opened", 0)
+    monkeypatch.setattr(FakeSMTP, "refuse", (553, b"bad recipient"))
+    monkeypatch.setattr(smtpSender.smtplib, "SMTP", FakeSMTP)
+    out = send_all(_mails(3))
+    assert [r["intentos"] for r in out["resultados"]] == [1, 1, 1]
+    assert out["resumen"]["fallidos"] == 3 and FakeSMTP.opened == 1
+
+
+def test_unreachable_server_fails_the_batch_without_retries(fast_smtp, monkeypatch):
+    calls = []
+
+    def refused(*args, **kwargs):
+        calls.append(1)
+        raise ConnectionRefusedError("refused")
+
+    monkeypatch.setattr(smtpSender.smtplib, "SMTP", refused)
+    out = send_all(_mails(5))
+    assert len(calls) == 1
+    assert out["resumen"]["fallidos"] == 5
+    assert all("no disponible" in r["error"] for r in out["resultados"])
@@ -0,0 +1,40 @@
+import pytest
+from models.data import Block
+from services.pdfReading.pdfDataExtraction import extract_fields_from_blocks, find_total_amount, cleanup_amount
+
+LANGS = [None, "es", "en", "fr", "it", "de", "pt"]
+
+
+def _blocks(*rows):
+    return [Block(text=t, bbox=(50, y, 300, y + 12)) for t, y in rows]
+
+
+@pytest.mark.parametrize("lang", LANGS)
+def test_tax_total_line_is_never_the_document_total(lang):
+    # La línea de IVA queda más abajo que el TOTAL: no debe tomarse como total del documento
+    blocks = _blocks(("SUBTOTAL 100,00", 100), ("TOTAL 121,00", 120), ("TOTAL IVA 21% 21,00", 140))
+    data = extract_fields_from_blocks(blocks, lang, ["Importe"])
+    assert data.Importe == 121.0
+
+
+@pytest.mark.parametrize("lang", LANGS)
+@pytest.mark.parametrize("tax", ["TOTAL TVA 20,00", "TOTAL TAXES 20,00", "GESAMT MWST 20,00", "TOTALE IMPOSTE IVA 20,00"])
+def test_tax_words_of_any_language_are_excluded(lang, tax):
+    blocks = _blocks(("TOTAL 120,00", 120), (tax, 140))
+    assert extract_fields_from_blocks(blocks, lang, ["Importe"]).Importe == 120.0
+
+
+@pytest.mark.parametrize("lang,label", [("it", "TOTALE"), ("de", "GESAMT"), ("fr", "TOTAL")])
+def test_language_total_labels(lang, label):
+    blocks = _blocks((f"{label} 1.234,50", 120))
+    assert extract_fields_from_blocks(blocks, lang, ["Importe"]).Importe == 1234.5
+
+
+def test_total_eur_label_forces_currency():
+    raw, cur, conf = find_total_amount(_blocks(("TOTAL EUR 145,00", 120)))
+    assert (cleanup_amount(raw), cur, conf) == ("145.00", "EUR", 0.95)
+
+
+def test_no_total_falls_back_to_largest_amount():
+    blocks = _blocks(("Pieza 10,00", 100), ("Pieza 35,50", 120))
+    assert extract_fields_from_blocks(blocks, "es", ["Importe"]).Importe == 35.5
@@ -0,0 +1,74 @@
+"""
+Mide el tiempo de importación de main.py (arranque en frío de un worker).
+
+    python tools/benchImport.py [--max-ms 1500] [--runs 5] [--json salida.json]
+
+Falla (exit 1) si la mediana supera --max-ms o si al importar main se cargan
+dependencias pesadas que deberían ser perezosas (pandas, PyMuPDF, ...).
+"""
+import argparse, json, os, re, statistics, subprocess, sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ["pandas", "openpyxl", "fitz", "pymupdf", "pdfplumber", "dateutil", "langdetect", "numpy"]
+RX_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def measure() -> dict:
+    """Un proceso nuevo con -X importtime: tiempo acumulado de main y módulos cargados."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=ROOT, capture_output=True, text=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr[-2000:])
+
+    modules, main_us = {}, None
+    for line in proc.stderr.splitlines():
+        m = RX_LINE.match(line)
+        if not m:
+            continue
+        cumulative, name = int(m.group(2)), m.group(4)
+        modules[name] = cumulative
+        if name == "main":
+            main_us = cumulative
+    return {"main_ms": (main_us or 0) / 1000, "modules": modules}
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--max-ms", type=float, default=1500.0)
+    ap.add_argument("--json", help="guardar resultados en este fichero")
+    args = ap.parse_args()
+
+    runs = [measure() for _ in range(args.runs)]
+    times = [r["main_ms"] for r in runs]
+    median = statistics.median(times)
+    loaded = runs[-1]["modules"]
+    heavy = sorted(h for h in HEAVY if h in loaded)
+    top = sorted(loaded.items(), key=lambda kv: -kv[1])[:10]
+
+    print(f"import main: mediana {median:.1f} ms (min {min(times):.1f}, max {max(times):.1f}, {args.runs} ejecuciones)")
+    print("módulos más lentos (acumulado):")
+    for name, us in top:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    result = {"median_ms": round(median, 1), "runs_ms": [round(t, 1) for t in times],
+              "heavy_loaded": heavy, "max_ms": args.max_ms}
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+    ok = True
+    if heavy:
+        print(f"ERROR: dependencias pesadas importadas al cargar main: {heavy}")
+        ok = False
+    if median > args.max_ms:
+        print(f"ERROR: {median:.1f} ms supera el límite de {args.max_ms:.0f} ms")
+        ok = False
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
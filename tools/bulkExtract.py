@@ -0,0 +1,202 @@
+"""
+Extracción masiva sin HTTP: recorre un directorio o un ZIP de PDFs y los procesa
+en un pool de procesos con el mismo pipeline que /extract.
+
+    python tools/bulkExtract.py archivo/ --out resultados.jsonl
+    python tools/bulkExtract.py historico.zip --out resultados.csv --processes 8 --split
+
+Cada resultado se escribe en cuanto termina y su fichero se anota en el checkpoint
+(<out>.ckpt): si la ejecución se interrumpe, al relanzarla con la misma salida se
+continúa sin reprocesar lo ya hecho (--retry-failed reintenta también los fallidos).
+Los bloques de texto de cada PDF se guardan (BLOCK_CACHE_DIR, por hash): al repetir
+la ejecución tras cambiar reglas solo se paga la extracción de campos, no el parseo
+(--refresh-blocks vuelve a parsear; --no-block-cache no lee ni guarda bloques).
+Al terminar informa de throughput, latencias y fallos.
+"""
+import argparse, csv, json, math, multiprocessing, os, statistics, sys, tempfile, time, zipfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CSV_FIELDS = [
+    "archivo", "documento", "ok", "error", "ms",
+    "Numero_proforma", "Fecha_de_la_factura", "Numero_de_pedido", "Referencia_de_pedido",
+    "Nombre_de_cliente", "Codigo_de_cliente", "Importe", "Moneda", "Unidades",
+    "pais", "telefono", "email", "agente", "idioma", "paginas", "confidence", "source", "presupuesto",
+]
+
+
+def list_inputs(source: str) -> list[str]:
+    """Claves de los PDFs: ruta relativa en el directorio o nombre del miembro del ZIP."""
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as zf:
+            return sorted(n for n in zf.namelist() if n.lower().endswith(".pdf") and not n.endswith("/"))
+    keys = []
+    for dirpath, _, files in os.walk(source):
+        for name in files:
+            if name.lower().endswith(".pdf"):
+                keys.append(os.path.relpath(os.path.join(dirpath, name), source))
+    return sorted(keys)
+
+
+def load_checkpoint(path: str, retry_failed: bool) -> set:
+    done = set()
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                estado, _, key = line.rstrip("\n").partition("\t")
+                if key and (estado == "ok" or not retry_failed):
+                    done.add(key)
+    return done
+
+
+# --- proceso del pool ---
+_source = None
+_split = False
+
+
+def _init(source: str, split: bool, block_cache: bool, refresh_blocks: bool) -> None:
+    global _source, _split
+    _source, _split = source, split
+    from settings import settings
+    settings.EXTRACT_PROCESSES = 1   # ya estamos en un proceso del pool: segmentos en secuencia
+    settings.HISTORY_ENABLED = False
+    # Archivos antiguos: ni se leen ni se aprenden datos del directorio de clientes en vivo
+    settings.CUSTOMER_DIRECTORY = False
+    settings.BLOCK_CACHE = block_cache
+    if refresh_blocks:
+        from services.pdfReading import blockStore
+        blockStore.REFRESH = True
+
+
+def _extract(path: str) -> list[dict]:
+    from services.pdfReading.pipeline import extract_document, extract_documents
+    docs = extract_documents(path) if _split else [extract_document(path)]
+    return [d.model_dump(exclude={"lineas"}) for d in docs]
+
+
+def process(key: str) -> dict:
+    from fastapi import HTTPException
+
+    t0 = time.perf_counter()
+    tmp = None
+    try:
+        if zipfile.is_zipfile(_source):
+            with zipfile.ZipFile(_source) as zf:
+                fd, tmp = tempfile.mkstemp(suffix=".pdf")
+                with os.fdopen(fd, "wb") as f:
+                    f.write(zf.read(key))
+            path = tmp
+        else:
+            path = os.path.join(_source, key)
+        result = {"archivo": key, "ok": True, "datos": _extract(path)}
+    except HTTPException as e:
+        result = {"archivo": key, "ok": False, "error": f"{e.status_code}: {e.detail}"}
+    except Exception as e:
+        result = {"archivo": key, "ok": False, "error": f"{type(e).__name__}: {e}"}
+    finally:
+        if tmp and os.path.exists(tmp):
+            os.remove(tmp)
+    result["ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    return result
+
+
+# --- salida ---
+class Writer:
+    def __init__(self, path: str, fmt: str):
+        self.fmt = fmt
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.f = open(path, "a", encoding="utf-8", newline="")
+        if fmt == "csv":
+            self.csv = csv.DictWriter(self.f, fieldnames=CSV_FIELDS, extrasaction="ignore")
+            if new:
+                self.csv.writeheader()
+
+    def write(self, result: dict) -> None:
+        if self.fmt == "jsonl":
+            self.f.write(json.dumps(result, ensure_ascii=False) + "\n")
+        elif not result["ok"]:
+            self.csv.writerow({"archivo": result["archivo"], "ok": False, "error": result["error"], "ms": result["ms"]})
+        else:
+            for i, doc in enumerate(result["datos"]):
+                row = {**doc, "archivo": result["archivo"], "documento": i, "ok": True, "ms": result["ms"]}
+                for k in ("paginas", "presupuesto"):
+                    row[k] = json.dumps(row[k]) if row.get(k) is not None else ""
+                self.csv.writerow(row)
+        self.f.flush()
+
+    def close(self) -> None:
+        self.f.close()
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("source", help="directorio con PDFs o fichero .zip")
+    ap.add_argument("--out", required=True, help="salida .jsonl o .csv")
+    ap.add_argument("--format", choices=["jsonl", "csv"], help="por defecto, según la extensión de --out")
+    ap.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--chunksize", type=int, default=4)
+    ap.add_argument("--split", action="store_true", help="PDFs con varias proformas (como /extract?split=true)")
+    ap.add_argument("--checkpoint", help="por defecto <out>.ckpt")
+    ap.add_argument("--retry-failed", action="store_true", help="reprocesar los que fallaron en ejecuciones previas")
+    ap.add_argument("--limit", type=int, help="procesar como mucho N ficheros nuevos")
+    ap.add_argument("--no-block-cache", action="store_true", help="no leer ni guardar ficheros de bloques")
+    ap.add_argument("--refresh-blocks", action="store_true", help="volver a parsear los PDFs y reescribir sus bloques")
+    args = ap.parse_args()
+
+    fmt = args.format or ("csv" if args.out.lower().endswith(".csv") else "jsonl")
+    ckpt_path = args.checkpoint or args.out + ".ckpt"
+    keys = list_inputs(args.source)
+    done = load_checkpoint(ckpt_path, args.retry_failed)
+    pending = [k for k in keys if k not in done]
+    print(f"{len(keys)} PDFs, {len(keys) - len(pending)} ya procesados, {len(pending)} pendientes")
+    if args.limit:
+        pending = pending[:args.limit]
+
+    writer = Writer(args.out, fmt)
+    ckpt = open(ckpt_path, "a", encoding="utf-8")
+    latencies, failures, docs = [], [], 0
+    t0 = time.perf_counter()
+    pool = multiprocessing.get_context("spawn").Pool(
+        max(1, args.processes), initializer=_init, initargs=(args.source, args.split, not args.no_block_cache, args.refresh_blocks))
+    interrupted = False
+    try:
+        for n, result in enumerate(pool.imap_unordered(process, pending, chunksize=args.chunksize), 1):
+            writer.write(result)
+            ckpt.write(f"{'ok' if result['ok'] else 'error'}\t{result['archivo']}\n")
+            ckpt.flush()
+            latencies.append(result["ms"])
+            if result["ok"]:
+                docs += len(result["datos"])
+            else:
+                failures.append((result["archivo"], result["error"]))
+            if n % 100 == 0:
+                el = time.perf_counter() - t0
+                print(f"  {n}/{len(pending)}  {n / el:.1f} PDFs/s  fallos={len(failures)}")
+        pool.close()
+    except KeyboardInterrupt:
+        interrupted = True
+        pool.terminate()
+        print("\nInterrumpido: lo procesado queda en el checkpoint, relance para continuar")
+    finally:
+        pool.join()
+        writer.close()
+        ckpt.close()
+
+    elapsed = time.perf_counter() - t0
+    n = len(latencies)
+    print(f"\nPDFs procesados: {n}  documentos: {docs}  fallos: {len(failures)}  en {elapsed:.1f} s")
+    if n:
+        lat = sorted(latencies)
+        p95 = lat[max(0, math.ceil(0.95 * n) - 1)]
+        print(f"Throughput: {n / elapsed:.2f} PDFs/s ({docs / elapsed:.2f} documentos/s)  "
+              f"latencia p50={statistics.median(lat):.0f} ms  p95={p95:.0f} ms")
+    for key, error in failures[:20]:
+        print(f"  FALLO {key}: {error}")
+    if len(failures) > 20:
+        print(f"  ... y {len(failures) - 20} más")
+    return 130 if interrupted else (1 if failures else 0)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,267 @@
+"""
+Prueba de carga HTTP reproduciendo un corpus de PDFs y registros Excel.
+
+    python tools/loadTest.py --corpus ./corpus --start --concurrency 8 --requests 200 --json run.json
+    python tools/loadTest.py --url http://localhost:8000 --endpoints extract,detect-language --duration 60
+    python tools/loadTest.py --corpus ./corpus --start --compare run_anterior.json
+
+- extract:         cada .pdf del corpus contra /extract
+- processExcel:    cada .xlsx del corpus contra /processExcel (nº de pedido aleatorio, sin duplicados)
+- generateMail:    correos sintéticos en los idiomas soportados
+- detect-language: líneas de los .txt del corpus (o frases de ejemplo)
+
+Informa por endpoint de throughput, latencias p50/p95/p99 y tasa de error, y
+opcionalmente guarda el resultado en JSON para comparar entre versiones.
+
+Con --start la app arranca con BLOCK_CACHE=false: el corpus se repite en bucle
+y, con la caché de bloques activa, a partir de la primera vuelta /extract solo
+mediría aciertos de caché. Para medir ese camino se usa --block-cache. Contra
+una app externa (--url) hay que levantarla con BLOCK_CACHE=false para obtener
+cifras comparables.
+"""
+import argparse, asyncio, itertools, json, math, os, random, subprocess, sys, time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENDPOINTS = ["extract", "processExcel", "generateMail", "detect-language"]
+SAMPLE_TEXTS = [
+    "Gracias por su pedido, le enviamos la proforma adjunta.",
+    "Please find attached the proforma invoice for your order.",
+    "Veuillez trouver ci-joint la facture proforma de votre commande.",
+    "In der Anlage erhalten Sie die Proforma-Rechnung für Ihre Bestellung.",
+    "In allegato la fattura proforma relativa al vostro ordine.",
+    "Segue em anexo a fatura proforma da sua encomenda.",
+    "Vă transmitem atașat factura proformă pentru comanda dumneavoastră.",
+]
+LANGS = ["es", "en", "fr", "de", "it", "pt", "ro", "xx"]
+
+
+def percentile(values: list, p: float) -> float:
+    """Percentil por rango más cercano (values ordenados)."""
+    if not values:
+        return 0.0
+    k = max(0, math.ceil(p / 100 * len(values)) - 1)
+    return values[k]
+
+
+def load_corpus(path: str | None) -> dict:
+    corpus = {"pdf": [], "xlsx": [], "text": list(SAMPLE_TEXTS)}
+    if not path:
+        return corpus
+    for dirpath, _, files in os.walk(path):
+        for name in sorted(files):
+            full = os.path.join(dirpath, name)
+            low = name.lower()
+            if low.endswith(".pdf"):
+                corpus["pdf"].append(full)
+            elif low.endswith(".xlsx"):
+                corpus["xlsx"].append(full)
+            elif low.endswith(".txt"):
+                with open(full, encoding="utf-8", errors="ignore") as f:
+                    corpus["text"] += [l.strip() for l in f if l.strip()]
+    return corpus
+
+
+def request_factory(endpoint: str, corpus: dict):
+    """Devuelve una función que genera los argumentos de la siguiente petición, o None si no hay corpus."""
+    if endpoint == "extract":
+        if not corpus["pdf"]:
+            return None
+        files = itertools.cycle(corpus["pdf"])
+        def make():
+            path = next(files)
+            with open(path, "rb") as f:
+                return {"method": "POST", "url": "/extract",
+                        "files": {"pdf": (os.path.basename(path), f.read(), "application/pdf")}}
+        return make
+
+    if endpoint == "processExcel":
+        if not corpus["xlsx"]:
+            return None
+        files = itertools.cycle(corpus["xlsx"])
+        def make():
+            path = next(files)
+            with open(path, "rb") as f:
+                content = f.read()
+            return {"method": "POST", "url": "/processExcel",
+                    "data": {"numPedido": random.randint(10**8, 10**9), "numProforma": random.randint(1, 10**6),
+                             "importe": round(random.uniform(10, 5000), 2), "estado": "Pendiente"},
+                    "files": {"file": (os.path.basename(path), content,
+                                       "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")}}
+        return make
+
+    if endpoint == "generateMail":
+        def make():
+            return {"method": "POST", "url": "/generateMail",
+                    "json": {"idioma": random.choice(LANGS), "importe": round(random.uniform(10, 5000), 2),
+                             "moneda": "EUR", "numeroPedido": random.randint(10**5, 10**6),
+                             "fechaFactura": str(random.randint(15, 120))}}
+        return make
+
+    if endpoint == "detect-language":
+        texts = itertools.cycle(corpus["text"])
+        def make():
+            return {"method": "POST", "url": "/detect-language", "params": {"string": next(texts)}}
+        return make
+
+    raise ValueError(endpoint)
+
+
+async def run_endpoint(client: httpx.AsyncClient, endpoint: str, make, concurrency: int,
+                       total: int | None, duration: float | None) -> dict:
+    latencies, errors, status_codes = [], 0, {}
+    counter = itertools.count()
+    deadline = time.perf_counter() + duration if duration else None
+
+    async def worker():
+        nonlocal errors
+        while True:
+            if deadline is not None:
+                if time.perf_counter() >= deadline:
+                    return
+            elif next(counter) >= total:
+                return
+            kwargs = make()
+            t0 = time.perf_counter()
+            try:
+                r = await client.request(**kwargs)
+                await r.aread()
+                code = r.status_code
+            except httpx.HTTPError as e:
+                code = type(e).__name__
+            latencies.append(time.perf_counter() - t0)
+            status_codes[str(code)] = status_codes.get(str(code), 0) + 1
+            if not isinstance(code, int) or code >= 400:
+                errors += 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+
+    lat = sorted(latencies)
+    n = len(lat)
+    return {
+        "peticiones": n,
+        "errores": errors,
+        "tasa_error": round(errors / n, 4) if n else 0.0,
+        "duracion_s": round(elapsed, 3),
+        "throughput_rps": round(n / elapsed, 2) if elapsed else 0.0,
+        "latencia_ms": {
+            "media": round(1000 * sum(lat) / n, 1) if n else 0.0,
+            "p50": round(1000 * percentile(lat, 50), 1),
+            "p95": round(1000 * percentile(lat, 95), 1),
+            "p99": round(1000 * percentile(lat, 99), 1),
+            "max": round(1000 * lat[-1], 1) if n else 0.0,
+        },
+        "status": status_codes,
+    }
+
+
+def start_app(port: int, block_cache: bool = False) -> subprocess.Popen:
+    """Levanta la app localmente (un worker uvicorn, sin reload) y espera a /ready."""
+    env = dict(os.environ, BLOCK_CACHE="true" if block_cache else "false")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, stdout=subprocess.DEVNULL, env=env,
+    )
+    url = f"http://127.0.0.1:{port}/ready"
+    for _ in range(120):
+        if proc.poll() is not None:
+            raise RuntimeError("La app terminó al arrancar")
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    proc.terminate()
+    raise RuntimeError("La app no quedó lista a tiempo")
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def print_report(results: dict, previous: dict | None) -> None:
+    if previous and previous.get("cache_bloques") != results.get("cache_bloques"):
+        print("Aviso: la ejecución anterior usó otra configuración de caché de bloques; las cifras no son comparables")
+    print(f"{'endpoint':<16}{'n':>7}{'err%':>7}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}  (ms)")
+    for ep, r in results["endpoints"].items():
+        lat = r["latencia_ms"]
+        print(f"{ep:<16}{r['peticiones']:>7}{100 * r['tasa_error']:>7.1f}{r['throughput_rps']:>9.1f}"
+              f"{lat['p50']:>9.1f}{lat['p95']:>9.1f}{lat['p99']:>9.1f}")
+        old = (previous or {}).get("endpoints", {}).get(ep)
+        if old:
+            d_rps = r["throughput_rps"] - old["throughput_rps"]
+            d_p99 = lat["p99"] - old["latencia_ms"]["p99"]
+            print(f"{'  vs anterior':<16}{'':>14}{d_rps:>+9.1f}{'':>18}{d_p99:>+9.1f}")
+
+
+async def main_async(args) -> dict:
+    corpus = load_corpus(args.corpus)
+    endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+    results = {
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "revision": git_revision(),
+        "url": args.url,
+        "concurrencia": args.concurrency,
+        "cache_bloques": args.block_cache if args.start else None,
+        "endpoints": {},
+    }
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        for ep in endpoints:
+            make = request_factory(ep, corpus)
+            if make is None:
+                print(f"[{ep}] sin ficheros en el corpus, se omite")
+                continue
+            results["endpoints"][ep] = await run_endpoint(
+                client, ep, make, args.concurrency,
+                None if args.duration else args.requests, args.duration)
+    return results
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--corpus", help="directorio con .pdf, .xlsx y .txt")
+    ap.add_argument("--url", default=None, help="app ya levantada (por defecto http://127.0.0.1:<port>)")
+    ap.add_argument("--start", action="store_true", help="arrancar la app localmente para la prueba")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--block-cache", action="store_true",
+                    help="con --start, dejar activa la caché de bloques (mide el camino en caliente)")
+    ap.add_argument("--endpoints", default=",".join(ENDPOINTS))
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--requests", type=int, default=100, help="peticiones por endpoint")
+    ap.add_argument("--duration", type=float, help="segundos por endpoint (en lugar de --requests)")
+    ap.add_argument("--timeout", type=float, default=120.0)
+    ap.add_argument("--json", help="guardar resultados en este fichero")
+    ap.add_argument("--compare", help="JSON de una ejecución anterior para mostrar diferencias")
+    args = ap.parse_args()
+    args.url = args.url or f"http://127.0.0.1:{args.port}"
+
+    proc = start_app(args.port, args.block_cache) if args.start else None
+    try:
+        results = asyncio.run(main_async(args))
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+    previous = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f)
+    print_report(results, previous)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 0 if all(r["errores"] == 0 for r in results["endpoints"].values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
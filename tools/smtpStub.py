@@ -0,0 +1,105 @@
+"""
+Servidor SMTP local para pruebas del envío de correos (no entrega nada).
+
+    python tools/smtpStub.py --port 2525 --dir data/outbox
+    SMTP_HOST=127.0.0.1 SMTP_PORT=2525 uvicorn main:app
+
+Acepta EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP y QUIT. Guarda cada mensaje como
+.eml en --dir (si se indica) y al terminar (Ctrl+C) muestra conexiones y mensajes
+recibidos. Con --fail-rate responde '451' a esa fracción de mensajes para probar
+los reintentos.
+"""
+import argparse, asyncio, os, random, sys, time, uuid
+
+stats = {"conexiones": 0, "mensajes": 0, "rechazados": 0}
+
+
+async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, args) -> None:
+    stats["conexiones"] += 1
+
+    async def reply(line: str) -> None:
+        writer.write((line + "\r\n").encode())
+        await writer.drain()
+
+    await reply("220 smtpStub ESMTP")
+    rcpts, data_mode, lines = [], False, []
+    try:
+        while True:
+            raw = await reader.readline()
+            if not raw:
+                break
+            if data_mode:
+                if raw in (b".\r\n", b".\n"):
+                    data_mode = False
+                    if random.random() < args.fail_rate:
+                        stats["rechazados"] += 1
+                        await reply("451 4.3.0 Fallo temporal simulado")
+                    else:
+                        stats["mensajes"] += 1
+                        if args.dir:
+                            with open(os.path.join(args.dir, f"{time.time():.6f}_{uuid.uuid4().hex[:8]}.eml"), "wb") as f:
+                                f.write(b"".join(l[1:] if l.startswith(b"..") else l for l in lines))
+                        await reply("250 2.0.0 OK")
+                    rcpts, lines = [], []
+                else:
+                    lines.append(raw)
+                continue
+
+            cmd = raw.decode(errors="ignore").strip()
+            verb = cmd[:4].upper()
+            if verb == "EHLO":
+                await reply("250-smtpStub")
+                await reply("250-PIPELINING")
+                await reply("250 8BITMIME")
+            elif verb == "HELO":
+                await reply("250 smtpStub")
+            elif verb == "MAIL":
+                rcpts = []
+                await reply("250 2.1.0 OK")
+            elif verb == "RCPT":
+                rcpts.append(cmd)
+                await reply("250 2.1.5 OK")
+            elif verb == "DATA":
+                if not rcpts:
+                    await reply("503 5.5.1 RCPT primero")
+                    continue
+                data_mode = True
+                await reply("354 Fin con <CRLF>.<CRLF>")
+            elif verb in ("RSET", "NOOP"):
+                rcpts = [] if verb == "RSET" else rcpts
+                await reply("250 OK")
+            elif verb == "QUIT":
+                await reply("221 Bye")
+                break
+            else:
+                await reply("502 5.5.2 Comando no soportado")
+    finally:
+        writer.close()
+
+
+async def serve(args) -> None:
+    server = await asyncio.start_server(lambda r, w: handle(r, w, args), args.host, args.port)
+    print(f"smtpStub escuchando en {args.host}:{args.port}")
+    async with server:
+        await server.serve_forever()
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=2525)
+    ap.add_argument("--dir", help="guardar aquí los mensajes recibidos (.eml)")
+    ap.add_argument("--fail-rate", type=float, default=0.0, help="fracción de mensajes rechazados con 451")
+    args = ap.parse_args()
+    if args.dir:
+        os.makedirs(args.dir, exist_ok=True)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+    print(f"conexiones={stats['conexiones']} mensajes={stats['mensajes']} rechazados={stats['rechazados']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())